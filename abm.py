@@ -1,27 +1,38 @@
+import collections
 import functools
 import json
+import queue
+import threading
 import time
+from concurrent.futures import Executor, Future
 from typing import (
     Any,
     Callable,
+    Deque,
     Dict,
     Generic,
     Iterable,
     Iterator,
     List,
     Optional,
+    Sequence,
     TextIO,
     Tuple,
     TypeVar,
+    Union,
+    overload,
 )
 
 import pandas as pd
+import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
 import structlog
 
 A = TypeVar("A", bound="Agent")
 M = TypeVar("M", bound="AgentBasedModel")
 T = TypeVar("T")
-History = Iterable[Tuple[List[Dict[str, Any]], Dict[str, Any]]]
+History = Iterable[Tuple[Sequence[Dict[str, Any]], Dict[str, Any]]]
 
 
 logger = structlog.getLogger()
@@ -41,7 +52,58 @@ class UnorderedSpace(Generic[A]):
         yield from self.agents
 
 
+class _PhaseTimer:
+    __slots__ = ("timings", "phase", "count", "start")
+
+    def __init__(self, timings: "PhaseTimings", phase: str, count: int) -> None:
+        self.timings = timings
+        self.phase = phase
+        self.count = count
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.timings.add(self.phase, time.perf_counter() - self.start, self.count)
+
+
+class PhaseTimings:
+    """
+    Seconds spent in each phase of the current step, and how many agents entered
+    it, logged with "step completed" as `<phase>_seconds` and `<phase>_count`.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = collections.defaultdict(float)
+        self.counts: Dict[str, int] = collections.defaultdict(int)
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        self.seconds[phase] += seconds
+        self.counts[phase] += count
+
+    def time(self, phase: str, count: int = 1) -> _PhaseTimer:
+        return _PhaseTimer(self, phase, count)
+
+    def update(self, other: "PhaseTimings") -> None:
+        for phase, seconds in other.seconds.items():
+            self.add(phase, seconds, other.counts[phase])
+
+    def clear(self) -> None:
+        self.seconds.clear()
+        self.counts.clear()
+
+    def log_fields(self) -> Dict[str, Union[float, int]]:
+        fields: Dict[str, Union[float, int]] = {}
+        for phase, seconds in self.seconds.items():
+            fields[f"{phase}_seconds"] = seconds
+            fields[f"{phase}_count"] = self.counts[phase]
+        return fields
+
+
 class Agent:
+    # Leaves subclasses free to declare `__slots__` and drop their instance `__dict__`
+    __slots__ = ()
+
     def make_decisions(self, model: Optional["AgentBasedModel"] = None) -> None:
         raise NotImplementedError
 
@@ -49,6 +111,7 @@ class Agent:
 class AgentBasedModel(Generic[A]):
     def __init__(self, space: Optional[UnorderedSpace[A]] = None) -> None:
         self.space = space if space else UnorderedSpace[A]()
+        self.phase_timings = PhaseTimings()
 
     def add_agent(self, agent: A) -> None:
         self.space.add_agent(agent)
@@ -60,50 +123,76 @@ class AgentBasedModel(Generic[A]):
     def increment_timestep(self) -> None:
         raise NotImplementedError
 
+    def step(self) -> None:
+        for agent in self.space:
+            agent.make_decisions(self)
+
+    def collect_agent_data(self, plan: "CollectorPlan[A]") -> "AgentColumns":
+        agents = list(self.space)
+        return AgentColumns(plan.collect_columns(agents), len(agents))
+
     def run(
         self,
         time_steps: int,
         agent_callables: Optional[List[Callable[[A], Any]]] = None,
         model_callables: Optional[List[Callable[["AgentBasedModel[A]"], Any]]] = None,
+        checkpoint: Optional[Callable[["AgentBasedModel[A]", int], None]] = None,
     ) -> History:
+        """
+        Yield agent and model data after each of `time_steps` steps. `checkpoint` is
+        called with the model and the number of steps run once each step's data has
+        been consumed, and before the next step starts. Each step is logged, with its
+        `phase_timings`, once it has been consumed.
+        """
+
         if agent_callables is None:
             agent_callables = []
 
         if model_callables is None:
             model_callables = []
 
+        agent_plan: CollectorPlan[A] = CollectorPlan(agent_callables)
+
         for step in range(time_steps):
             start_time = time.time()
+            self.phase_timings.clear()
 
             try:
                 self.increment_timestep()
             except NotImplementedError:
                 pass
 
-            agent_data = []
-
-            for agent in self.space:
-                agent.make_decisions(self)
-                agent_datum = {
-                    agent_callable.__name__: agent_callable(agent)
-                    for agent_callable in agent_callables
-                    if agent_callable(agent) is not None
-                }
-                agent_data.append(agent_datum)
+            self.step()
+            collect_start_time = time.perf_counter()
+            agent_data = self.collect_agent_data(agent_plan)
 
             model_data = {
                 model_callable.__name__: model_callable(self)
                 for model_callable in model_callables
             }
+            self.phase_timings.add(
+                "collect", time.perf_counter() - collect_start_time, len(agent_data)
+            )
+            elapsed_time_seconds = time.time() - start_time
+
+            # Time until the consumer asks for the next step, usually spent writing this one
+            yield_time = time.perf_counter()
+            yield agent_data, model_data
+            self.phase_timings.add(
+                "write", time.perf_counter() - yield_time, len(agent_data)
+            )
+
+            if checkpoint is not None:
+                with self.phase_timings.time("checkpoint"):
+                    checkpoint(self, step + 1)
 
             logger.info(
                 "step completed",
                 step=step,
-                elapsed_time_seconds=time.time() - start_time,
+                elapsed_time_seconds=elapsed_time_seconds,
+                **self.phase_timings.log_fields(),
             )
 
-            yield agent_data, model_data
-
 
 def collect_when(
     model: M, condition: Callable[[M], bool]
@@ -117,19 +206,344 @@ def collect_when(
                 return callable(*args, **kwargs)
             return None
 
+        # Lets a `CollectorPlan` check the condition once per step, not per agent
+        wrapper.collect_condition = functools.partial(condition, model)  # type: ignore[attr-defined]
         return wrapper
 
     return collect_when_decorator
 
 
-def write_jsonlines(history: History, file: TextIO) -> None:
-    for step in history:
-        file.write(json.dumps(step, default=str) + "\n")
+def column_collector(
+    callable: Callable[[Sequence[A]], Optional[Sequence[T]]]
+) -> Callable[[Sequence[A]], Optional[Sequence[T]]]:
+    """
+    Mark an agent callable as filling a whole column: it is called once with every
+    agent and returns one value per agent, or None to skip the column.
+    """
+
+    callable.collects_column = True  # type: ignore[attr-defined]
+    return callable
+
+
+class CollectorPlan(Generic[A]):
+    """
+    Agent callables compiled for collection. Each callable is evaluated once per
+    agent (column collectors once per step), and `collect_when` callables are
+    skipped entirely on steps where their condition does not hold.
+    """
+
+    def __init__(self, agent_callables: List[Callable[..., Any]]) -> None:
+        self.collectors: List[
+            Tuple[str, Callable[..., Any], Optional[Callable[[], bool]], bool]
+        ] = []
+        for agent_callable in agent_callables:
+            condition = getattr(agent_callable, "collect_condition", None)
+            if condition is not None:
+                agent_callable = agent_callable.__wrapped__  # type: ignore[attr-defined]
+            self.collectors.append(
+                (
+                    agent_callable.__name__,
+                    agent_callable,
+                    condition,
+                    getattr(agent_callable, "collects_column", False),
+                )
+            )
+
+    def collect_columns(self, agents: Any) -> Dict[str, Sequence[Any]]:
+        columns: Dict[str, Sequence[Any]] = {}
+        for name, agent_callable, condition, collects_column in self.collectors:
+            if condition is not None and not condition():
+                continue
+            if collects_column:
+                column = agent_callable(agents)
+                if column is not None:
+                    columns[name] = column
+            else:
+                columns[name] = [agent_callable(agent) for agent in agents]
+        return columns
+
+
+class AgentColumns(Sequence[Dict[str, Any]]):
+    """
+    The agent data of one step, held as columns with one value per agent.
+
+    Reads as a sequence of per-agent dicts leaving out None values, built when
+    accessed; columnar writers use `columns` directly.
+    """
+
+    def __init__(self, columns: Dict[str, Sequence[Any]], length: int) -> None:
+        self.columns = columns
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def record(self, index: int) -> Dict[str, Any]:
+        return {
+            name: column[index]
+            for name, column in self.columns.items()
+            if column[index] is not None
+        }
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Dict[str, Any]]:
+        ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(self.length)[index]]
+        return self.record(range(self.length)[index])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.columns:
+            for _ in range(self.length):
+                yield {}
+            return
+
+        names = list(self.columns)
+        for row in zip(*self.columns.values()):
+            yield {name: value for name, value in zip(names, row) if value is not None}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"AgentColumns({list(self)!r})"
+
+
+def _changed_fields(
+    previous_columns: Dict[str, Sequence[Any]],
+    columns: Dict[str, Sequence[Any]],
+    length: int,
+) -> Dict[str, List[List[Any]]]:
+    missing = [None] * length
+    changes = {}
+    for name in dict.fromkeys([*previous_columns, *columns]):
+        previous_values = previous_columns.get(name, missing)
+        values = columns.get(name, missing)
+        indices = [
+            i
+            for i, (previous_value, value) in enumerate(zip(previous_values, values))
+            if type(previous_value) is not type(value) or previous_value != value
+        ]
+        if indices:
+            changes[name] = [indices, [values[i] for i in indices]]
+    return changes
+
+
+def _jsonline(
+    agent_data: Sequence[Dict[str, Any]],
+    model_data: Dict[str, Any],
+    columns_changed_from: Optional[
+        Tuple[Dict[str, Sequence[Any]], Dict[str, Sequence[Any]]]
+    ] = None,
+) -> str:
+    line_agent_data: Any
+    if columns_changed_from is None:
+        line_agent_data = list(agent_data)
+    else:
+        previous_columns, columns = columns_changed_from
+        line_agent_data = {
+            "changed": _changed_fields(previous_columns, columns, len(agent_data))
+        }
+    return json.dumps([line_agent_data, model_data], default=str) + "\n"
+
+
+class PendingLines:
+    """
+    Steps `write_jsonlines` has passed to its executor but not yet written. Call
+    `write` from the thread running `write_jsonlines`, for example from the history
+    it is writing, to write them before a checkpoint.
+    """
+
+    def __init__(self) -> None:
+        self.file: Optional[TextIO] = None
+        self.lines: Deque[Future] = collections.deque()
+
+    def write_next(self) -> None:
+        assert self.file is not None
+        self.file.write(self.lines.popleft().result())
+
+    def write(self) -> None:
+        while self.lines:
+            self.write_next()
+
+
+def write_jsonlines(
+    history: History,
+    file: TextIO,
+    keyframe_interval: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    steps_in_flight: int = 4,
+    pending_lines: Optional[PendingLines] = None,
+) -> None:
+    """
+    With a `keyframe_interval`, agent data is written in full only at steps that
+    are a multiple of it. Other steps hold just the fields that changed since the
+    previous step, with null for fields that were removed. `read_jsonlines` decodes
+    both back into full agent data.
+
+    With an `executor`, such as a `ProcessPoolExecutor`, steps are encoded by its
+    workers, up to `steps_in_flight` at a time, and written in order. Steps still
+    being encoded are held in `pending_lines`, if given.
+    """
+
+    def encoding_args() -> Iterator[tuple]:
+        previous: Optional[Tuple[Dict[str, Sequence[Any]], int]] = None
+        for step, (agent_data, model_data) in enumerate(history):
+            columns_changed_from = None
+            if keyframe_interval is not None:
+                columns, length = _agent_columns(agent_data)
+                if step % keyframe_interval and previous and previous[1] == length:
+                    columns_changed_from = previous[0], columns
+                previous = columns, length
+            yield agent_data, model_data, columns_changed_from
+
+    if executor is None:
+        for args in encoding_args():
+            file.write(_jsonline(*args))
+        return
+
+    if pending_lines is None:
+        pending_lines = PendingLines()
+    pending_lines.file = file
+    for args in encoding_args():
+        pending_lines.lines.append(executor.submit(_jsonline, *args))
+        if len(pending_lines.lines) >= steps_in_flight:
+            pending_lines.write_next()
+    pending_lines.write()
+
+
+def _apply_changes(
+    agent_data: List[Dict[str, Any]], changes: Dict[str, List[List[Any]]]
+) -> List[Dict[str, Any]]:
+    # Agents that did not change share their dicts with the previous step
+    agent_data = list(agent_data)
+    copied = set()
+    for name, (indices, values) in changes.items():
+        for i, value in zip(indices, values):
+            if i not in copied:
+                agent_data[i] = dict(agent_data[i])
+                copied.add(i)
+            if value is None:
+                agent_data[i].pop(name, None)
+            else:
+                agent_data[i][name] = value
+    return agent_data
 
 
 def read_jsonlines(file: TextIO) -> History:
+    agent_data: List[Dict[str, Any]] = []
     for line in file:
-        yield tuple(json.loads(line))  # type: ignore
+        line_agent_data, model_data = json.loads(line)
+        if isinstance(line_agent_data, dict):
+            agent_data = _apply_changes(agent_data, line_agent_data["changed"])
+        else:
+            agent_data = line_agent_data
+        yield agent_data, model_data
+
+
+class BackgroundWriter:
+    """
+    Write history from a thread, so that serialising, compressing and uploading a
+    step overlaps with simulating the next.
+
+    `write` is called in the thread with the steps passed to `write_history`. At
+    most `max_queued_steps` steps wait to be written, after which the simulation
+    blocks until the writer catches up. A `write` that holds steps back, like
+    `write_jsonlines` with an executor, should be given with a `write_held` that
+    writes them, called in the thread on `flush`.
+    """
+
+    _end = object()
+
+    def __init__(
+        self,
+        write: Callable[[History], None],
+        max_queued_steps: int = 2,
+        write_held: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.queue: "queue.Queue[Any]" = queue.Queue(max_queued_steps)
+        self.write_held = write_held
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, args=(write,), daemon=True)
+        self.thread.start()
+
+    def _steps(self) -> History:
+        while True:
+            step = self.queue.get()
+            if step is self._end:
+                return
+            if isinstance(step, threading.Event):
+                # Every step queued before the event has been passed to `write`
+                try:
+                    if self.write_held is not None:
+                        self.write_held()
+                except BaseException as e:
+                    self.error = e
+                    raise
+                finally:
+                    step.set()
+                continue
+            yield step
+
+    def _run(self, write: Callable[[History], None]) -> None:
+        try:
+            write(self._steps())
+        except BaseException as e:
+            self.error = e
+            # Keep taking steps, so the simulation never blocks on a full queue
+            for _ in self._steps():
+                pass
+
+    def _raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def _put(self, item: Any) -> None:
+        self._raise_error()
+        self.queue.put(item)
+
+    def write_history(self, history: History) -> None:
+        for step in history:
+            self._put(step)
+
+    def flush(self) -> None:
+        """
+        Wait until every queued step has been passed to `write`, and any it holds
+        back written by `write_held`.
+        """
+
+        written = threading.Event()
+        self._put(written)
+        written.wait()
+        self._raise_error()
+
+    def _stop(self) -> None:
+        self.queue.put(self._end)
+        self.thread.join()
+
+    def close(self) -> None:
+        self._stop()
+        self._raise_error()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        # An error already raised from the writer is not raised again
+        if exc_type is None:
+            self.close()
+        else:
+            self._stop()
 
 
 def history_to_dataframes(history: History) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -145,3 +559,346 @@ def history_to_dataframes(history: History) -> Tuple[pd.DataFrame, pd.DataFrame]
         pd.DataFrame(model_history).reset_index().rename({"index": "step"}, axis=1)
     )
     return agent_history_df, model_history_df
+
+
+Steps = Union[range, Callable[[int], bool]]
+
+
+def _step_selector(steps: Optional[Steps]) -> Callable[[int], bool]:
+    if steps is None:
+        return lambda step: True
+    if isinstance(steps, range):
+        return steps.__contains__
+    return steps
+
+
+class _ColumnBuffer:
+    """Columns of values, extended a step at a time."""
+
+    def __init__(self) -> None:
+        self.columns: Dict[str, List[Any]] = {}
+        self.length = 0
+
+    def extend(self, columns: Dict[str, Sequence[Any]], length: int) -> None:
+        for name, values in columns.items():
+            if name not in self.columns:
+                self.columns[name] = [None] * self.length
+            self.columns[name].extend(values)
+        for name, values in self.columns.items():
+            if name not in columns:
+                values.extend([None] * length)
+        self.length += length
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns)
+
+
+def _project_agent_data(
+    agent_data: Sequence[Dict[str, Any]], names: Optional[Sequence[str]]
+) -> Tuple[Dict[str, List[Any]], int]:
+    if names is None:
+        columns, length = _agent_columns(agent_data)
+        return {name: list(values) for name, values in columns.items()}, length
+    projected = {name: [agent.get(name) for agent in agent_data] for name in names}
+    return projected, len(agent_data)
+
+
+def jsonlines_to_dataframes(
+    file: TextIO,
+    agent_columns: Optional[Sequence[str]] = None,
+    model_columns: Optional[Sequence[str]] = None,
+    steps: Optional[Steps] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read a JSON lines history file into the DataFrames `history_to_dataframes`
+    makes, keeping only `agent_columns`, `model_columns` and the `steps` in a range
+    or for which a predicate is true.
+
+    The file is streamed, holding only the selected data and the current step.
+    Steps that are not selected are decoded only when a later delta encoded step
+    depends on them, and reading stops after the last step of a range.
+    """
+
+    selected = _step_selector(steps)
+    last_step = max(steps, default=-1) if isinstance(steps, range) else None
+    agent_column_names = None if agent_columns is None else set(agent_columns)
+
+    agent_history = _ColumnBuffer()
+    model_history = _ColumnBuffer()
+    state: Dict[str, List[Any]] = {}
+    length = 0
+    keyframe: Optional[str] = None
+
+    for step, line in enumerate(file):
+        if last_step is not None and step > last_step:
+            break
+
+        if line.startswith("[{"):
+            if keyframe is not None:
+                state, length = _project_agent_data(
+                    json.loads(keyframe)[0], agent_columns
+                )
+                keyframe = None
+            changes, model_data = json.loads(line)
+            for name, (indices, values) in changes["changed"].items():
+                if agent_column_names is not None and name not in agent_column_names:
+                    continue
+                column = state.setdefault(name, [None] * length)
+                for i, value in zip(indices, values):
+                    column[i] = value
+        elif selected(step):
+            keyframe = None
+            agent_data, model_data = json.loads(line)
+            state, length = _project_agent_data(agent_data, agent_columns)
+        else:
+            keyframe = line
+            continue
+
+        if selected(step):
+            agent_history.extend({"step": [step] * length, **state}, length)
+            model_history.extend(
+                {
+                    "step": [step],
+                    **{
+                        name: [model_data.get(name)]
+                        for name in (
+                            model_data if model_columns is None else model_columns
+                        )
+                    },
+                },
+                1,
+            )
+
+    return agent_history.to_dataframe(), model_history.to_dataframe()
+
+
+# Steps are buffered up to this many rows, to infer column types from more than
+# a handful of agents and to avoid writing tiny row groups
+PARQUET_BUFFERED_ROWS = 100_000
+PARQUET_METADATA_KEY = b"abm"
+
+
+def _agent_columns(
+    agent_data: Sequence[Dict[str, Any]]
+) -> Tuple[Dict[str, Sequence[Any]], int]:
+    if isinstance(agent_data, AgentColumns):
+        return agent_data.columns, len(agent_data)
+
+    names = list(dict.fromkeys(name for agent in agent_data for name in agent))
+    columns: Dict[str, Sequence[Any]] = {
+        name: [agent.get(name) for agent in agent_data] for name in names
+    }
+    return columns, len(agent_data)
+
+
+def _arrow_type(values: Sequence[Any]) -> pa.DataType:
+    data_type = pa.array(values).type
+    if pa.types.is_string(data_type):
+        return pa.dictionary(pa.int32(), pa.string())
+    # Widened, as later row groups may hold floats in a column of integers or
+    # numbers in a column never seen with a value
+    if pa.types.is_integer(data_type) or pa.types.is_null(data_type):
+        return pa.float64()
+    return data_type
+
+
+def _arrow_array(values: Sequence[Any], data_type: pa.DataType, name: str) -> pa.Array:
+    try:
+        if pa.types.is_dictionary(data_type):
+            return pa.array(
+                [value if value is None else str(value) for value in values],
+                pa.string(),
+            ).dictionary_encode()
+        return pa.array(values).cast(data_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Column {name} does not fit its type {data_type}") from e
+
+
+class _ParquetHistoryWriter:
+    def __init__(self, file: Any) -> None:
+        self.file = file
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.buffer: List[
+            Tuple[int, Dict[str, Sequence[Any]], int, Dict[str, Any]]
+        ] = []
+        self.buffered_rows = 0
+
+    def write(
+        self,
+        step: int,
+        agent_data: Sequence[Dict[str, Any]],
+        model_data: Dict[str, Any],
+    ) -> None:
+        columns, length = _agent_columns(agent_data)
+        if not length:
+            raise ValueError(f"Step {step} has no agents to write model data against")
+
+        self.buffer.append((step, columns, length, model_data))
+        self.buffered_rows += length
+        if self.buffered_rows >= PARQUET_BUFFERED_ROWS:
+            self.flush()
+
+    def open(self) -> None:
+        def column_names(columns: Iterable[Dict[str, Any]]) -> List[str]:
+            return list(dict.fromkeys(name for step in columns for name in step))
+
+        agent_columns = column_names(columns for _, columns, _, _ in self.buffer)
+        model_columns = column_names(model_data for *_, model_data in self.buffer)
+        clashes = set(agent_columns) & set(model_columns)
+        if clashes:
+            raise ValueError(f"Agent and model data share column names {clashes}")
+
+        def values(name: str) -> List[Any]:
+            return [
+                value
+                for _, columns, length, _ in self.buffer
+                for value in columns.get(name, [None] * length)
+            ]
+
+        fields = (
+            [pa.field("step", pa.int32())]
+            + [pa.field(name, _arrow_type(values(name))) for name in agent_columns]
+            + [
+                pa.field(
+                    name,
+                    _arrow_type(
+                        [model_data.get(name) for *_, model_data in self.buffer]
+                    ),
+                )
+                for name in model_columns
+            ]
+        )
+        self.agent_columns = agent_columns
+        self.model_columns = model_columns
+        self.schema = pa.schema(fields).with_metadata(
+            {PARQUET_METADATA_KEY: json.dumps({"model_columns": model_columns})}
+        )
+        self.writer = pq.ParquetWriter(self.file, self.schema, compression="zstd")
+
+    def table(
+        self,
+        step: int,
+        columns: Dict[str, Sequence[Any]],
+        length: int,
+        model_data: Dict[str, Any],
+    ) -> pa.Table:
+        unknown_columns = (set(columns) - set(self.agent_columns)) | (
+            set(model_data) - set(self.model_columns)
+        )
+        if unknown_columns:
+            raise ValueError(
+                f"Columns {unknown_columns} first appear after the Parquet schema was written"
+            )
+
+        arrays = [pa.array([step] * length, pa.int32())]
+        for name in self.agent_columns:
+            data_type = self.schema.field(name).type
+            column = columns.get(name)
+            arrays.append(
+                _arrow_array(column, data_type, name)
+                if column is not None
+                else pa.nulls(length, data_type)
+            )
+        # Model data is kept on the first row of each step only
+        for name in self.model_columns:
+            data_type = self.schema.field(name).type
+            arrays.append(
+                pa.concat_arrays(
+                    [
+                        _arrow_array([model_data.get(name)], data_type, name),
+                        pa.nulls(length - 1, data_type),
+                    ]
+                )
+            )
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        if self.writer is None:
+            self.open()
+        assert self.writer is not None
+
+        self.writer.write_table(
+            pa.concat_tables([self.table(*buffered) for buffered in self.buffer])
+        )
+        self.buffer = []
+        self.buffered_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def write_parquet(history: History, file: Any) -> None:
+    """
+    Stream history to Parquet, a row per agent per step with a `step` column, and
+    model data stored on the first row of its step.
+
+    Steps are written in row groups of at least `PARQUET_BUFFERED_ROWS` rows, and
+    column types are inferred from the first row group. Strings are dictionary
+    encoded. Integers, and columns that have no values in the first row group, are
+    stored as floats, so a string first seen after the first row group raises
+    ValueError.
+    """
+
+    writer = _ParquetHistoryWriter(file)
+    for step, (agent_data, model_data) in enumerate(history):
+        writer.write(step, agent_data, model_data)
+    writer.close()
+
+
+def parquet_to_dataframes(
+    file: Any,
+    agent_columns: Optional[Sequence[str]] = None,
+    model_columns: Optional[Sequence[str]] = None,
+    steps: Optional[Steps] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    The Parquet equivalent of `history_to_dataframes`, projected and filtered like
+    `jsonlines_to_dataframes`. Row groups without selected steps are skipped.
+    """
+
+    selected = _step_selector(steps)
+    parquet_file = pq.ParquetFile(file)
+    schema = parquet_file.schema_arrow
+    all_model_columns = json.loads(schema.metadata[PARQUET_METADATA_KEY])[
+        "model_columns"
+    ]
+    if model_columns is None:
+        model_columns = all_model_columns
+    if agent_columns is None:
+        agent_columns = [
+            name
+            for name in schema.names
+            if name != "step" and name not in all_model_columns
+        ]
+    names = ["step", *agent_columns, *model_columns]
+
+    tables = []
+    for i in range(parquet_file.num_row_groups):
+        statistics = parquet_file.metadata.row_group(i).column(0).statistics
+        if statistics is not None and statistics.has_min_max:
+            if not any(
+                selected(step) for step in range(statistics.min, statistics.max + 1)
+            ):
+                continue
+
+        table = parquet_file.read_row_group(i, columns=names)
+        if steps is not None:
+            step_column = table.column("step")
+            selected_steps = [
+                step for step in step_column.unique().to_pylist() if selected(step)
+            ]
+            value_set = pa.array(selected_steps, pa.int32())
+            table = table.filter(pc.is_in(step_column, value_set=value_set))
+        tables.append(table)
+
+    table = pa.concat_tables(tables) if tables else schema.empty_table().select(names)
+    agent_history_df = table.drop(list(model_columns)).to_pandas()
+    first_rows = agent_history_df["step"].drop_duplicates().index.to_numpy()
+    model_history_df = (
+        table.select(["step", *model_columns]).take(first_rows).to_pandas()
+    )
+    return agent_history_df, model_history_df
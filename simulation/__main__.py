@@ -1,19 +1,27 @@
 import argparse
+import contextlib
 import datetime
+import gzip
+import multiprocessing
 import os
 import random
 import sys
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+from typing import Optional
 
 import pandas as pd
 import smart_open
 import structlog
 from dateutil.relativedelta import relativedelta
 
-from abm import write_jsonlines
+from abm import BackgroundWriter, PendingLines, write_jsonlines, write_parquet
+from simulation.cache import ResultStore
+from simulation.checkpoint import Checkpointer, truncate_history
 from simulation.constants import ENGLAND_WALES_ANNUAL_NEW_BUILDS, InterventionType
-from simulation.model import create_and_run_simulation
+from simulation.ensemble import Outputs, record_outputs
+from simulation.model import create_simulation, resume_simulation, run_model
 
 structlog.configure(
     processors=[
@@ -26,7 +34,26 @@ structlog.configure(
 logger = structlog.get_logger()
 
 
-def parse_args(args=None):
+# Several times faster than gzip's default of 9, for slightly larger files
+GZIP_COMPRESSION_LEVEL = 6
+
+
+@contextlib.contextmanager
+def open_history_file(path, mode):
+    if not path.endswith(".gz"):
+        with smart_open.open(path, mode) as file:
+            yield file
+        return
+
+    with smart_open.open(
+        path, f"{mode}b", compression="disable"
+    ) as compressed_file, gzip.open(
+        compressed_file, f"{mode}t", compresslevel=GZIP_COMPRESSION_LEVEL
+    ) as file:
+        yield file
+
+
+def parse_args(args=None, read_households=pd.read_parquet):
     def convert_to_datetime(date_string):
         return datetime.datetime.strptime(date_string, "%Y-%m-%d")
 
@@ -48,7 +75,7 @@ def parse_args(args=None):
     parser = argparse.ArgumentParser()
 
     households = parser.add_mutually_exclusive_group(required=True)
-    households.add_argument("households", type=pd.read_parquet, nargs="?")
+    households.add_argument("households", type=read_households, nargs="?")
     households.add_argument(
         "--bigquery",
         help="Generate household agents from BigQuery result.",
@@ -58,12 +85,13 @@ def parse_args(args=None):
     )
 
     def format_uuid(str):
-        return str.format(uuid=uuid.uuid4())
+        # {replicate} is filled in per replicate once the arguments are parsed
+        return str.format(uuid=uuid.uuid4(), replicate="{replicate}")
 
     parser.add_argument(
         "history_file",
         type=format_uuid,
-        help="Local file or Google Cloud Storage URI. Suffix with .gz for compression. Add {uuid} for random ID.",
+        help="Local file or Google Cloud Storage URI. Suffix with .parquet for Parquet, otherwise JSON lines; suffix JSON lines with .gz for compression. Add {uuid} for random ID, and {replicate} for the replicate number with --replicates.",
     )
 
     parser.add_argument(
@@ -186,6 +214,86 @@ def parse_args(args=None):
         metavar="YYYY-MM-DD:heat_pump_awareness",
     )
 
+    parser.add_argument(
+        "--engine",
+        choices=["agents", "population"],
+        default="agents",
+        help="Simulate households as Household agents, or as NumPy columns stepped in batches (faster for large populations).",
+    )
+
+    parser.add_argument(
+        "--breakdown-calendar",
+        action="store_true",
+        help="Sample when each heating system breaks down once, when it is installed, rather than drawing a breakdown for every household every step.",
+    )
+
+    parser.add_argument(
+        "--common-random-numbers",
+        action="store_true",
+        help="Draw each household's breakdowns, renovations, awareness and choices from its own random streams, keyed by household id and step, so that scenarios run with the same --seed see the same randomness. Population engine only.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes stepping household shards with the population engine, or running replicates in parallel with --replicates. Results do not depend on the number of workers.",
+    )
+
+    parser.add_argument(
+        "--replicates",
+        type=int,
+        default=1,
+        help="Number of runs of the scenario, each with a seed derived from --seed and its own history file. The households are loaded once and shared by the --workers processes running the replicates.",
+    )
+
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=None,
+        help="Write full JSON lines agent data every this many steps, and only the fields that changed in the steps between.",
+    )
+
+    parser.add_argument(
+        "--write-queue-steps",
+        type=int,
+        default=0,
+        help="Write history from a background thread while the next steps are simulated, with at most this many steps waiting to be written. 0 writes history between steps.",
+    )
+
+    parser.add_argument(
+        "--encoding-processes",
+        type=int,
+        default=0,
+        help="Number of processes encoding JSON lines history steps in parallel. 0 encodes them in the writing thread.",
+    )
+
+    parser.add_argument(
+        "--checkpoint-file",
+        default=None,
+        help="Local file to write a checkpoint of the simulation to, to resume it with --resume-from if it stops.",
+    )
+
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=int,
+        default=12,
+        help="Number of steps between checkpoints.",
+    )
+
+    parser.add_argument(
+        "--resume-from",
+        default=None,
+        help="Local checkpoint file to continue a simulation from, appending to its local JSON lines history file. The model is restored from the checkpoint rather than the other arguments.",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        type=ResultStore,
+        default=None,
+        help="Local directory of history files, keyed by the arguments, seed, household population and simulation source of the run that wrote them. A run whose key is there copies that history file instead of running, and other runs add theirs.",
+    )
+
     return parser.parse_args(args)
 
 
@@ -222,6 +330,66 @@ def validate_args(args):
             f"Boiler ban announcement date must be on or before ban date, got gas_oil_boiler_ban_date:{args.gas_oil_boiler_ban_date}, gas_oil_boiler_ban_announce_date:{args.gas_oil_boiler_ban_announce_date}"
         )
 
+    if args.workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, got {args.workers}")
+
+    if args.common_random_numbers and args.engine != "population":
+        raise ValueError("Common random numbers only apply to the population engine")
+
+    if args.replicates < 1:
+        raise ValueError(
+            f"Number of replicates must be at least 1, got {args.replicates}"
+        )
+
+    if args.replicates > 1:
+        if "{replicate}" not in args.history_file:
+            raise ValueError(
+                "History file must contain {replicate} to run more than one replicate"
+            )
+        if args.checkpoint_file is not None or args.resume_from is not None:
+            raise ValueError("Checkpoints only apply to runs with one replicate")
+
+    if args.cache_dir is not None and args.resume_from is not None:
+        raise ValueError("Runs resumed from a checkpoint are not cached")
+
+    if args.keyframe_interval is not None:
+        if args.keyframe_interval < 1:
+            raise ValueError(
+                f"Keyframe interval must be at least 1, got {args.keyframe_interval}"
+            )
+        if args.history_file.endswith(".parquet"):
+            raise ValueError(
+                "Keyframe interval only applies to JSON lines history files"
+            )
+
+    if args.write_queue_steps < 0:
+        raise ValueError(
+            f"Write queue steps must be at least 0, got {args.write_queue_steps}"
+        )
+
+    if args.encoding_processes < 0:
+        raise ValueError(
+            f"Encoding processes must be at least 0, got {args.encoding_processes}"
+        )
+
+    if args.encoding_processes and args.history_file.endswith(".parquet"):
+        raise ValueError("Encoding processes only apply to JSON lines history files")
+
+    if args.checkpoint_interval < 1:
+        raise ValueError(
+            f"Checkpoint interval must be at least 1, got {args.checkpoint_interval}"
+        )
+
+    if args.checkpoint_file is not None or args.resume_from is not None:
+        if args.history_file.endswith(".parquet"):
+            raise ValueError(
+                "Checkpoints can only resume runs with JSON lines history files"
+            )
+        if "://" in args.history_file:
+            raise ValueError(
+                "Checkpoints can only resume runs with local history files"
+            )
+
     if args.campaign_target_heat_pump_awareness_date is not None:
         # Check that target awareness inputs increase over the model horizon
         increasing_awareness = check_parsed_target_heat_pump_awareness(
@@ -233,6 +401,183 @@ def validate_args(args):
             )
 
 
+def run_simulation(args, workers, checkpoint):
+    if args.resume_from is not None:
+        steps_completed, history = resume_simulation(
+            args.resume_from, args.time_steps, workers, checkpoint
+        )
+        truncate_history(args.history_file, steps_completed)
+        return history
+
+    model = create_model(args, workers)
+    return run_model(model, args.time_steps, checkpoint)
+
+
+def model_parameters(args):
+    """The model constructor arguments that scenarios can fork on."""
+
+    return dict(
+        annual_renovation_rate=args.annual_renovation_rate,
+        household_num_lookahead_years=args.household_num_lookahead_years,
+        heating_system_hassle_factor=args.heating_system_hassle_factor,
+        rented_heating_system_hassle_factor=args.rented_heating_system_hassle_factor,
+        interventions=args.intervention,
+        gas_oil_boiler_ban_datetime=args.gas_oil_boiler_ban_date,
+        gas_oil_boiler_ban_announce_datetime=args.gas_oil_boiler_ban_announce_date,
+        price_gbp_per_kwh_gas=args.price_gbp_per_kwh_gas,
+        price_gbp_per_kwh_electricity=args.price_gbp_per_kwh_electricity,
+        price_gbp_per_kwh_oil=args.price_gbp_per_kwh_oil,
+        air_source_heat_pump_price_discount_schedule=args.air_source_heat_pump_price_discount_date,
+        heat_pump_installer_count=args.heat_pump_installer_count,
+        heat_pump_installer_annual_growth_rate=args.heat_pump_installer_annual_growth_rate,
+        annual_new_builds=ENGLAND_WALES_ANNUAL_NEW_BUILDS
+        if args.include_new_builds
+        else None,
+        heat_pump_awareness_campaign_schedule=args.campaign_target_heat_pump_awareness_date,
+    )
+
+
+def create_model(args, workers):
+    return create_simulation(
+        args.households if args.households is not None else args.bigquery,
+        args.heat_pump_awareness,
+        args.all_agents_heat_pump_suitable,
+        engine=args.engine,
+        workers=workers,
+        start_datetime=args.start_datetime,
+        step_interval=args.step_interval,
+        breakdown_calendar=args.breakdown_calendar,
+        common_random_numbers=args.common_random_numbers,
+        **model_parameters(args),
+    )
+
+
+def write_history_file(args, history, history_file, checkpoint):
+    with contextlib.ExitStack() as stack:
+        pending_lines = None
+        if history_file.endswith(".parquet"):
+            mode = "wb"
+            write_history = write_parquet
+        else:
+            mode = "a" if args.resume_from is not None else "w"
+            # Spawned rather than forked, as the writer may run in a thread
+            executor = (
+                stack.enter_context(
+                    ProcessPoolExecutor(
+                        args.encoding_processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                )
+                if args.encoding_processes
+                else None
+            )
+            pending_lines = PendingLines()
+            write_history = partial(
+                write_jsonlines,
+                keyframe_interval=args.keyframe_interval,
+                executor=executor,
+                steps_in_flight=2 * args.encoding_processes,
+                pending_lines=pending_lines,
+            )
+
+        file = stack.enter_context(open_history_file(history_file, mode))
+        if args.write_queue_steps:
+            writer = stack.enter_context(
+                BackgroundWriter(
+                    partial(write_history, file=file),
+                    args.write_queue_steps,
+                    pending_lines.write if pending_lines is not None else None,
+                )
+            )
+
+            def flush_history():
+                writer.flush()
+                file.flush()
+
+            if checkpoint is not None:
+                checkpoint.before_write = flush_history
+            writer.write_history(history)
+        else:
+            # Called between steps, from the thread writing the history
+            def flush_history():
+                if pending_lines is not None:
+                    pending_lines.write()
+                file.flush()
+
+            if checkpoint is not None:
+                checkpoint.before_write = flush_history
+            write_history(history, file)
+
+
+def replicate_seed(seed, replicate: int) -> str:
+    return f"{seed}/replicate/{replicate}"
+
+
+def run_cached(args, seed, history_file, run_and_write) -> None:
+    """
+    Call `run_and_write` to write the run with `seed` to `history_file`, unless
+    the run is in the cache, in which case its history file is copied instead.
+    """
+
+    if args.cache_dir is None:
+        run_and_write()
+        return
+
+    key = args.cache_dir.run_key(args, seed)
+    if args.cache_dir.fetch(key, history_file):
+        logger.info("history copied from cache", key=key, history_file=history_file)
+        return
+
+    run_and_write()
+    args.cache_dir.store(key, history_file)
+    logger.info("history cached", key=key, history_file=history_file)
+
+
+def run_replicate(args, replicate: int, outputs: Optional[Outputs] = None) -> str:
+    """Run and write a replicate, recording its ensemble `outputs` if given."""
+
+    history_file = args.history_file.format(replicate=replicate)
+    seed = replicate_seed(args.seed, replicate)
+
+    def run_and_write():
+        random.seed(seed)
+        history = run_simulation(args, workers=1, checkpoint=None)
+        if outputs is not None:
+            history = record_outputs(history, outputs)
+        write_history_file(args, history, history_file, checkpoint=None)
+
+    # Outputs are recorded as the history is simulated, so those runs always run
+    if outputs is not None:
+        run_and_write()
+    else:
+        run_cached(args, seed, history_file, run_and_write)
+    logger.info("replicate complete", replicate=replicate, history_file=history_file)
+    return history_file
+
+
+# Set before replicate processes are forked, so that they share the households
+# loaded by the parent copy-on-write rather than each receiving a pickled copy
+_replicate_args = None
+
+
+def run_forked_replicate(replicate: int) -> str:
+    return run_replicate(_replicate_args, replicate)
+
+
+def run_replicates(args):
+    global _replicate_args
+    _replicate_args = args
+    replicates = range(args.replicates)
+    if args.workers == 1:
+        return list(map(run_forked_replicate, replicates))
+
+    with ProcessPoolExecutor(
+        min(args.workers, args.replicates),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        return list(executor.map(run_forked_replicate, replicates))
+
+
 if __name__ == "__main__":
 
     args = parse_args()
@@ -247,35 +592,25 @@ if __name__ == "__main__":
         },
     )
 
-    random.seed(args.seed)
-
     try:
-        history = create_and_run_simulation(
-            args.start_datetime,
-            args.step_interval,
-            args.time_steps,
-            args.households if args.households is not None else args.bigquery,
-            args.heat_pump_awareness,
-            args.annual_renovation_rate,
-            args.household_num_lookahead_years,
-            args.heating_system_hassle_factor,
-            args.rented_heating_system_hassle_factor,
-            args.intervention,
-            args.all_agents_heat_pump_suitable,
-            args.gas_oil_boiler_ban_date,
-            args.gas_oil_boiler_ban_announce_date,
-            args.price_gbp_per_kwh_gas,
-            args.price_gbp_per_kwh_electricity,
-            args.price_gbp_per_kwh_oil,
-            args.air_source_heat_pump_price_discount_date,
-            args.heat_pump_installer_count,
-            args.heat_pump_installer_annual_growth_rate,
-            ENGLAND_WALES_ANNUAL_NEW_BUILDS if args.include_new_builds else None,
-            args.campaign_target_heat_pump_awareness_date,
-        )
+        if args.replicates > 1:
+            run_replicates(args)
+        else:
+            args.history_file = args.history_file.format(replicate=0)
+
+            def run_and_write():
+                random.seed(args.seed)
+
+                checkpoint = (
+                    Checkpointer(args.checkpoint_file, args.checkpoint_interval)
+                    if args.checkpoint_file is not None
+                    else None
+                )
+
+                history = run_simulation(args, args.workers, checkpoint)
+                write_history_file(args, history, args.history_file, checkpoint)
 
-        with smart_open.open(args.history_file, "w") as file:
-            write_jsonlines(history, file)
+            run_cached(args, args.seed, args.history_file, run_and_write)
 
     except Exception:
         logger.exception("simulation failed")
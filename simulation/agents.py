@@ -1,7 +1,7 @@
 import datetime
 import math
-import random
-from typing import TYPE_CHECKING, Dict, Optional, Set
+import sys
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Set
 
 import pandas as pd
 
@@ -10,6 +10,7 @@ from abm import Agent
 if TYPE_CHECKING:
     from simulation.model import DomesticHeatingABM
 
+from simulation.breakdowns import sample_failure_day, to_day
 from simulation.constants import (
     BOILERS,
     DISCOUNT_RATE_WEIBULL_ALPHA,
@@ -62,14 +63,11 @@ from simulation.costs import (
     get_heating_fuel_costs_net_present_value,
     get_unit_and_install_costs,
 )
+from simulation.randomness import Randomness, default_randomness
 
 
-def sample_interval_uniformly(interval: pd.Interval) -> float:
-    return random.randint(interval.left, interval.right)
-
-
-def true_with_probability(p: float) -> bool:
-    return random.random() < p
+def sample_interval_uniformly(interval: pd.Interval, randomness: Randomness) -> float:
+    return randomness.randint(interval.left, interval.right)
 
 
 def get_weibull_percentile_from_value(
@@ -101,7 +99,91 @@ def reverse_sigmoid(x: float, k: float = SIGMOID_K, offset: float = SIGMOID_OFFS
     return 1 / (1 + math.exp(k * (x + offset)))
 
 
+def proba_rule_out_banned_heating_systems(
+    gas_oil_boiler_ban_datetime: datetime.datetime,
+    current_datetime: datetime.datetime,
+) -> float:
+
+    if current_datetime >= gas_oil_boiler_ban_datetime:
+        return 1
+
+    years_to_ban = (gas_oil_boiler_ban_datetime - current_datetime).days / 365
+
+    if years_to_ban > MAX_BAN_LEAD_TIME_YEARS:
+        return 0
+
+    return reverse_sigmoid(years_to_ban)
+
+
+def proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target(
+    model: "DomesticHeatingABM",
+) -> float:
+    heat_pump_awareness_at_previous_timestep = model.heat_pump_awareness_at_timestep - (
+        model.num_households_switching_to_heat_pump_aware_at_current_timestep
+        / model.household_count
+    )
+    return (
+        model.campaign_target_heat_pump_awareness
+        - heat_pump_awareness_at_previous_timestep
+    ) / (1 - heat_pump_awareness_at_previous_timestep)
+
+
+class DerivedAttributes(NamedTuple):
+    """Household attributes derived from static ones, see `Household.update_derived_attributes`."""
+
+    wealth_percentile: float
+    discount_rate: float
+    renovation_budget: float
+    insulation_segment: Optional[InsulationSegment]
+    property_size: PropertySize
+    is_heat_pump_suitable: bool
+    heat_pump_air_source_capacity_kw: int
+    heat_pump_ground_source_capacity_kw: int
+
+
+# Shared by every household without a heating decision in the current step, so never mutated
+NO_DECISION_LOG: Dict = {}
+
+
 class Household(Agent):
+    # Slotted, as a model holds hundreds of thousands of households
+    __slots__ = (
+        "id",
+        "location",
+        "property_type",
+        "occupant_type",
+        "built_form",
+        "total_floor_area_m2",
+        "property_value_gbp",
+        "is_solid_wall",
+        "construction_year_band",
+        "is_heat_pump_suitable_archetype",
+        "is_off_gas_grid",
+        "heating_functioning",
+        "heating_system",
+        "heating_system_previous",
+        "heating_system_install_date",
+        "epc_rating",
+        "potential_epc_rating",
+        "walls_energy_efficiency",
+        "roof_energy_efficiency",
+        "windows_energy_efficiency",
+        "is_heat_pump_aware",
+        "is_renovating",
+        "renovate_insulation",
+        "renovate_heating_system",
+        "heating_system_costs_unit_and_install",
+        "heating_system_costs_fuel",
+        "heating_system_costs_subsidies",
+        "heating_system_costs_insulation",
+        "insulation_element_upgrade_costs",
+        "boiler_upgrade_grant_available",
+        "boiler_upgrade_grant_used",
+        "index",
+        "randomness",
+        *DerivedAttributes._fields,
+    )
+
     def __init__(
         self,
         id: int,
@@ -123,10 +205,12 @@ class Household(Agent):
         roof_energy_efficiency: int,
         is_heat_pump_suitable_archetype: bool,
         is_heat_pump_aware: bool,
+        derived_attributes: Optional[DerivedAttributes] = None,
     ):
         self.id = id
         # Property / tenure attributes
-        self.location = location
+        # Interned, so households in the same location share one string
+        self.location = sys.intern(location)
         self.property_type = property_type
         self.occupant_type = occupant_type
         self.built_form = built_form
@@ -157,12 +241,51 @@ class Household(Agent):
         self.renovate_heating_system = False
         self.reset_previous_heating_decision_log()
 
+        # Set when the household is added to a model, see `DomesticHeatingABM.add_agent`
+        self.index: Optional[int] = None
+        self.randomness = default_randomness()
+
+        # Passed in when computed for a whole population at once, see `create_household_agents`
+        if derived_attributes is None:
+            self.update_derived_attributes()
+        else:
+            (
+                self.wealth_percentile,
+                self.discount_rate,
+                self.renovation_budget,
+                self.insulation_segment,
+                self.property_size,
+                self.is_heat_pump_suitable,
+                self.heat_pump_air_source_capacity_kw,
+                self.heat_pump_ground_source_capacity_kw,
+            ) = derived_attributes
+
     @property
     def heating_fuel(self) -> HeatingFuel:
         return HEATING_SYSTEM_FUEL[self.heating_system]
 
-    @property
-    def wealth_percentile(self) -> float:
+    def update_derived_attributes(self) -> None:
+        """
+        Compute the attributes derived from static household attributes. They are
+        stored rather than recomputed when read, so call this after changing
+        `property_value_gbp`, `total_floor_area_m2`, `property_type`, `built_form`,
+        `potential_epc_rating` or `is_heat_pump_suitable_archetype`.
+        """
+
+        self.wealth_percentile = self._wealth_percentile()
+        self.discount_rate = self._discount_rate()
+        self.renovation_budget = self._renovation_budget()
+        self.insulation_segment = self._insulation_segment()
+        self.property_size = self._property_size()
+        self.is_heat_pump_suitable = self._is_heat_pump_suitable()
+        self.heat_pump_air_source_capacity_kw = self._heat_pump_capacity_kw(
+            HeatingSystem.HEAT_PUMP_AIR_SOURCE
+        )
+        self.heat_pump_ground_source_capacity_kw = self._heat_pump_capacity_kw(
+            HeatingSystem.HEAT_PUMP_GROUND_SOURCE
+        )
+
+    def _wealth_percentile(self) -> float:
 
         PERCENTILE_FLOOR = 0.001
         PERCENTILE_CAP = 0.999
@@ -175,8 +298,7 @@ class Household(Agent):
 
         return min(max(percentile, PERCENTILE_FLOOR), PERCENTILE_CAP)
 
-    @property
-    def discount_rate(self) -> float:
+    def _discount_rate(self) -> float:
 
         DISCOUNT_RATE_CAP = 1
         percentile = get_weibull_value_from_percentile(
@@ -187,8 +309,7 @@ class Household(Agent):
 
         return min(percentile, DISCOUNT_RATE_CAP)
 
-    @property
-    def renovation_budget(self) -> float:
+    def _renovation_budget(self) -> float:
 
         return HEATING_PROPORTION_OF_RENO_BUDGET * get_weibull_value_from_percentile(
             GB_RENOVATION_BUDGET_WEIBULL_ALPHA,
@@ -196,8 +317,7 @@ class Household(Agent):
             self.wealth_percentile,
         )
 
-    @property
-    def insulation_segment(self) -> InsulationSegment:
+    def _insulation_segment(self) -> Optional[InsulationSegment]:
 
         if self.property_type == PropertyType.FLAT:
             if (
@@ -243,8 +363,7 @@ class Household(Agent):
         if self.property_type == PropertyType.BUNGALOW:
             return InsulationSegment.BUNGALOW
 
-    @property
-    def is_heat_pump_suitable(self) -> bool:
+    def _is_heat_pump_suitable(self) -> bool:
 
         return (
             False
@@ -257,8 +376,7 @@ class Household(Agent):
             else True
         )
 
-    @property
-    def property_size(self) -> PropertySize:
+    def _property_size(self) -> PropertySize:
 
         if self.total_floor_area_m2 < FLOOR_AREA_SQM_33RD_PERCENTILE:
             return PropertySize.SMALL
@@ -294,15 +412,17 @@ class Household(Agent):
             model.step_interval.months + (12 * model.step_interval.years)
         ) / 12
         proba_renovate = model.annual_renovation_rate * step_interval_years
-        self.is_renovating = true_with_probability(proba_renovate)
+        self.is_renovating = self.randomness.renovation[self.index] < proba_renovate
 
         self.renovate_heating_system = (
-            true_with_probability(RENO_PROBA_HEATING_SYSTEM_UPDATE)
+            self.randomness.renovate_heating_system[self.index]
+            < RENO_PROBA_HEATING_SYSTEM_UPDATE
             if self.is_renovating
             else False
         )
         self.renovate_insulation = (
-            true_with_probability(RENO_PROBA_INSULATION_UPDATE)
+            self.randomness.renovate_insulation[self.index]
+            < RENO_PROBA_INSULATION_UPDATE
             if self.is_renovating
             else False
         )
@@ -328,10 +448,10 @@ class Household(Agent):
     def get_num_insulation_elements(self, event_trigger: EventTrigger) -> int:
 
         if event_trigger == EventTrigger.RENOVATION:
-            return random.choices(
+            return self.randomness.choice(
                 list(RENO_NUM_INSULATION_ELEMENTS_UPGRADED.keys()),
                 weights=RENO_NUM_INSULATION_ELEMENTS_UPGRADED.values(),
-            )[0]
+            )
 
         if event_trigger == EventTrigger.EPC_D_UPGRADE:
             # The number of insulation elements a household would require to reach epc_rating C
@@ -349,16 +469,24 @@ class Household(Agent):
             if element == Element.WALLS:
                 if self.is_solid_wall:
                     cost_range = INTERNAL_WALL_INSULATION_COST[self.insulation_segment]
-                    insulation_quotes[element] = sample_interval_uniformly(cost_range)
+                    insulation_quotes[element] = sample_interval_uniformly(
+                        cost_range, self.randomness
+                    )
                 else:
                     cost_range = CAVITY_WALL_INSULATION_COST[self.insulation_segment]
-                    insulation_quotes[element] = sample_interval_uniformly(cost_range)
+                    insulation_quotes[element] = sample_interval_uniformly(
+                        cost_range, self.randomness
+                    )
             if element == Element.GLAZING:
                 cost_range = DOUBLE_GLAZING_UPVC_COST[self.insulation_segment]
-                insulation_quotes[element] = sample_interval_uniformly(cost_range)
+                insulation_quotes[element] = sample_interval_uniformly(
+                    cost_range, self.randomness
+                )
             if element == Element.ROOF:
                 cost_range = LOFT_INSULATION_JOISTS_COST[self.insulation_segment]
-                insulation_quotes[element] = sample_interval_uniformly(cost_range)
+                insulation_quotes[element] = sample_interval_uniformly(
+                    cost_range, self.randomness
+                )
 
         return insulation_quotes
 
@@ -403,36 +531,23 @@ class Household(Agent):
         return self.choose_insulation_elements(insulation_quotes, num_elements)
 
     def get_proba_rule_out_banned_heating_systems(self, model):
-
-        if model.current_datetime >= model.gas_oil_boiler_ban_datetime:
-            return 1
-
-        years_to_ban = (
-            model.gas_oil_boiler_ban_datetime - model.current_datetime
-        ).days / 365
-
-        if years_to_ban > MAX_BAN_LEAD_TIME_YEARS:
-            return 0
-
-        return reverse_sigmoid(years_to_ban)
+        return model.policy.proba_rule_out_banned_heating_systems
 
     def get_heating_system_options(
         self, model: "DomesticHeatingABM", event_trigger: EventTrigger
     ) -> Set[HeatingSystem]:
 
-        heating_system_options = model.heating_systems.copy()
+        heating_system_options = set(model.heating_systems)
 
-        is_gas_oil_boiler_ban_announced = (
-            InterventionType.GAS_OIL_BOILER_BAN in model.interventions
-            and model.current_datetime >= model.gas_oil_boiler_ban_announce_datetime
-        )
+        is_gas_oil_boiler_ban_announced = model.policy.is_gas_oil_boiler_ban_announced
 
         if not self.is_heat_pump_suitable:
             heating_system_options -= HEAT_PUMPS
 
         if is_gas_oil_boiler_ban_announced:
-            exclude_gas_oil_boilers = true_with_probability(
-                self.get_proba_rule_out_banned_heating_systems(model)
+            exclude_gas_oil_boilers = (
+                self.randomness.random()
+                < self.get_proba_rule_out_banned_heating_systems(model)
             )
 
             if exclude_gas_oil_boilers:
@@ -440,11 +555,7 @@ class Household(Agent):
                     [HeatingSystem.BOILER_GAS, HeatingSystem.BOILER_OIL]
                 )
 
-        is_gas_oil_boiler_ban_in_place = (
-            InterventionType.GAS_OIL_BOILER_BAN in model.interventions
-            and model.current_datetime >= model.gas_oil_boiler_ban_datetime
-        )
-        if not is_gas_oil_boiler_ban_in_place:
+        if not model.policy.is_gas_oil_boiler_ban_in_place:
             # if a gas/boiler ban is in place, we assume all households are aware of heat pumps
             if not self.is_heat_pump_aware:
                 heating_system_options -= HEAT_PUMPS
@@ -558,7 +669,7 @@ class Household(Agent):
         if all([w < threshold_weight for w in weights]):
             return self.heating_system
 
-        return random.choices(list(costs.keys()), weights)[0]
+        return self.randomness.choice(list(costs.keys()), weights)
 
     def install_heating_system(
         self, heating_system: HeatingSystem, model: "DomesticHeatingABM"
@@ -567,28 +678,44 @@ class Household(Agent):
         self.heating_system_previous = self.heating_system
         self.heating_system = heating_system
         self.heating_system_install_date = model.current_datetime.date()
+        if model.breakdown_calendar is not None:
+            self.schedule_breakdown(model)
 
-        if self.boiler_upgrade_grant_available:
-            if heating_system == HeatingSystem.HEAT_PUMP_AIR_SOURCE:
-                self.boiler_upgrade_grant_used = 7_500
-            if heating_system == HeatingSystem.HEAT_PUMP_GROUND_SOURCE:
-                self.boiler_upgrade_grant_used = 7_500
+        if self.boiler_upgrade_grant_available and heating_system in HEAT_PUMPS:
+            self.boiler_upgrade_grant_used = 7_500
+            model.award_boiler_upgrade_grant(self.boiler_upgrade_grant_used)
 
     def reset_previous_heating_decision_log(self) -> None:
 
         # resets attributes specific to a previous heating system decision
-        self.heating_system_costs_unit_and_install = {}
-        self.heating_system_costs_fuel = {}
-        self.heating_system_costs_subsidies = {}
-        self.heating_system_costs_insulation = {}
-        self.insulation_element_upgrade_costs = {}
+        # the logs are only allocated by households making a heating system decision
+        self.heating_system_costs_unit_and_install = NO_DECISION_LOG
+        self.heating_system_costs_fuel = NO_DECISION_LOG
+        self.heating_system_costs_subsidies = NO_DECISION_LOG
+        self.heating_system_costs_insulation = NO_DECISION_LOG
+        self.insulation_element_upgrade_costs = NO_DECISION_LOG
         self.boiler_upgrade_grant_available = False
         self.boiler_upgrade_grant_used = 0
 
+    def schedule_breakdown(self, model: "DomesticHeatingABM") -> None:
+
+        assert model.breakdown_calendar is not None
+        age_days = (
+            model.current_datetime.date() - self.heating_system_install_date
+        ).days
+        failure_day = sample_failure_day(
+            age_days, to_day(self.heating_system_install_date), self.randomness.random()
+        )
+        model.breakdown_calendar.schedule([self.index], [failure_day])
+
     def update_heating_status(self, model: "DomesticHeatingABM") -> None:
 
         self.reset_previous_heating_decision_log()
 
+        if model.breakdown_calendar is not None:
+            self.heating_functioning = self.index not in model.heating_failures
+            return
+
         step_interval_years = (
             model.step_interval.months + (12 * model.step_interval.years)
         ) / 12
@@ -598,12 +725,17 @@ class Household(Agent):
             self.heating_system_age_years(model.current_datetime.date()),
         )
         proba_failure = probability_density * step_interval_years
-        if random.random() < proba_failure:
+        if self.randomness.heating_status[self.index] < proba_failure:
             self.heating_functioning = False
         else:
             self.heating_functioning = True
 
     def compute_heat_pump_capacity_kw(self, heat_pump_type: HeatingSystem) -> int:
+        if heat_pump_type == HeatingSystem.HEAT_PUMP_AIR_SOURCE:
+            return self.heat_pump_air_source_capacity_kw
+        return self.heat_pump_ground_source_capacity_kw
+
+    def _heat_pump_capacity_kw(self, heat_pump_type: HeatingSystem) -> int:
 
         capacity_kw = (
             HEAT_PUMP_CAPACITY_SCALE_FACTOR[heat_pump_type] * self.total_floor_area_m2
@@ -618,17 +750,9 @@ class Household(Agent):
     def proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target(
         self, model
     ) -> float:
-        heat_pump_awareness_at_previous_timestep = (
-            model.heat_pump_awareness_at_timestep
-            - (
-                model.num_households_switching_to_heat_pump_aware_at_current_timestep
-                / model.household_count
-            )
+        return proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target(
+            model
         )
-        return (
-            model.campaign_target_heat_pump_awareness
-            - heat_pump_awareness_at_previous_timestep
-        ) / (1 - heat_pump_awareness_at_previous_timestep)
 
     def update_heat_pump_awareness(self, model) -> None:
         if (
@@ -640,8 +764,9 @@ class Household(Agent):
             proba_to_become_heat_pump_aware = self.proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target(
                 model
             )
-            self.is_heat_pump_aware = true_with_probability(
-                proba_to_become_heat_pump_aware
+            self.is_heat_pump_aware = (
+                self.randomness.heat_pump_awareness[self.index]
+                < proba_to_become_heat_pump_aware
             )
             if self.is_heat_pump_aware:
                 model.num_households_switching_to_heat_pump_aware += 1
@@ -651,9 +776,13 @@ class Household(Agent):
 
     def make_decisions(self, model):
 
-        self.update_heat_pump_awareness(model)
-        self.update_heating_status(model)
-        self.evaluate_renovation(model)
+        timings = model.phase_timings
+        with timings.time("update_heat_pump_awareness"):
+            self.update_heat_pump_awareness(model)
+        with timings.time("update_heating_status"):
+            self.update_heating_status(model)
+        with timings.time("evaluate_renovation"):
+            self.evaluate_renovation(model)
 
         if self.is_renovating:
             if self.renovate_insulation:
@@ -666,51 +795,55 @@ class Household(Agent):
             self.is_renovating and self.renovate_heating_system
         ):
 
-            if not self.heating_functioning:
-                heating_system_options = self.get_heating_system_options(
-                    model, event_trigger=EventTrigger.BREAKDOWN
-                )
-            else:
-                heating_system_options = self.get_heating_system_options(
-                    model, event_trigger=EventTrigger.RENOVATION
-                )
-            chosen_insulation_costs = self.get_chosen_insulation_costs(
-                event_trigger=EventTrigger.EPC_D_UPGRADE
-            )
-
-            costs_unit_and_install = {}
-            costs_fuel = {}
-            costs_subsidies = {}
-            costs_insulation = {}
-
-            for heating_system in heating_system_options:
-
-                (
-                    costs_unit_and_install[heating_system],
-                    costs_fuel[heating_system],
-                    costs_subsidies[heating_system],
-                ) = self.get_total_heating_system_costs(heating_system, model)
-
-                if heating_system in HEAT_PUMPS:
-                    costs_insulation[heating_system] = sum(
-                        chosen_insulation_costs.values()
+            with timings.time("filter_heating_system_options"):
+                if not self.heating_functioning:
+                    heating_system_options = self.get_heating_system_options(
+                        model, event_trigger=EventTrigger.BREAKDOWN
                     )
                 else:
-                    costs_insulation[heating_system] = 0
-
-            heating_system_replacement_costs = {
-                heating_system: costs_unit_and_install[heating_system]
-                + costs_fuel[heating_system]
-                + costs_subsidies[heating_system]
-                + costs_insulation[heating_system]
-                for heating_system in heating_system_options
-            }
-
-            chosen_heating_system = self.choose_heating_system(
-                heating_system_replacement_costs,
-                model.heating_system_hassle_factor,
-                model.rented_heating_system_hassle_factor,
-            )
+                    heating_system_options = self.get_heating_system_options(
+                        model, event_trigger=EventTrigger.RENOVATION
+                    )
+
+            with timings.time("evaluate_heating_system_costs"):
+                chosen_insulation_costs = self.get_chosen_insulation_costs(
+                    event_trigger=EventTrigger.EPC_D_UPGRADE
+                )
+
+                costs_unit_and_install = {}
+                costs_fuel = {}
+                costs_subsidies = {}
+                costs_insulation = {}
+
+                for heating_system in heating_system_options:
+
+                    (
+                        costs_unit_and_install[heating_system],
+                        costs_fuel[heating_system],
+                        costs_subsidies[heating_system],
+                    ) = self.get_total_heating_system_costs(heating_system, model)
+
+                    if heating_system in HEAT_PUMPS:
+                        costs_insulation[heating_system] = sum(
+                            chosen_insulation_costs.values()
+                        )
+                    else:
+                        costs_insulation[heating_system] = 0
+
+                heating_system_replacement_costs = {
+                    heating_system: costs_unit_and_install[heating_system]
+                    + costs_fuel[heating_system]
+                    + costs_subsidies[heating_system]
+                    + costs_insulation[heating_system]
+                    for heating_system in heating_system_options
+                }
+
+            with timings.time("choose_heating_system"):
+                chosen_heating_system = self.choose_heating_system(
+                    heating_system_replacement_costs,
+                    model.heating_system_hassle_factor,
+                    model.rented_heating_system_hassle_factor,
+                )
 
             self.install_heating_system(chosen_heating_system, model)
             if chosen_heating_system in HEAT_PUMPS:
@@ -0,0 +1,333 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import smart_open
+
+from abm import write_jsonlines, write_parquet
+from simulation.__main__ import open_history_file, parse_args
+from simulation.model import create_and_run_simulation, create_household_agents
+from simulation.synthetic import household_population_factory
+
+BENCHMARK_VERSION = 2
+HOUSEHOLD_COUNTS = [10_000, 100_000, 1_000_000]
+HOUSEHOLD_BYTES_SAMPLE_SIZE = 10_000
+
+# The max policy scenarios in k8s/job.jsonnet
+SCENARIOS = {
+    "max-policy-extended-bus-campaign-2028-2034": [
+        "--intervention",
+        "extended_boiler_upgrade_scheme",
+        "--intervention",
+        "heat_pump_campaign",
+        "--campaign-target-heat-pump-awareness-date",
+        "2028-01-01:0.5",
+        "--campaign-target-heat-pump-awareness-date",
+        "2034-01-01:0.75",
+        "--intervention",
+        "gas_oil_boiler_ban",
+        "--gas-oil-boiler-ban-date",
+        "2035-01-01",
+        "--gas-oil-boiler-ban-announce-date",
+        "2025-01-01",
+        "--heat-pump-awareness",
+        "0.25",
+        "--price-gbp-per-kwh-gas",
+        "0.0682",
+        "--price-gbp-per-kwh-electricity",
+        "0.182",
+        "--heat-pump-installer-count",
+        "10000000000",
+    ],
+    "max-policy-extended-bus-campaign-2028": [
+        "--intervention",
+        "extended_boiler_upgrade_scheme",
+        "--intervention",
+        "heat_pump_campaign",
+        "--campaign-target-heat-pump-awareness-date",
+        "2028-01-01:0.75",
+        "--intervention",
+        "gas_oil_boiler_ban",
+        "--gas-oil-boiler-ban-date",
+        "2035-01-01",
+        "--gas-oil-boiler-ban-announce-date",
+        "2025-01-01",
+        "--heat-pump-awareness",
+        "0.5",
+        "--price-gbp-per-kwh-gas",
+        "0.0682",
+        "--price-gbp-per-kwh-electricity",
+        "0.182",
+        "--heat-pump-installer-count",
+        "10000000000",
+    ],
+}
+
+
+def peak_rss_bytes() -> int:
+    # Children are the shard workers, counted once they have been joined
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Reported in kilobytes on Linux, but bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def household_bytes(
+    households_file: str, sample_size: int = HOUSEHOLD_BYTES_SAMPLE_SIZE
+) -> float:
+    """Memory allocated per `Household` agent, over the first `sample_size` households."""
+
+    household_population = pd.read_parquet(households_file).head(sample_size)
+    tracemalloc.start()
+    try:
+        households = list(
+            create_household_agents(
+                household_population,
+                [False] * len(household_population),
+                datetime.datetime(2024, 1, 1),
+                False,
+            )
+        )
+        allocated_bytes, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return allocated_bytes / len(households)
+
+
+def run_benchmark(
+    scenario: str,
+    households_file: str,
+    history_file: str,
+    time_steps: int,
+    engine: str,
+    workers: int,
+    seed: str,
+) -> Dict[str, Any]:
+    """
+    Simulate `scenario` for the households in a Parquet file, writing the history
+    as the command line interface does, and measure the throughput.
+    """
+
+    args = parse_args(
+        SCENARIOS[scenario]
+        + [
+            "--steps",
+            str(time_steps),
+            "--engine",
+            engine,
+            "--workers",
+            str(workers),
+            "--seed",
+            seed,
+            households_file,
+            history_file,
+        ]
+    )
+    household_count = len(args.households)
+    random.seed(args.seed)
+
+    start_time = time.perf_counter()
+    history = create_and_run_simulation(
+        args.start_datetime,
+        args.step_interval,
+        args.time_steps,
+        args.households,
+        args.heat_pump_awareness,
+        args.annual_renovation_rate,
+        args.household_num_lookahead_years,
+        args.heating_system_hassle_factor,
+        args.rented_heating_system_hassle_factor,
+        args.intervention,
+        args.all_agents_heat_pump_suitable,
+        args.gas_oil_boiler_ban_date,
+        args.gas_oil_boiler_ban_announce_date,
+        args.price_gbp_per_kwh_gas,
+        args.price_gbp_per_kwh_electricity,
+        args.price_gbp_per_kwh_oil,
+        args.air_source_heat_pump_price_discount_date,
+        args.heat_pump_installer_count,
+        args.heat_pump_installer_annual_growth_rate,
+        None,
+        args.campaign_target_heat_pump_awareness_date,
+        engine=args.engine,
+        workers=args.workers,
+    )
+    setup_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    if history_file.endswith(".parquet"):
+        with open_history_file(history_file, "wb") as file:
+            write_parquet(history, file)
+    else:
+        with open_history_file(history_file, "w") as file:
+            write_jsonlines(history, file)
+    run_seconds = time.perf_counter() - start_time
+
+    history_bytes = os.path.getsize(history_file)
+    return {
+        "scenario": scenario,
+        "engine": engine,
+        "workers": workers,
+        "households": household_count,
+        "time_steps": time_steps,
+        "history_format": os.path.basename(history_file).split(".", 1)[1],
+        "setup_seconds": setup_seconds,
+        "run_seconds": run_seconds,
+        "steps_per_second": time_steps / run_seconds,
+        "agents_per_second": household_count * time_steps / run_seconds,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "history_bytes": history_bytes,
+        "history_bytes_per_step": history_bytes / time_steps,
+        # Measured after the run, so that it does not count towards peak memory
+        "household_bytes": household_bytes(households_file)
+        if engine == "agents"
+        else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    household_counts: List[int],
+    scenarios: List[str],
+    engines: List[str],
+    time_steps: int,
+    workers: int,
+    history_format: str,
+    seed: str,
+) -> Dict[str, Any]:
+    """
+    Run every combination of household count, scenario and engine, each in a fresh
+    process so that its peak memory is its own.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for household_count in household_counts:
+            households_file = os.path.join(
+                directory, f"households-{household_count}.parquet"
+            )
+            household_population_factory(household_count).to_parquet(households_file)
+
+            for scenario in scenarios:
+                for engine in engines:
+                    history_file = os.path.join(directory, f"history.{history_format}")
+                    with ProcessPoolExecutor(
+                        1, mp_context=multiprocessing.get_context("spawn")
+                    ) as executor:
+                        result = executor.submit(
+                            run_benchmark,
+                            scenario,
+                            households_file,
+                            history_file,
+                            time_steps,
+                            engine,
+                            workers,
+                            seed,
+                        ).result()
+                    os.remove(history_file)
+                    results.append(result)
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def parse_benchmark_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Measure simulation throughput on synthetic household populations."
+    )
+
+    parser.add_argument(
+        "output_file",
+        help="Local file or Google Cloud Storage URI to write the results to as JSON.",
+    )
+
+    parser.add_argument(
+        "--households",
+        type=int,
+        nargs="+",
+        default=HOUSEHOLD_COUNTS,
+        help="Synthetic population sizes to simulate.",
+    )
+
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="Scenarios to simulate. Default is all of them.",
+    )
+
+    parser.add_argument(
+        "--engine",
+        action="append",
+        choices=["agents", "population"],
+        help="Engines to simulate with. Default is both.",
+    )
+
+    parser.add_argument("--steps", dest="time_steps", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=1)
+
+    parser.add_argument(
+        "--history-format",
+        choices=["jsonl", "jsonl.gz", "parquet"],
+        default="jsonl.gz",
+    )
+
+    parser.add_argument(
+        "--seed",
+        default="2024-01-01",
+        help="Seed for random number generator, the same for every run.",
+    )
+
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+
+    args = parse_benchmark_args()
+
+    benchmark = run_benchmarks(
+        args.households,
+        args.scenario or list(SCENARIOS),
+        args.engine or ["agents", "population"],
+        args.time_steps,
+        args.workers,
+        args.history_format,
+        args.seed,
+    )
+
+    with smart_open.open(args.output_file, "w") as file:
+        json.dump(benchmark, file, indent=2)
@@ -0,0 +1,79 @@
+import datetime
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from simulation.constants import (
+    HAZARD_RATE_HEATING_SYSTEM_ALPHA,
+    HAZARD_RATE_HEATING_SYSTEM_BETA,
+)
+
+# Days are counted from the NumPy datetime64 epoch, so population columns convert with `astype(int)`
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def to_day(date: datetime.date) -> int:
+    return (date - EPOCH).days
+
+
+def sample_failure_day(age_days, install_day, uniform):
+    """
+    Day a heating system fails, given it was installed on `install_day` and has
+    not failed by `age_days`. Inverse transform sampling of the Weibull
+    distribution whose hazard rate is `weibull_hazard_rate`, conditional on
+    surviving to `age_days`. Works on scalars and arrays.
+    """
+
+    alpha = HAZARD_RATE_HEATING_SYSTEM_ALPHA
+    beta = HAZARD_RATE_HEATING_SYSTEM_BETA
+    age_years = np.asarray(age_days) / 365
+    failure_age_years = beta * ((age_years / beta) ** alpha - np.log1p(-uniform)) ** (
+        1 / alpha
+    )
+    # Failures are noticed on the first step the heating system is at least this old
+    return install_day + np.ceil(failure_age_years * 365).astype(int)
+
+
+class BreakdownCalendar:
+    """
+    Days on which heating systems break down, sampled once when each heating
+    system is installed rather than drawn every step, in a heap so each step only
+    touches the households whose heating fails.
+
+    Households are keyed by index. Scheduling a household again supersedes its
+    earlier failure, which is dropped when it reaches the top of the heap.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[Tuple[int, int]] = []
+        self.failure_day: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.failure_day)
+
+    def schedule(self, households: Iterable[int], failure_days: Iterable[int]) -> None:
+        events = [
+            (int(failure_day), int(household))
+            for household, failure_day in zip(households, failure_days)
+        ]
+        self.failure_day.update((household, day) for day, household in events)
+
+        # Cheaper to rebuild the heap when scheduling a whole population
+        if len(events) > len(self.events):
+            self.events.extend(events)
+            heapq.heapify(self.events)
+        else:
+            for event in events:
+                heapq.heappush(self.events, event)
+
+    def pop_failures(self, day: int) -> List[int]:
+        """Remove and return the households whose heating fails on or before `day`."""
+
+        failures = []
+        while self.events and self.events[0][0] <= day:
+            failure_day, household = heapq.heappop(self.events)
+            if self.failure_day.get(household) == failure_day:
+                del self.failure_day[household]
+                failures.append(household)
+        return failures
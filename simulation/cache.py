@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Optional, Tuple
+
+import pandas as pd
+import smart_open
+
+import abm
+
+# Arguments that change where, how fast or from where a run writes its history,
+# but not the history it writes
+NON_OUTPUT_ARGUMENTS = (
+    "households",
+    "bigquery",
+    "history_file",
+    "workers",
+    "replicates",
+    "write_queue_steps",
+    "encoding_processes",
+    "checkpoint_file",
+    "checkpoint_interval",
+    "resume_from",
+    "cache_dir",
+)
+
+COPY_BYTES = 1 << 20
+
+
+def source_hash() -> str:
+    """Hash of the `abm` module and `simulation` package source, less its tests."""
+
+    package = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.abspath(abm.__file__)]
+    for directory, subdirectories, filenames in os.walk(package):
+        subdirectories[:] = sorted(
+            subdirectory
+            for subdirectory in subdirectories
+            if subdirectory not in {"tests", "__pycache__"}
+        )
+        paths.extend(
+            os.path.join(directory, filename)
+            for filename in sorted(filenames)
+            if filename.endswith(".py")
+        )
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.relpath(path, os.path.dirname(package)).encode())
+        with open(path, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def population_fingerprint(households: pd.DataFrame) -> str:
+    """Hash of the household population's columns and rows, in order."""
+
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            [[str(name), str(dtype)] for name, dtype in households.dtypes.items()]
+        ).encode()
+    )
+    digest.update(
+        pd.util.hash_pandas_object(households, index=False).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+def history_suffix(history_file: str) -> str:
+    """The extension that sets a history file's format and compression."""
+
+    if history_file.endswith(".parquet"):
+        return ".parquet"
+    # smart_open compresses by extension
+    _, extension = os.path.splitext(history_file)
+    return ".jsonl" if extension == ".jsonl" else f".jsonl{extension}"
+
+
+def _copy(source: str, destination: str) -> None:
+    # Byte for byte, without smart_open decompressing by extension
+    with smart_open.open(
+        source, "rb", compression="disable"
+    ) as source_file, smart_open.open(
+        destination, "wb", compression="disable"
+    ) as destination_file:
+        shutil.copyfileobj(source_file, destination_file, COPY_BYTES)
+
+
+class ResultStore:
+    """
+    History files in a local directory, named by the key of the run that wrote
+    them: a hash of its output arguments, seed, household population and source.
+    A run with the same key would write the same history, so it can be copied
+    instead.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.source_hash = source_hash()
+        # The last population fingerprinted, as replicates share one
+        self.population: Optional[Tuple[pd.DataFrame, str]] = None
+
+    def run_key(self, args: Any, seed: str) -> str:
+        households = args.households if args.households is not None else args.bigquery
+        if self.population is None or self.population[0] is not households:
+            self.population = households, population_fingerprint(households)
+
+        arguments = {
+            name: value
+            for name, value in vars(args).items()
+            if name not in NON_OUTPUT_ARGUMENTS
+        }
+        arguments["seed"] = seed
+        arguments["history_suffix"] = history_suffix(args.history_file)
+        return hashlib.sha256(
+            json.dumps(
+                [arguments, self.population[1], self.source_hash],
+                default=str,
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+
+    def path(self, key: str, history_file: str) -> str:
+        return os.path.join(self.directory, f"{key}{history_suffix(history_file)}")
+
+    def fetch(self, key: str, history_file: str) -> bool:
+        """Copy the history of the run with `key` to `history_file`, if stored."""
+
+        path = self.path(key, history_file)
+        if not os.path.exists(path):
+            return False
+        _copy(path, history_file)
+        return True
+
+    def store(self, key: str, history_file: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key, history_file)
+        # Copied alongside and renamed, so runs never fetch a partial history
+        partial_path = f"{path}.{uuid.uuid4().hex}.partial"
+        _copy(history_file, partial_path)
+        os.replace(partial_path, path)
@@ -0,0 +1,136 @@
+import gzip
+import os
+import pickle
+import random
+import zlib
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import smart_open
+
+CHECKPOINT_VERSION = 4
+HISTORY_READ_BYTES = 1 << 20
+
+
+def _sibling_path(path: str, prefix: str) -> str:
+    # Keeps the extension, so smart_open infers the same compression
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, f"{prefix}{filename}")
+
+
+def write_checkpoint(path: str, model: Any, steps_completed: int) -> None:
+    """
+    Write the model, with its households and random streams, and the global random
+    state to a compressed pickle at the local `path`.
+    """
+
+    # Written alongside and renamed, so a failed write leaves the last checkpoint intact
+    partial_path = _sibling_path(path, ".partial.")
+    with gzip.open(partial_path, "wb", compresslevel=1) as file:
+        pickle.dump(
+            {
+                "version": CHECKPOINT_VERSION,
+                "steps_completed": steps_completed,
+                "random_state": random.getstate(),
+                "model": model,
+            },
+            file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(partial_path, path)
+
+
+def read_checkpoint(path: str) -> Tuple[int, Any]:
+    """
+    Restore the global random state from a checkpoint, returning the number of
+    steps completed and the model.
+    """
+
+    with gzip.open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+
+    if checkpoint["version"] != CHECKPOINT_VERSION:
+        raise ValueError(
+            f"Checkpoint version {checkpoint['version']} is not supported, expected {CHECKPOINT_VERSION}"
+        )
+
+    random.setstate(checkpoint["random_state"])
+    return checkpoint["steps_completed"], checkpoint["model"]
+
+
+class Checkpointer:
+    """
+    A `checkpoint` callable for `AgentBasedModel.run`, writing a checkpoint every
+    `interval` steps. `before_write` is called first, to flush the history written
+    so far.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: int,
+        steps_completed: int = 0,
+        before_write: Optional[Callable[[], None]] = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self.steps_completed = steps_completed
+        self.before_write = before_write
+
+    def __call__(self, model: Any, steps: int) -> None:
+        steps_completed = self.steps_completed + steps
+        if steps_completed % self.interval:
+            return
+
+        if self.before_write is not None:
+            self.before_write()
+        write_checkpoint(self.path, model, steps_completed)
+
+
+def _history_lines(path: str) -> Iterator[str]:
+    if not path.endswith(".gz"):
+        with smart_open.open(path, "r") as file:
+            yield from file
+        return
+
+    # Decompressed by hand, to keep the lines of a gzip member cut off before its trailer
+    with open(path, "rb") as file:
+        decompressor = zlib.decompressobj(wbits=31)
+        pending = b""
+        while True:
+            data = file.read(HISTORY_READ_BYTES)
+            if not data:
+                break
+            while data:
+                pending += decompressor.decompress(data)
+                data = b""
+                if decompressor.eof:
+                    # Resumed runs append a new member
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=31)
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line.decode() + "\n"
+        if pending:
+            yield pending.decode()
+
+
+def truncate_history(path: str, steps: int) -> None:
+    """
+    Drop the steps after the first `steps` from a local JSON lines history file,
+    written after the checkpoint a run is resumed from.
+    """
+
+    history_steps = sum(1 for _ in _history_lines(path))
+    if history_steps < steps:
+        raise ValueError(
+            f"History file {path} has {history_steps} steps, fewer than the {steps} in the checkpoint"
+        )
+    # Compressed history files are rewritten in case they stopped mid-write
+    if history_steps == steps and not path.endswith(".gz"):
+        return
+
+    truncated_path = _sibling_path(path, ".truncated.")
+    with smart_open.open(truncated_path, "w") as truncated_file:
+        for _, line in zip(range(steps), _history_lines(path)):
+            truncated_file.write(line)
+    os.replace(truncated_path, path)
@@ -1,12 +1,26 @@
 import datetime
-from typing import TYPE_CHECKING, Any, Callable, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, TypeVar
 
-from abm import collect_when
+import numpy as np
+
+from abm import collect_when, column_collector
 from simulation.agents import Household
-from simulation.constants import Element, HeatingFuel, HeatingSystem
+from simulation.constants import (
+    BuiltForm,
+    ConstructionYearBand,
+    Element,
+    EPCRating,
+    HeatingFuel,
+    HeatingSystem,
+    OccupantType,
+    PropertyType,
+)
 
 if TYPE_CHECKING:
     from simulation.model import DomesticHeatingABM
+    from simulation.population import HouseholdPopulation
+
+T = TypeVar("T")
 
 
 def household_id(household) -> int:
@@ -361,3 +375,447 @@ def get_model_collectors(
         collect_when(model, is_first_timestep)(model_price_gbp_per_kwh_oil),
         model_heat_pump_awareness_at_timestep,
     ]
+
+
+def population_collector(
+    household_collector: Callable[[Household], Any],
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Name a population column collector after the household collector it mirrors."""
+
+    def population_collector_decorator(
+        population_column_collector: Callable[..., T],
+    ) -> Callable[..., T]:
+        population_column_collector.__name__ = household_collector.__name__
+        return column_collector(population_column_collector)
+
+    return population_collector_decorator
+
+
+def _enum_names(codes, enum_type) -> List[Optional[str]]:
+    # Code -1 indexes the trailing None
+    names = np.array(
+        [member.name for member in sorted(enum_type, key=lambda m: m.value)] + [None],
+        dtype=object,
+    )
+    return names[codes].tolist()
+
+
+def _optional_ints(values) -> List[Optional[int]]:
+    return [None if np.isnan(value) else int(value) for value in values.tolist()]
+
+
+def _int_or_float(value: float):
+    return int(value) if value.is_integer() else value
+
+
+@population_collector(household_id)
+def population_household_id(population: "HouseholdPopulation") -> List[int]:
+    return population.id.tolist()
+
+
+@population_collector(household_location)
+def population_household_location(population: "HouseholdPopulation") -> List[str]:
+    return population.location.tolist()
+
+
+@population_collector(household_property_value_gbp)
+def population_household_property_value_gbp(
+    population: "HouseholdPopulation",
+) -> List[int]:
+    return population.property_value_gbp.tolist()
+
+
+@population_collector(household_floor_area_sqm)
+def population_household_floor_area_sqm(
+    population: "HouseholdPopulation",
+) -> List[int]:
+    return population.total_floor_area_m2.tolist()
+
+
+@population_collector(household_is_off_gas_grid)
+def population_household_is_off_gas_grid(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_off_gas_grid.tolist()
+
+
+@population_collector(household_construction_year_band)
+def population_household_construction_year_band(
+    population: "HouseholdPopulation",
+) -> List[Optional[str]]:
+    return _enum_names(population.construction_year_band, ConstructionYearBand)
+
+
+@population_collector(household_property_type)
+def population_household_property_type(
+    population: "HouseholdPopulation",
+) -> List[str]:
+    return _enum_names(population.property_type, PropertyType)
+
+
+@population_collector(household_built_form)
+def population_household_built_form(population: "HouseholdPopulation") -> List[str]:
+    return _enum_names(population.built_form, BuiltForm)
+
+
+@population_collector(household_heating_system)
+def population_household_heating_system(
+    population: "HouseholdPopulation",
+) -> List[str]:
+    return _enum_names(population.heating_system, HeatingSystem)
+
+
+@population_collector(household_heating_system_previous)
+def population_household_heating_system_previous(
+    population: "HouseholdPopulation",
+) -> List[Optional[str]]:
+    return _enum_names(population.heating_system_previous, HeatingSystem)
+
+
+@population_collector(household_heating_functioning)
+def population_household_heating_functioning(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.heating_functioning.tolist()
+
+
+@population_collector(household_heating_install_date)
+def population_household_heating_install_date(
+    population: "HouseholdPopulation",
+) -> List[datetime.date]:
+    return population.heating_system_install_date.tolist()
+
+
+@population_collector(household_epc)
+def population_household_epc(population: "HouseholdPopulation") -> List[str]:
+    return _enum_names(population.epc_rating, EPCRating)
+
+
+@population_collector(household_potential_epc)
+def population_household_potential_epc(
+    population: "HouseholdPopulation",
+) -> List[str]:
+    return _enum_names(population.potential_epc_rating, EPCRating)
+
+
+@population_collector(household_occupant_type)
+def population_household_occupant_type(
+    population: "HouseholdPopulation",
+) -> List[str]:
+    return _enum_names(population.occupant_type, OccupantType)
+
+
+@population_collector(household_is_solid_wall)
+def population_household_is_solid_wall(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_solid_wall.tolist()
+
+
+@population_collector(household_walls_energy_efficiency)
+def population_household_walls_energy_efficiency(
+    population: "HouseholdPopulation",
+) -> List[Optional[int]]:
+    return _optional_ints(population.walls_energy_efficiency)
+
+
+@population_collector(household_windows_energy_efficiency)
+def population_household_windows_energy_efficiency(
+    population: "HouseholdPopulation",
+) -> List[Optional[int]]:
+    return _optional_ints(population.windows_energy_efficiency)
+
+
+@population_collector(household_roof_energy_efficiency)
+def population_household_roof_energy_efficiency(
+    population: "HouseholdPopulation",
+) -> List[Optional[int]]:
+    return _optional_ints(population.roof_energy_efficiency)
+
+
+@population_collector(household_is_heat_pump_suitable_archetype)
+def population_household_is_heat_pump_suitable_archetype(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_heat_pump_suitable_archetype.tolist()
+
+
+@population_collector(household_is_heat_pump_aware)
+def population_household_is_heat_pump_aware(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_heat_pump_aware.tolist()
+
+
+@population_collector(household_is_renovating)
+def population_household_is_renovating(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_renovating.tolist()
+
+
+@population_collector(household_is_renovating_insulation)
+def population_household_is_renovating_insulation(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.renovate_insulation.tolist()
+
+
+@population_collector(household_is_renovating_heating_system)
+def population_household_is_renovating_heating_system(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.renovate_heating_system.tolist()
+
+
+@population_collector(household_wealth_percentile)
+def population_household_wealth_percentile(
+    population: "HouseholdPopulation",
+) -> List[float]:
+    return population.wealth_percentile.tolist()
+
+
+@population_collector(household_discount_rate)
+def population_household_discount_rate(
+    population: "HouseholdPopulation",
+) -> List[float]:
+    return population.discount_rate.tolist()
+
+
+@population_collector(household_renovation_budget)
+def population_household_renovation_budget(
+    population: "HouseholdPopulation",
+) -> List[int]:
+    return population.renovation_budget.astype(int).tolist()
+
+
+@population_collector(household_is_heat_pump_suitable)
+def population_household_is_heat_pump_suitable(
+    population: "HouseholdPopulation",
+) -> List[bool]:
+    return population.is_heat_pump_suitable.tolist()
+
+
+@population_collector(household_annual_kwh_heating_demand)
+def population_household_annual_kwh_heating_demand(
+    population: "HouseholdPopulation",
+) -> List[int]:
+    return population.annual_kwh_heating_demand.astype(int).tolist()
+
+
+def _population_element_upgrade_cost_collector(
+    household_collector: Callable[[Household], int], element: Element
+) -> Callable[["HouseholdPopulation"], List[int]]:
+    @population_collector(household_collector)
+    def collector(population: "HouseholdPopulation") -> List[int]:
+        return [
+            value or 0
+            for value in population.decision_log_column(
+                population.insulation_element_upgrade_costs, element.value, int
+            )
+        ]
+
+    return collector
+
+
+def _population_decision_log_collector(
+    household_collector: Callable[[Household], Any],
+    decision_log: str,
+    heating_system: HeatingSystem,
+    to_python: Callable[[float], Any],
+) -> Callable[["HouseholdPopulation"], List[Any]]:
+    @population_collector(household_collector)
+    def collector(population: "HouseholdPopulation") -> List[Any]:
+        return population.decision_log_column(
+            getattr(population, decision_log), heating_system.value, to_python
+        )
+
+    return collector
+
+
+@population_collector(household_boiler_upgrade_grant_used)
+def population_household_boiler_upgrade_grant_used(
+    population: "HouseholdPopulation",
+) -> List[int]:
+    return population.boiler_upgrade_grant_used.tolist()
+
+
+def _population_decision_log_collectors() -> (
+    List[Callable[["HouseholdPopulation"], List[Any]]]
+):
+    return [
+        _population_decision_log_collector(
+            household_heating_system_costs_unit_and_install_boiler_gas,
+            "heating_system_costs_unit_and_install",
+            HeatingSystem.BOILER_GAS,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_unit_and_install_boiler_electric,
+            "heating_system_costs_unit_and_install",
+            HeatingSystem.BOILER_ELECTRIC,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_unit_and_install_boiler_oil,
+            "heating_system_costs_unit_and_install",
+            HeatingSystem.BOILER_OIL,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_unit_and_install_heat_pump_air_source,
+            "heating_system_costs_unit_and_install",
+            HeatingSystem.HEAT_PUMP_AIR_SOURCE,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_unit_and_install_heat_pump_ground_source,
+            "heating_system_costs_unit_and_install",
+            HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_fuel_boiler_gas,
+            "heating_system_costs_fuel",
+            HeatingSystem.BOILER_GAS,
+            float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_fuel_boiler_electric,
+            "heating_system_costs_fuel",
+            HeatingSystem.BOILER_ELECTRIC,
+            float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_fuel_boiler_oil,
+            "heating_system_costs_fuel",
+            HeatingSystem.BOILER_OIL,
+            float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_fuel_heat_pump_air_source,
+            "heating_system_costs_fuel",
+            HeatingSystem.HEAT_PUMP_AIR_SOURCE,
+            float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_fuel_heat_pump_ground_source,
+            "heating_system_costs_fuel",
+            HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
+            float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_subsidies_boiler_gas,
+            "heating_system_costs_subsidies",
+            HeatingSystem.BOILER_GAS,
+            _int_or_float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_subsidies_boiler_electric,
+            "heating_system_costs_subsidies",
+            HeatingSystem.BOILER_ELECTRIC,
+            _int_or_float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_subsidies_boiler_oil,
+            "heating_system_costs_subsidies",
+            HeatingSystem.BOILER_OIL,
+            _int_or_float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_subsidies_heat_pump_air_source,
+            "heating_system_costs_subsidies",
+            HeatingSystem.HEAT_PUMP_AIR_SOURCE,
+            _int_or_float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_subsidies_heat_pump_ground_source,
+            "heating_system_costs_subsidies",
+            HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
+            _int_or_float,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_insulation_boiler_gas,
+            "heating_system_costs_insulation",
+            HeatingSystem.BOILER_GAS,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_insulation_boiler_electric,
+            "heating_system_costs_insulation",
+            HeatingSystem.BOILER_ELECTRIC,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_insulation_boiler_oil,
+            "heating_system_costs_insulation",
+            HeatingSystem.BOILER_OIL,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_insulation_heat_pump_air_source,
+            "heating_system_costs_insulation",
+            HeatingSystem.HEAT_PUMP_AIR_SOURCE,
+            int,
+        ),
+        _population_decision_log_collector(
+            household_heating_system_costs_insulation_heat_pump_ground_source,
+            "heating_system_costs_insulation",
+            HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
+            int,
+        ),
+    ]
+
+
+def get_population_collectors(
+    model: "DomesticHeatingABM",
+) -> List[Callable[["HouseholdPopulation"], Optional[List[Any]]]]:
+    """Column collectors producing the same fields as `get_agent_collectors`."""
+    return [
+        population_household_id,
+        collect_when(model, is_first_timestep)(population_household_location),
+        collect_when(model, is_first_timestep)(population_household_property_value_gbp),
+        collect_when(model, is_first_timestep)(population_household_floor_area_sqm),
+        collect_when(model, is_first_timestep)(population_household_is_off_gas_grid),
+        collect_when(model, is_first_timestep)(
+            population_household_construction_year_band
+        ),
+        collect_when(model, is_first_timestep)(population_household_property_type),
+        collect_when(model, is_first_timestep)(population_household_built_form),
+        collect_when(model, is_first_timestep)(population_household_potential_epc),
+        collect_when(model, is_first_timestep)(population_household_occupant_type),
+        collect_when(model, is_first_timestep)(population_household_is_solid_wall),
+        collect_when(model, is_first_timestep)(
+            population_household_is_heat_pump_suitable_archetype
+        ),
+        collect_when(model, is_first_timestep)(population_household_wealth_percentile),
+        collect_when(model, is_first_timestep)(population_household_discount_rate),
+        collect_when(model, is_first_timestep)(population_household_renovation_budget),
+        collect_when(model, is_first_timestep)(
+            population_household_is_heat_pump_suitable
+        ),
+        population_household_heating_system,
+        population_household_heating_system_previous,
+        population_household_heating_functioning,
+        population_household_heating_install_date,
+        population_household_epc,
+        population_household_walls_energy_efficiency,
+        population_household_windows_energy_efficiency,
+        population_household_roof_energy_efficiency,
+        population_household_is_renovating,
+        population_household_is_renovating_insulation,
+        population_household_is_renovating_heating_system,
+        population_household_annual_kwh_heating_demand,
+        _population_element_upgrade_cost_collector(
+            household_element_upgrade_cost_roof, Element.ROOF
+        ),
+        _population_element_upgrade_cost_collector(
+            household_element_upgrade_cost_walls, Element.WALLS
+        ),
+        _population_element_upgrade_cost_collector(
+            household_element_upgrade_cost_windows, Element.GLAZING
+        ),
+        *_population_decision_log_collectors(),
+        population_household_boiler_upgrade_grant_used,
+        population_household_is_heat_pump_aware,
+    ]
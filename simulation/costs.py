@@ -1,15 +1,17 @@
 import datetime
-import random
-from typing import TYPE_CHECKING, Dict
+import math
+from typing import TYPE_CHECKING, Dict, NamedTuple
 
+import numpy as np
 import pandas as pd
 
 from simulation.constants import (
-    ENGLAND_WALES_HOUSEHOLD_COUNT_2020,
     FUEL_KWH_TO_HEAT_KWH,
+    HEAT_PUMPS,
     HEATING_SYSTEM_FUEL,
     HeatingSystem,
     InsulationSegment,
+    InterventionType,
     PropertySize,
 )
 
@@ -155,6 +157,8 @@ HEAT_PUMP_GROUND_SOURCE_REINSTALL_DISCOUNT = 0.5
 # Source: Distribution based on values in https://www.theccc.org.uk/publication/analysis-of-alternative-uk-heat-decarbonisation-pathways/
 DECOMMISSIONING_COST_MIN, DECOMMISSIONING_COST_MAX = 500, 2_000
 
+BOILER_UPGRADE_SCHEME_FUNDING_CAP = 237_500_000
+
 # Grant cap is set to £250M for 2024-’25, SOURCE: https://www.gov.uk/government/publications/boiler-upgrade-scheme-budget-increase-and-approval-to-over-allocate-vouchers/approval-to-increase-the-budget-and-over-allocate-vouchers-for-the-boiler-upgrade-scheme-november-2024
 # Grant cap is set to £1.54B for 2025-’28, SOURCE: https://www.gov.uk/government/news/families-business-and-industry-to-get-energy-efficiency-support
 # Assume limited spend of per annum during 2025-’28, unless the grant was underspent in year in which case the underspent amount gets carried forward to the future years
@@ -183,7 +187,7 @@ def get_unit_and_install_costs(
     costs = 0
 
     if heating_system != household.heating_system:
-        decommissioning_costs = random.randint(
+        decommissioning_costs = household.randomness.randint(
             DECOMMISSIONING_COST_MIN, DECOMMISSIONING_COST_MAX
         )
         costs += decommissioning_costs
@@ -318,37 +322,56 @@ def estimate_rhi_annual_payment(
     return rhi_annual_payment_gbp
 
 
+def boiler_upgrade_scheme_year(current_date: datetime.date) -> int:
+    # Scheme years run from April to March
+    return current_date.year if current_date.month >= 4 else current_date.year - 1
+
+
+def boiler_upgrade_scheme_grant_gbp(current_date: datetime.date) -> int:
+
+    if not datetime.date(2022, 4, 1) <= current_date < datetime.date(2025, 4, 1):
+        return 0
+
+    return 7_500
+
+
+def extended_boiler_upgrade_scheme_grant_gbp(current_date: datetime.date) -> int:
+
+    # Date range for BUS scheme 2022-2035
+    if not datetime.date(2022, 4, 1) <= current_date < datetime.date(2035, 4, 1):
+        return 0
+
+    # Grant is £7.5k up to 2028, then reduces to £5k after 2028
+    if not datetime.date(2022, 4, 1) <= current_date < datetime.date(2028, 4, 1):
+        return 5_000
+
+    return 7_500
+
+
+def extended_boiler_upgrade_scheme_funding_cap_gbp(
+    current_date: datetime.date,
+) -> float:
+
+    # The 2024 cap also applies to earlier scheme years, and none after the last
+    scheme_year = max(boiler_upgrade_scheme_year(current_date), 2024)
+    return BOILER_UPGRADE_SCHEME_GRANT_CAP.get(scheme_year, math.inf)
+
+
 def estimate_boiler_upgrade_scheme_grant(
     heating_system: HeatingSystem,
     model: "DomesticHeatingABM",
 ):
 
-    if heating_system not in [
-        HeatingSystem.HEAT_PUMP_AIR_SOURCE,
-        HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
-    ]:
-        return 0
-
-    model_population_scale = ENGLAND_WALES_HOUSEHOLD_COUNT_2020 / model.household_count
-    boiler_upgrade_funding_cap_gbp = 237_500_000 / model_population_scale
-    if (
-        model.boiler_upgrade_scheme_cumulative_spend_gbp
-        >= boiler_upgrade_funding_cap_gbp
-    ):
+    if heating_system not in HEAT_PUMPS:
         return 0
 
     if (
-        not datetime.date(2022, 4, 1)
-        <= model.current_datetime.date()
-        < datetime.date(2025, 4, 1)
+        model.boiler_upgrade_scheme_spend_to_date_gbp
+        >= model.policy.boiler_upgrade_scheme_funding_cap_gbp
     ):
         return 0
 
-    if heating_system == HeatingSystem.HEAT_PUMP_AIR_SOURCE:
-        return 7_500
-
-    if heating_system == HeatingSystem.HEAT_PUMP_GROUND_SOURCE:
-        return 7_500
+    return model.policy.boiler_upgrade_scheme_grant_gbp
 
 
 def estimate_extended_boiler_upgrade_scheme_grant(
@@ -356,52 +379,235 @@ def estimate_extended_boiler_upgrade_scheme_grant(
     model: "DomesticHeatingABM",
 ):
 
-    if heating_system not in [
-        HeatingSystem.HEAT_PUMP_AIR_SOURCE,
-        HeatingSystem.HEAT_PUMP_GROUND_SOURCE,
-    ]:
+    if heating_system not in HEAT_PUMPS:
         return 0
 
-    model_population_scale = ENGLAND_WALES_HOUSEHOLD_COUNT_2020 / model.household_count
-
-    if (model.current_datetime.date() < datetime.date(2025, 4, 1)) and (
-        model.boiler_upgrade_scheme_cumulative_spend_gbp
-        >= BOILER_UPGRADE_SCHEME_GRANT_CAP[2024] / model_population_scale
+    if (
+        model.boiler_upgrade_scheme_spend_to_date_gbp
+        >= model.policy.extended_boiler_upgrade_scheme_funding_cap_gbp
     ):
         return 0
 
-    for year in BOILER_UPGRADE_SCHEME_GRANT_CAP.keys():
-        boiler_upgrade_funding_cap_gbp = (
-            BOILER_UPGRADE_SCHEME_GRANT_CAP[year] / model_population_scale
+    return model.policy.extended_boiler_upgrade_scheme_grant_gbp
+
+
+# Batch cost engine: costs for arrays of households, with one column per heating
+# system. Enum values are contiguous from zero, so they double as column and
+# table indices.
+
+HEATING_SYSTEMS = sorted(HeatingSystem, key=lambda system: system.value)
+PROPERTY_SIZES = sorted(PropertySize, key=lambda size: size.value)
+INSULATION_SEGMENTS = sorted(InsulationSegment, key=lambda segment: segment.value)
+
+IS_HEAT_PUMP = np.array([system in HEAT_PUMPS for system in HEATING_SYSTEMS])
+FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM = np.array(
+    [FUEL_KWH_TO_HEAT_KWH[system] for system in HEATING_SYSTEMS]
+)
+
+
+def _lookup_table(table, keys) -> np.ndarray:
+    return np.array([table[key] for key in keys])
+
+
+def _interval_bounds(table) -> np.ndarray:
+    return np.array(
+        [[table[segment].left, table[segment].right] for segment in INSULATION_SEGMENTS]
+    )
+
+
+def _capacity_cost_table(table) -> np.ndarray:
+    costs = np.zeros(max(table) + 1)
+    costs[list(table)] = list(table.values())
+    return costs
+
+
+BOILER_GAS_COST_BY_SIZE = _lookup_table(MEAN_COST_GBP_BOILER_GAS, PROPERTY_SIZES)
+BOILER_OIL_COST_BY_SIZE = _lookup_table(MEAN_COST_GBP_BOILER_OIL, PROPERTY_SIZES)
+BOILER_ELECTRIC_COST_BY_SIZE = _lookup_table(
+    MEAN_COST_GBP_BOILER_ELECTRIC, PROPERTY_SIZES
+)
+HEAT_PUMP_AIR_SOURCE_COST_BY_KW = _capacity_cost_table(
+    MEDIAN_COST_GBP_HEAT_PUMP_AIR_SOURCE
+)
+HEAT_PUMP_GROUND_SOURCE_COST_BY_KW = _capacity_cost_table(
+    MEDIAN_COST_GBP_HEAT_PUMP_GROUND_SOURCE
+)
+
+CAVITY_WALL_INSULATION_BOUNDS = _interval_bounds(CAVITY_WALL_INSULATION_COST)
+INTERNAL_WALL_INSULATION_BOUNDS = _interval_bounds(INTERNAL_WALL_INSULATION_COST)
+LOFT_INSULATION_JOISTS_BOUNDS = _interval_bounds(LOFT_INSULATION_JOISTS_COST)
+DOUBLE_GLAZING_UPVC_BOUNDS = _interval_bounds(DOUBLE_GLAZING_UPVC_COST)
+
+RHI_TARIFF_GBP_PER_KWH_BY_SYSTEM = np.array(
+    [RHI_TARIFF_GBP_PER_KWH.get(system, 0) for system in HEATING_SYSTEMS]
+)
+RHI_HEAT_DEMAND_LIMIT_KWH_BY_SYSTEM = np.array(
+    [RHI_HEAT_DEMAND_LIMIT_KWH.get(system, 0) for system in HEATING_SYSTEMS]
+)
+
+
+class HeatingSystemCosts(NamedTuple):
+    unit_and_install: np.ndarray
+    fuel: np.ndarray
+    subsidies: np.ndarray
+    insulation: np.ndarray
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.unit_and_install + self.fuel + self.subsidies + self.insulation
+
+
+def discount_annual_cash_flows(
+    discount_rate: np.ndarray, cashflow_gbp: np.ndarray, duration_years: int
+) -> np.ndarray:
+    """Vectorised `discount_annual_cash_flow`, one rate per row."""
+
+    net_present_value = np.zeros(np.shape(cashflow_gbp))
+    for t in range(duration_years):
+        net_present_value = (
+            net_present_value + cashflow_gbp / (1 + discount_rate[:, None]) ** t
         )
-        if (
-            (model.current_datetime.date() >= datetime.date(year, 4, 1))
-            and (model.current_datetime.date() < datetime.date(year + 1, 4, 1))
-            and (
-                model.boiler_upgrade_scheme_cumulative_spend_gbp
-                >= boiler_upgrade_funding_cap_gbp
-            )
-        ):
-            return 0
+    return net_present_value
 
-    # Date range for BUS scheme 2022-2035
-    if (
-        not datetime.date(2022, 4, 1)
-        <= model.current_datetime.date()
-        < datetime.date(2035, 4, 1)
-    ):
-        return 0
 
-    # Grant is £7.5k up to 2028, then reduces to £5k after 2028
-    if (
-        not datetime.date(2022, 4, 1)
-        <= model.current_datetime.date()
-        < datetime.date(2028, 4, 1)
-    ):
-        return 5_000
+def get_unit_and_install_cost_matrix(
+    heating_system: np.ndarray,
+    property_size: np.ndarray,
+    heat_pump_air_source_capacity_kw: np.ndarray,
+    heat_pump_ground_source_capacity_kw: np.ndarray,
+    decommissioning_costs: np.ndarray,
+    model: "DomesticHeatingABM",
+) -> np.ndarray:
+    """
+    `get_unit_and_install_costs` for households with the given heating system,
+    property size and heat pump capacity codes. `decommissioning_costs` holds a
+    draw for every household and heating system, used wherever the heating
+    system would be replaced.
+    """
 
-    if heating_system == HeatingSystem.HEAT_PUMP_AIR_SOURCE:
-        return 7_500
+    costs = np.zeros((len(heating_system), len(HeatingSystem)))
 
-    if heating_system == HeatingSystem.HEAT_PUMP_GROUND_SOURCE:
-        return 7_500
+    costs[:, HeatingSystem.BOILER_GAS.value] = BOILER_GAS_COST_BY_SIZE[property_size]
+    costs[:, HeatingSystem.BOILER_OIL.value] = BOILER_OIL_COST_BY_SIZE[property_size]
+    costs[:, HeatingSystem.BOILER_ELECTRIC.value] = BOILER_ELECTRIC_COST_BY_SIZE[
+        property_size
+    ]
+
+    air_source = HEAT_PUMP_AIR_SOURCE_COST_BY_KW[heat_pump_air_source_capacity_kw] * (
+        1 - model.air_source_heat_pump_discount_factor
+    )
+    # Some installation work required to install a heat pump first time does not apply to 2nd+ installations
+    air_source = np.where(
+        heating_system == HeatingSystem.HEAT_PUMP_AIR_SOURCE.value,
+        air_source * (1 - HEAT_PUMP_AIR_SOURCE_REINSTALL_DISCOUNT),
+        air_source,
+    )
+    # Any projected air source heat pump discounts are capped at the price of a gas boiler for a household
+    costs[:, HeatingSystem.HEAT_PUMP_AIR_SOURCE.value] = np.maximum(
+        air_source, BOILER_GAS_COST_BY_SIZE[property_size]
+    )
+
+    ground_source = HEAT_PUMP_GROUND_SOURCE_COST_BY_KW[
+        heat_pump_ground_source_capacity_kw
+    ]
+    costs[:, HeatingSystem.HEAT_PUMP_GROUND_SOURCE.value] = np.where(
+        heating_system == HeatingSystem.HEAT_PUMP_GROUND_SOURCE.value,
+        ground_source * (1 - HEAT_PUMP_GROUND_SOURCE_REINSTALL_DISCOUNT),
+        ground_source,
+    )
+
+    is_replacement = np.arange(len(HeatingSystem)) != heating_system[:, None]
+    costs = np.where(is_replacement, decommissioning_costs + costs, costs)
+
+    return np.trunc(costs)
+
+
+def get_heating_fuel_cost_matrix(
+    heating_system: np.ndarray,
+    annual_kwh_heating_demand: np.ndarray,
+    discount_rate: np.ndarray,
+    model: "DomesticHeatingABM",
+) -> np.ndarray:
+    """`get_heating_fuel_costs_net_present_value` for arrays of households."""
+
+    scale_factor_cop = (
+        FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM[heating_system, None]
+        / FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM
+    )
+    annual_heating_demand_kwh = annual_kwh_heating_demand[:, None] * scale_factor_cop
+    fuel_price_gbp_per_kwh = np.array(
+        [
+            model.fuel_price_gbp_per_kwh[HEATING_SYSTEM_FUEL[system]]
+            for system in HEATING_SYSTEMS
+        ]
+    )
+    annual_heating_bill = annual_heating_demand_kwh * fuel_price_gbp_per_kwh
+
+    return discount_annual_cash_flows(
+        discount_rate, annual_heating_bill, model.household_num_lookahead_years
+    )
+
+
+def estimate_rhi_annual_payment_matrix(
+    heating_system: np.ndarray, annual_kwh_heating_demand: np.ndarray
+) -> np.ndarray:
+    """`estimate_rhi_annual_payment` for arrays of households."""
+
+    annual_kwh_heating_demand = annual_kwh_heating_demand[:, None]
+    scale_factor_cop = (
+        FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM[heating_system, None]
+        / FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM
+    )
+    annual_heat_kwh_delta = annual_kwh_heating_demand - (
+        annual_kwh_heating_demand * scale_factor_cop
+    )
+
+    annual_heat_kwh_delta_capped = np.where(
+        annual_heat_kwh_delta > RHI_HEAT_DEMAND_LIMIT_KWH_BY_SYSTEM,
+        RHI_HEAT_DEMAND_LIMIT_KWH_BY_SYSTEM,
+        np.maximum(annual_heat_kwh_delta, 0),
+    )
+    return np.trunc(annual_heat_kwh_delta_capped * RHI_TARIFF_GBP_PER_KWH_BY_SYSTEM)
+
+
+def get_subsidy_matrix(
+    heating_system: np.ndarray,
+    annual_kwh_heating_demand: np.ndarray,
+    discount_rate: np.ndarray,
+    model: "DomesticHeatingABM",
+) -> np.ndarray:
+    """The subsidies of the model's intervention, for arrays of households."""
+
+    if InterventionType.BOILER_UPGRADE_SCHEME in model.interventions:
+        grants = [
+            estimate_boiler_upgrade_scheme_grant(system, model)
+            for system in HEATING_SYSTEMS
+        ]
+    elif InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME in model.interventions:
+        grants = [
+            estimate_extended_boiler_upgrade_scheme_grant(system, model)
+            for system in HEATING_SYSTEMS
+        ]
+    elif InterventionType.RHI in model.interventions:
+        return discount_annual_cash_flows(
+            discount_rate,
+            estimate_rhi_annual_payment_matrix(
+                heating_system, annual_kwh_heating_demand
+            ),
+            duration_years=7,
+        )
+    else:
+        grants = [0] * len(HeatingSystem)
+
+    return np.tile(np.array(grants, dtype=float), (len(heating_system), 1))
+
+
+def get_insulation_cost_matrix(chosen_insulation_costs: np.ndarray) -> np.ndarray:
+    """
+    Households only upgrade insulation alongside a heat pump, at the cost of the
+    chosen elements (one column per element, NaN where not chosen).
+    """
+
+    return np.where(
+        IS_HEAT_PUMP, np.nansum(chosen_insulation_costs, axis=1)[:, None], 0
+    )
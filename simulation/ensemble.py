@@ -0,0 +1,104 @@
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from abm import History
+
+# Model collector outputs whose confidence intervals decide when a scenario has
+# enough replicates, see `simulation.collectors.get_model_collectors`
+OUTPUTS = (
+    "model_heat_pump_installations_at_current_step",
+    "model_boiler_upgrade_scheme_cumulative_spend_gbp",
+)
+
+# Two-sided 95% Student's t quantiles, by degrees of freedom from 1
+T_QUANTILES_95 = (
+    12.706,
+    4.303,
+    3.182,
+    2.776,
+    2.571,
+    2.447,
+    2.365,
+    2.306,
+    2.262,
+    2.228,
+    2.201,
+    2.179,
+    2.160,
+    2.145,
+    2.131,
+    2.120,
+    2.110,
+    2.101,
+    2.093,
+    2.086,
+    2.080,
+    2.074,
+    2.069,
+    2.064,
+    2.060,
+    2.056,
+    2.052,
+    2.048,
+    2.045,
+    2.042,
+)
+
+NORMAL_QUANTILE_975 = 1.959964
+
+# The value of each output at each step of one replicate
+Outputs = Dict[str, List[float]]
+
+
+def record_outputs(history: History, outputs: Outputs) -> History:
+    """Pass `history` through, appending each step's `OUTPUTS` to `outputs`."""
+
+    for agent_data, model_data in history:
+        for name in OUTPUTS:
+            outputs.setdefault(name, []).append(model_data[name])
+        yield agent_data, model_data
+
+
+def t_quantile_95(degrees_of_freedom: int) -> float:
+    if degrees_of_freedom <= len(T_QUANTILES_95):
+        return T_QUANTILES_95[degrees_of_freedom - 1]
+    # First order Cornish-Fisher expansion, within 0.005 of the quantile past the table
+    z = NORMAL_QUANTILE_975
+    return z + (z**3 + z) / (4 * degrees_of_freedom)
+
+
+def confidence_intervals(
+    replicate_outputs: Sequence[Outputs],
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """The mean and 95% confidence interval half-width of each output at each step."""
+
+    replicates = len(replicate_outputs)
+    intervals = {}
+    for name in OUTPUTS:
+        values = np.array([outputs[name] for outputs in replicate_outputs], float)
+        intervals[name] = (
+            values.mean(axis=0),
+            t_quantile_95(replicates - 1)
+            * values.std(axis=0, ddof=1)
+            / math.sqrt(replicates),
+        )
+    return intervals
+
+
+def relative_half_width(replicate_outputs: Sequence[Outputs]) -> float:
+    """
+    The widest confidence interval half-width of any output at any step, relative
+    to the output's largest mean over the steps. Infinite for fewer than two
+    replicates.
+    """
+
+    if len(replicate_outputs) < 2:
+        return math.inf
+
+    widest = 0.0
+    for mean, half_width in confidence_intervals(replicate_outputs).values():
+        if half_width.max() > 0:
+            widest = max(widest, half_width.max() / np.abs(mean).max())
+    return widest
@@ -0,0 +1,150 @@
+import copy
+import itertools
+import multiprocessing
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+from abm import History
+from simulation.model import DomesticHeatingABM, PolicyStep, run_model
+
+
+class Branch(NamedTuple):
+    name: str
+    # Constructor arguments to continue with, see `DomesticHeatingABM.set_parameters`
+    parameters: Dict[str, Any]
+
+
+def branch_decision_inputs(
+    model: DomesticHeatingABM, branch: Branch, time_steps: int
+) -> List[Tuple[Any, ...]]:
+    """The decision inputs of each of the next `time_steps` steps of `branch`."""
+
+    # A shallow copy, as setting parameters does not touch the households
+    branch_model = copy.copy(model)
+    branch_model.set_parameters(**branch.parameters)
+
+    decision_inputs = []
+    step_datetime = model.current_datetime
+    for _ in range(time_steps):
+        step_datetime += model.step_interval
+        decision_inputs.append(
+            PolicyStep(branch_model, step_datetime).decision_inputs()
+        )
+    return decision_inputs
+
+
+def run_branches(
+    model: DomesticHeatingABM,
+    branches: List[Branch],
+    time_steps: int,
+    write_history: Callable[[str, History], None],
+    processes: bool = False,
+) -> None:
+    """
+    Run `time_steps` steps of each branch of `model`, calling `write_history` with
+    its name and history. Steps are simulated once for the branches whose decision
+    inputs have been the same so far, and the model is forked where they differ.
+
+    With `processes`, the branches after a fork continue in forked processes, which
+    share the model and the history so far copy-on-write until they change them.
+    """
+
+    decision_inputs = [
+        branch_decision_inputs(model, branch, time_steps) for branch in branches
+    ]
+    _run_branches(
+        model, branches, decision_inputs, 0, time_steps, [], write_history, processes
+    )
+
+
+def _run_branches(
+    model: DomesticHeatingABM,
+    branches: List[Branch],
+    decision_inputs: List[List[Tuple[Any, ...]]],
+    step: int,
+    time_steps: int,
+    history: List[Any],
+    write_history: Callable[[str, History], None],
+    processes: bool,
+) -> None:
+    fork_step = next(
+        (
+            fork_step
+            for fork_step in range(step, time_steps)
+            if len({inputs[fork_step] for inputs in decision_inputs}) > 1
+        ),
+        time_steps,
+    )
+
+    # The branches have the same decision inputs up to the fork
+    model.set_parameters(**branches[0].parameters)
+    if fork_step == time_steps:
+        if len(branches) == 1:
+            write_history(
+                branches[0].name,
+                itertools.chain(history, run_model(model, time_steps - step)),
+            )
+            return
+
+        history = history + list(run_model(model, time_steps - step))
+        for branch in branches:
+            write_history(branch.name, iter(history))
+        return
+
+    if fork_step > step:
+        history = history + list(run_model(model, fork_step - step))
+
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for index, inputs in enumerate(decision_inputs):
+        groups.setdefault(inputs[fork_step], []).append(index)
+    *forked_groups, last_group = groups.values()
+
+    def run_group(group_model: DomesticHeatingABM, group: List[int]) -> None:
+        _run_branches(
+            group_model,
+            [branches[index] for index in group],
+            [decision_inputs[index] for index in group],
+            fork_step,
+            time_steps,
+            history,
+            write_history,
+            processes,
+        )
+
+    if not processes:
+        for group in forked_groups:
+            run_group(model.fork(), group)
+        run_group(model, last_group)
+        return
+
+    # The last group continues in this process, with this model
+    context = multiprocessing.get_context("fork")
+    forked_processes = [
+        context.Process(target=run_group, args=(model, group))
+        for group in forked_groups
+    ]
+    for process in forked_processes:
+        process.start()
+    run_group(model, last_group)
+    for process in forked_processes:
+        process.join()
+        if process.exitcode:
+            raise RuntimeError(f"Branch process exited with code {process.exitcode}")
+
+
+def run_lockstep(
+    model: DomesticHeatingABM,
+    scenario_parameters: List[Dict[str, Any]],
+    time_steps: int,
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Run `time_steps` steps of one fork of `model` per scenario, changing the
+    parameters given for it, yielding the data of each step for every scenario in
+    turn. The forks share the household columns that never change, which are read
+    by every scenario before the next step.
+    """
+
+    *forked_parameters, last_parameters = scenario_parameters
+    models = [model.fork(**parameters) for parameters in forked_parameters]
+    model.set_parameters(**last_parameters)
+    models.append(model)
+    yield from zip(*(run_model(fork, time_steps) for fork in models))
@@ -1,14 +1,25 @@
+import copy
 import datetime
+import functools
+import itertools
+import math
 import random
 from bisect import bisect
-from typing import Dict, Iterator, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 
-from abm import AgentBasedModel, UnorderedSpace
-from simulation.agents import Household
-from simulation.collectors import get_agent_collectors, get_model_collectors
+from abm import AgentBasedModel, AgentColumns, CollectorPlan, History, UnorderedSpace
+from simulation.agents import Household, proba_rule_out_banned_heating_systems
+from simulation.breakdowns import BreakdownCalendar, to_day
+from simulation.checkpoint import Checkpointer, read_checkpoint
+from simulation.collectors import (
+    get_agent_collectors,
+    get_model_collectors,
+    get_population_collectors,
+)
 from simulation.constants import (
     ENGLAND_WALES_HOUSEHOLD_COUNT_2020,
     HEAT_PUMP_INSTALLATION_DURATION_MONTHS,
@@ -23,6 +34,29 @@ from simulation.constants import (
     OccupantType,
     PropertyType,
 )
+from simulation.costs import (
+    BOILER_UPGRADE_SCHEME_FUNDING_CAP,
+    boiler_upgrade_scheme_grant_gbp,
+    extended_boiler_upgrade_scheme_funding_cap_gbp,
+    extended_boiler_upgrade_scheme_grant_gbp,
+)
+from simulation.population import (
+    HouseholdPopulation,
+    derive_household_attributes,
+    max_households_switching_to_heat_pump_aware,
+)
+from simulation.randomness import Randomness
+from simulation.sharding import (
+    SHARD_SIZE,
+    ShardPool,
+    get_shard,
+    prepare_heating_decisions,
+    propose_heat_pump_awareness,
+    remaining_in_order,
+    settle_heat_pump_awareness,
+    settle_heating_systems,
+    shard_bounds,
+)
 
 
 class DomesticHeatingABM(AgentBasedModel):
@@ -51,6 +85,7 @@ class DomesticHeatingABM(AgentBasedModel):
             List[Tuple[datetime.datetime, float]]
         ],
         population_heat_pump_awareness: List[bool],
+        breakdown_calendar: bool = False,
     ):
         self.start_datetime = start_datetime
         self.step_interval = step_interval
@@ -60,7 +95,9 @@ class DomesticHeatingABM(AgentBasedModel):
         self.heating_system_hassle_factor = heating_system_hassle_factor
         self.rented_heating_system_hassle_factor = rented_heating_system_hassle_factor
         self.interventions = interventions or []
+        # Grants awarded in earlier steps, and so far in this step
         self.boiler_upgrade_scheme_cumulative_spend_gbp = 0
+        self.boiler_upgrade_scheme_spend_at_current_step_gbp = 0
         self.gas_oil_boiler_ban_datetime = gas_oil_boiler_ban_datetime
         self.gas_oil_boiler_ban_announce_datetime = gas_oil_boiler_ban_announce_datetime
         self.fuel_price_gbp_per_kwh = {
@@ -87,8 +124,21 @@ class DomesticHeatingABM(AgentBasedModel):
         )
 
         self.population_heat_pump_awareness = population_heat_pump_awareness
-        self.num_households_heat_pump_aware = sum(population_heat_pump_awareness)
+        self.num_households_heat_pump_aware = int(
+            np.count_nonzero(population_heat_pump_awareness)
+        )
         self.num_households_switching_to_heat_pump_aware = 0
+        self.num_households_switching_to_heat_pump_aware_at_current_timestep = 0
+
+        # Drawn from the global generator, so `--seed` also seeds household decisions
+        self.randomness = Randomness(random.getrandbits(128))
+
+        # Population engines keep a calendar per population, this one only switches them on
+        self.breakdown_calendar = BreakdownCalendar() if breakdown_calendar else None
+        self.heating_failures: Set[int] = set()
+
+        # Policy inputs by step datetime, see `compile_policy_timeline`
+        self.policy_timeline: Dict[datetime.datetime, PolicyStep] = {}
 
         super().__init__(UnorderedSpace())
 
@@ -97,65 +147,282 @@ class DomesticHeatingABM(AgentBasedModel):
         return len(self.space.agents)
 
     @property
+    def policy(self) -> "PolicyStep":
+        policy = self.policy_timeline.get(self.current_datetime)
+        if policy is None:
+            policy = PolicyStep(self, self.current_datetime)
+            self.policy_timeline[self.current_datetime] = policy
+        return policy
+
+    def compile_policy_timeline(self, time_steps: int) -> None:
+        """Compute the policy inputs of the next `time_steps` steps."""
+
+        step_datetime = self.current_datetime
+        for _ in range(time_steps):
+            step_datetime += self.step_interval
+            if step_datetime not in self.policy_timeline:
+                self.policy_timeline[step_datetime] = PolicyStep(
+                    self, step_datetime
+                ).compile()
+
+    def set_parameters(self, **parameters: Any) -> None:
+        """
+        Change the constructor arguments in `FORKABLE_PARAMETERS`, which only
+        affect the steps to come.
+        """
+
+        for name, value in parameters.items():
+            if name not in FORKABLE_PARAMETERS:
+                raise ValueError(f"{name} cannot change part way through a run")
+            if name.startswith("price_gbp_per_kwh_"):
+                # Replaced rather than updated, as shallow copies share it
+                fuel = HeatingFuel[name[len("price_gbp_per_kwh_") :].upper()]
+                self.fuel_price_gbp_per_kwh = {
+                    **self.fuel_price_gbp_per_kwh,
+                    fuel: value,
+                }
+            elif name == "interventions":
+                self.interventions = value or []
+            elif name.endswith("_schedule"):
+                setattr(self, name, sorted(value) if value else None)
+            else:
+                setattr(self, name, value)
+        self.policy_timeline = {}
+
+    def fork(self, **parameters: Any) -> "DomesticHeatingABM":
+        """
+        A copy of the model, with its households and random streams, to continue
+        with `parameters` changed as in `set_parameters`. For a given seed the
+        copy runs as a model constructed with those parameters would have, as
+        long as they did not change households' decisions in the steps so far.
+        """
+
+        # The copy shares the columns that households never change
+        memo = {id(data): data for data in self.static_data()}
+        model = copy.deepcopy(self, memo)
+        model.set_parameters(**parameters)
+        return model
+
+    def static_data(self) -> List[Any]:
+        """Household data that never changes, which forks of the model can share."""
+
+        return []
+
+    @property
+    def heat_pump_installers(self) -> int:
+        return self.policy.heat_pump_installers
+
+    @property
+    def heat_pump_installation_capacity_per_step(self) -> int:
+        return self.policy.heat_pump_installation_capacity_per_step
+
+    @property
+    def new_builds_per_step(self) -> int:
+        return self.policy.new_builds_per_step
+
+    @property
+    def heat_pump_installation_capacity_per_step_new_builds(self) -> int:
+        return self.policy.heat_pump_installation_capacity_per_step_new_builds
+
+    @property
+    def heat_pump_installation_capacity_per_step_existing_builds(self) -> int:
+        return self.policy.heat_pump_installation_capacity_per_step_existing_builds
+
+    @property
+    def has_heat_pump_installation_capacity(self) -> bool:
+        return (
+            self.policy.heat_pump_installation_capacity_per_step_existing_builds
+            > self.heat_pump_installations_at_current_step
+        )
+
+    @property
+    def heating_systems(self) -> FrozenSet[HeatingSystem]:
+        return self.policy.heating_systems
+
+    @property
+    def air_source_heat_pump_discount_factor(self) -> float:
+        return self.policy.air_source_heat_pump_discount_factor
+
+    @property
+    def boiler_upgrade_scheme_spend_gbp(self) -> int:
+        return self.boiler_upgrade_scheme_spend_at_current_step_gbp
+
+    @property
+    def boiler_upgrade_scheme_spend_to_date_gbp(self) -> int:
+        return (
+            self.boiler_upgrade_scheme_cumulative_spend_gbp
+            + self.boiler_upgrade_scheme_spend_at_current_step_gbp
+        )
+
+    @property
+    def boiler_upgrade_scheme_remaining_budget_gbp(self) -> float:
+        if InterventionType.BOILER_UPGRADE_SCHEME in self.interventions:
+            funding_cap_gbp = self.policy.boiler_upgrade_scheme_funding_cap_gbp
+        elif InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME in self.interventions:
+            funding_cap_gbp = self.policy.extended_boiler_upgrade_scheme_funding_cap_gbp
+        else:
+            return 0
+        return max(funding_cap_gbp - self.boiler_upgrade_scheme_spend_to_date_gbp, 0)
+
+    def award_boiler_upgrade_grant(self, grant_gbp: int) -> None:
+        self.boiler_upgrade_scheme_spend_at_current_step_gbp += grant_gbp
+
+    @property
+    def heat_pump_awareness_at_timestep(self) -> float:
+        return (
+            self.num_households_heat_pump_aware
+            + self.num_households_switching_to_heat_pump_aware
+        ) / self.household_count
+
+    @property
+    def campaign_target_heat_pump_awareness(self) -> float:
+        return self.policy.campaign_target_heat_pump_awareness
+
+    def add_agent(self, agent: Household) -> None:
+        # The installer and new build policy inputs scale with the number of households
+        self.policy_timeline.clear()
+        agent.index = self.household_count
+        agent.randomness = self.randomness
+        if self.breakdown_calendar is not None:
+            agent.schedule_breakdown(self)
+        super().add_agent(agent)
+
+    def step(self) -> None:
+        self.randomness.draw_step(self.household_count)
+        if self.breakdown_calendar is not None:
+            self.heating_failures = set(
+                self.breakdown_calendar.pop_failures(
+                    to_day(self.current_datetime.date())
+                )
+            )
+        super().step()
+
+    def run(
+        self,
+        time_steps: int,
+        agent_callables: Optional[List[Callable[[Any], Any]]] = None,
+        model_callables: Optional[List[Callable[[Any], Any]]] = None,
+        checkpoint: Optional[Callable[[Any, int], None]] = None,
+    ) -> History:
+        self.compile_policy_timeline(time_steps)
+        yield from super().run(time_steps, agent_callables, model_callables, checkpoint)
+
+    def increment_timestep(self):
+        self.current_datetime += self.step_interval
+        self.boiler_upgrade_scheme_cumulative_spend_gbp += (
+            self.boiler_upgrade_scheme_spend_gbp
+        )
+        self.boiler_upgrade_scheme_spend_at_current_step_gbp = 0
+        self.heat_pump_installations_at_current_step = 0
+        self.num_households_switching_to_heat_pump_aware_at_current_timestep = 0
+
+
+class PolicyStep:
+    """
+    The policy inputs to households' decisions at one step of a model, which depend
+    only on the step's datetime and the number of households. Each is computed
+    when first read and then stored, so households read them in O(1).
+    """
+
+    def __init__(self, model: DomesticHeatingABM, at: datetime.datetime):
+        self.model = model
+        self.at = at
+
+    def compile(self) -> "PolicyStep":
+        for name in POLICY_INPUTS:
+            getattr(self, name)
+        return self
+
+    def decision_inputs(self) -> Tuple[Any, ...]:
+        """
+        Everything households' decisions read from the model at this step, other
+        than the model's state. Models constructed alike whose decision inputs are
+        equal at every step so far are in the same state.
+        """
+
+        model = self.model
+        return (
+            model.annual_renovation_rate,
+            model.household_num_lookahead_years,
+            model.heating_system_hassle_factor,
+            model.rented_heating_system_hassle_factor,
+            tuple(model.fuel_price_gbp_per_kwh[fuel] for fuel in HeatingFuel),
+            # The ban is only read through the policy inputs
+            frozenset(model.interventions) - {InterventionType.GAS_OIL_BOILER_BAN},
+            *(
+                getattr(self, name)
+                for name in POLICY_INPUTS
+                if name != "proba_rule_out_banned_heating_systems"
+            ),
+            # Which depends on the ban date, but is only read once the ban is announced
+            self.proba_rule_out_banned_heating_systems
+            if self.is_gas_oil_boiler_ban_announced
+            else None,
+        )
+
+    @functools.cached_property
     def heat_pump_installers(self) -> int:
 
-        years_elapsed = (self.current_datetime - self.start_datetime).days / 365
+        model = self.model
+        years_elapsed = (self.at - model.start_datetime).days / 365
         population_scale_factor = (
-            self.household_count / ENGLAND_WALES_HOUSEHOLD_COUNT_2020
+            model.household_count / ENGLAND_WALES_HOUSEHOLD_COUNT_2020
         )
 
         heat_pump_installers = max(
             int(
                 population_scale_factor
-                * self.heat_pump_installer_count
-                * (1 + self.heat_pump_installer_annual_growth_rate) ** years_elapsed
+                * model.heat_pump_installer_count
+                * (1 + model.heat_pump_installer_annual_growth_rate) ** years_elapsed
             ),
             1,
         )
 
         if (
-            self.household_count / heat_pump_installers
+            model.household_count / heat_pump_installers
             < HOUSEHOLDS_PER_HEAT_PUMP_INSTALLER_FLOOR
         ):
             return max(
-                int(self.household_count / HOUSEHOLDS_PER_HEAT_PUMP_INSTALLER_FLOOR), 1
+                int(model.household_count / HOUSEHOLDS_PER_HEAT_PUMP_INSTALLER_FLOOR),
+                1,
             )
 
         return heat_pump_installers
 
-    @property
+    @functools.cached_property
     def heat_pump_installation_capacity_per_step(self) -> int:
 
-        months_per_step = self.step_interval.months
+        months_per_step = self.model.step_interval.months
         installations_per_installer_per_step = (
             months_per_step / HEAT_PUMP_INSTALLATION_DURATION_MONTHS
         )
 
         return int(self.heat_pump_installers * installations_per_installer_per_step)
 
-    @property
+    @functools.cached_property
     def new_builds_per_step(self) -> int:
-        if self.annual_new_builds is None:
+        model = self.model
+        if model.annual_new_builds is None:
             return 0
 
-        current_year = self.current_datetime.year
-        months_per_step = self.step_interval.months
+        current_year = self.at.year
+        months_per_step = model.step_interval.months
         years_per_step = months_per_step / 12
-        new_builds_in_current_year = self.annual_new_builds.get(current_year, 0)
+        new_builds_in_current_year = model.annual_new_builds.get(current_year, 0)
         population_scale_factor = (
-            self.household_count / ENGLAND_WALES_HOUSEHOLD_COUNT_2020
+            model.household_count / ENGLAND_WALES_HOUSEHOLD_COUNT_2020
         )
         return int(
             new_builds_in_current_year * years_per_step * population_scale_factor
         )
 
-    @property
+    @functools.cached_property
     def heat_pump_installation_capacity_per_step_new_builds(self) -> int:
         # Heat pumps are not installed in new builds prior to 2025
-        current_year = self.current_datetime.year
+        current_year = self.at.year
         return 0 if current_year < 2025 else self.new_builds_per_step
 
-    @property
+    @functools.cached_property
     def heat_pump_installation_capacity_per_step_existing_builds(self) -> int:
         return max(
             self.heat_pump_installation_capacity_per_step
@@ -163,33 +430,25 @@ class DomesticHeatingABM(AgentBasedModel):
             0,
         )
 
-    @property
-    def has_heat_pump_installation_capacity(self) -> bool:
-        return (
-            self.heat_pump_installation_capacity_per_step_existing_builds
-            > self.heat_pump_installations_at_current_step
-        )
-
-    @property
-    def heating_systems(self) -> Set[HeatingSystem]:
+    @functools.cached_property
+    def heating_systems(self) -> FrozenSet[HeatingSystem]:
 
-        if InterventionType.GAS_OIL_BOILER_BAN in self.interventions:
-            if self.current_datetime > self.gas_oil_boiler_ban_datetime:
-                return set(HeatingSystem).difference(
+        if InterventionType.GAS_OIL_BOILER_BAN in self.model.interventions:
+            if self.at > self.model.gas_oil_boiler_ban_datetime:
+                return frozenset(HeatingSystem).difference(
                     [HeatingSystem.BOILER_GAS, HeatingSystem.BOILER_OIL]
                 )
-        return set(HeatingSystem)
+        return frozenset(HeatingSystem)
 
-    @property
+    @functools.cached_property
     def air_source_heat_pump_discount_factor(self) -> float:
 
-        if self.air_source_heat_pump_price_discount_schedule:
+        schedule = self.model.air_source_heat_pump_price_discount_schedule
+        if schedule:
 
-            step_dates, discount_factors = zip(
-                *self.air_source_heat_pump_price_discount_schedule
-            )
+            step_dates, discount_factors = zip(*schedule)
 
-            index = bisect(step_dates, self.current_datetime)
+            index = bisect(step_dates, self.at)
             current_date_precedes_first_discount_step = index == 0
 
             if current_date_precedes_first_discount_step:
@@ -198,48 +457,224 @@ class DomesticHeatingABM(AgentBasedModel):
 
         return 0
 
-    @property
-    def boiler_upgrade_scheme_spend_gbp(self) -> int:
-        return sum(
-            [
-                agent.boiler_upgrade_grant_used
-                for agent in self.space.agents
-                if isinstance(agent, Household)
-            ]
-        )
-
-    @property
-    def heat_pump_awareness_at_timestep(self) -> float:
-        return (
-            self.num_households_heat_pump_aware
-            + self.num_households_switching_to_heat_pump_aware
-        ) / self.household_count
-
-    @property
+    @functools.cached_property
     def campaign_target_heat_pump_awareness(self) -> float:
 
-        if self.heat_pump_awareness_campaign_schedule:
+        schedule = self.model.heat_pump_awareness_campaign_schedule
+        if schedule:
 
-            step_dates, awareness_factors = zip(
-                *self.heat_pump_awareness_campaign_schedule
-            )
+            step_dates, awareness_factors = zip(*schedule)
 
-            index = bisect(step_dates, self.current_datetime)
+            index = bisect(step_dates, self.at)
             current_date_precedes_first_campaign_date = index == 0
 
             if current_date_precedes_first_campaign_date:
-                return self.heat_pump_awareness
+                return self.model.heat_pump_awareness
             return awareness_factors[index - 1]
 
-        return self.heat_pump_awareness
+        return self.model.heat_pump_awareness
 
-    def increment_timestep(self):
-        self.current_datetime += self.step_interval
-        self.boiler_upgrade_scheme_cumulative_spend_gbp += (
-            self.boiler_upgrade_scheme_spend_gbp
+    @functools.cached_property
+    def is_gas_oil_boiler_ban_announced(self) -> bool:
+        return (
+            InterventionType.GAS_OIL_BOILER_BAN in self.model.interventions
+            and self.at >= self.model.gas_oil_boiler_ban_announce_datetime
         )
-        self.heat_pump_installations_at_current_step = 0
-        self.num_households_switching_to_heat_pump_aware_at_current_timestep = 0
+
+    @functools.cached_property
+    def is_gas_oil_boiler_ban_in_place(self) -> bool:
+        return (
+            InterventionType.GAS_OIL_BOILER_BAN in self.model.interventions
+            and self.at >= self.model.gas_oil_boiler_ban_datetime
+        )
+
+    @functools.cached_property
+    def model_population_scale(self) -> float:
+        household_count = self.model.household_count
+        if not household_count:
+            return math.inf
+        return ENGLAND_WALES_HOUSEHOLD_COUNT_2020 / household_count
+
+    @functools.cached_property
+    def boiler_upgrade_scheme_funding_cap_gbp(self) -> float:
+        return BOILER_UPGRADE_SCHEME_FUNDING_CAP / self.model_population_scale
+
+    @functools.cached_property
+    def boiler_upgrade_scheme_grant_gbp(self) -> int:
+        return boiler_upgrade_scheme_grant_gbp(self.at.date())
+
+    @functools.cached_property
+    def extended_boiler_upgrade_scheme_funding_cap_gbp(self) -> float:
+        return (
+            extended_boiler_upgrade_scheme_funding_cap_gbp(self.at.date())
+            / self.model_population_scale
+        )
+
+    @functools.cached_property
+    def extended_boiler_upgrade_scheme_grant_gbp(self) -> int:
+        return extended_boiler_upgrade_scheme_grant_gbp(self.at.date())
+
+    @functools.cached_property
+    def proba_rule_out_banned_heating_systems(self) -> float:
+        return proba_rule_out_banned_heating_systems(
+            self.model.gas_oil_boiler_ban_datetime, self.at
+        )
+
+
+POLICY_INPUTS = [
+    name
+    for name, value in vars(PolicyStep).items()
+    if isinstance(value, functools.cached_property)
+]
+
+# Constructor arguments that `DomesticHeatingABM.set_parameters` can change
+FORKABLE_PARAMETERS = (
+    "annual_renovation_rate",
+    "household_num_lookahead_years",
+    "heating_system_hassle_factor",
+    "rented_heating_system_hassle_factor",
+    "interventions",
+    "gas_oil_boiler_ban_datetime",
+    "gas_oil_boiler_ban_announce_datetime",
+    "price_gbp_per_kwh_gas",
+    "price_gbp_per_kwh_electricity",
+    "price_gbp_per_kwh_oil",
+    "air_source_heat_pump_price_discount_schedule",
+    "heat_pump_installer_count",
+    "heat_pump_installer_annual_growth_rate",
+    "annual_new_builds",
+    "heat_pump_awareness_campaign_schedule",
+)
+
+
+class ShardedHouseholdPopulationABM(DomesticHeatingABM):
+    """
+    `DomesticHeatingABM` whose households are split into `HouseholdPopulation`
+    shards, stepped in `workers` processes.
+
+    Each shard decides with its own random stream, or with its households'
+    common random numbers. Between phases the model
+    reconciles the state shared across shards (campaign switchers, heat pump
+    installation capacity and boiler upgrade scheme spend) in shard order, so
+    for a fixed seed and shard size the output is the same for any number of
+    workers.
+    """
+
+    # Model attributes sent to the workers before every phase
+    shared_state = (
+        "current_datetime",
+        "boiler_upgrade_scheme_cumulative_spend_gbp",
+        "boiler_upgrade_scheme_spend_at_current_step_gbp",
+        "heat_pump_installations_at_current_step",
+        "num_households_switching_to_heat_pump_aware",
+        "num_households_switching_to_heat_pump_aware_at_current_timestep",
+    )
+
+    def __init__(
+        self, shards: List[HouseholdPopulation], workers: int = 1, **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self.shards = shards
+        self.workers = workers
+        self.shard_pool: Optional[ShardPool] = None
+
+    @property
+    def household_count(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def static_data(self) -> List[Any]:
+        return [column for shard in self.shards for column in shard.static_columns()]
+
+    def step(self) -> None:
+        assert self.shard_pool is not None, "shards are only stepped within `run`"
+
+        candidates = self.shard_pool.map(propose_heat_pump_awareness)
+        max_switching = max_households_switching_to_heat_pump_aware(
+            self, sum(candidates)
+        )
+        switching = sum(
+            self.shard_pool.map(
+                settle_heat_pump_awareness,
+                [
+                    (remaining,)
+                    for remaining in remaining_in_order(candidates, max_switching)
+                ],
+            )
+        )
+        self.num_households_switching_to_heat_pump_aware += switching
+        self.num_households_switching_to_heat_pump_aware_at_current_timestep += (
+            switching
+        )
+
+        heat_pump_proposals, boiler_upgrade_grant_proposals = zip(
+            *self.shard_pool.map(prepare_heating_decisions)
+        )
+        heat_pump_installation_capacity = (
+            self.heat_pump_installation_capacity_per_step_existing_builds
+            - self.heat_pump_installations_at_current_step
+        )
+        heat_pump_installations, boiler_upgrade_scheme_spend = zip(
+            *self.shard_pool.map(
+                settle_heating_systems,
+                list(
+                    zip(
+                        remaining_in_order(
+                            heat_pump_proposals, heat_pump_installation_capacity
+                        ),
+                        remaining_in_order(
+                            boiler_upgrade_grant_proposals,
+                            self.boiler_upgrade_scheme_remaining_budget_gbp,
+                        ),
+                    )
+                ),
+            )
+        )
+        self.heat_pump_installations_at_current_step += sum(heat_pump_installations)
+        self.award_boiler_upgrade_grant(sum(boiler_upgrade_scheme_spend))
+
+    def collect_agent_data(self, plan: CollectorPlan) -> AgentColumns:
+        # Workers collect their shards with their own plan, compiled against their copy of the model
+        assert self.shard_pool is not None, "shards are only collected within `run`"
+
+        shard_columns = self.shard_pool.collect()
+        return AgentColumns(
+            {
+                name: list(
+                    itertools.chain.from_iterable(
+                        columns[name] for columns in shard_columns
+                    )
+                )
+                for name in shard_columns[0]
+            },
+            self.household_count,
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # During `run` the shards' current state is held by the shard pool's workers
+        state = self.__dict__.copy()
+        if self.shard_pool is not None:
+            state["shards"] = self.shard_pool.map(get_shard)
+        state["shard_pool"] = None
+        return state
+
+    def run(
+        self,
+        time_steps: int,
+        agent_callables: Optional[List[Callable[[Any], Any]]] = None,
+        model_callables: Optional[List[Callable[[Any], Any]]] = None,
+        checkpoint: Optional[Callable[[Any, int], None]] = None,
+    ) -> History:
+        # Workers are forked here so that they inherit the agent callables and policy timeline
+        self.compile_policy_timeline(time_steps)
+        with ShardPool(
+            self, self.shards, agent_callables or [], self.workers
+        ) as self.shard_pool:
+            yield from super().run(
+                time_steps, agent_callables, model_callables, checkpoint
+            )
+            # Taken back from the workers, so that the model can run on or be forked
+            self.shards = self.shard_pool.map(get_shard)
+        self.shard_pool = None
 
 
 def create_household_agents(
@@ -248,6 +683,9 @@ def create_household_agents(
     simulation_start_datetime: datetime.datetime,
     all_agents_heat_pump_suitable: bool,
 ) -> Iterator[Household]:
+    derived_attributes = derive_household_attributes(
+        household_population, all_agents_heat_pump_suitable
+    )
     for i, household in enumerate(household_population.itertuples()):
         yield Household(
             id=household.id,
@@ -278,9 +716,111 @@ def create_household_agents(
             if all_agents_heat_pump_suitable
             else household.is_heat_pump_suitable_archetype,
             is_heat_pump_aware=population_heat_pump_awareness[i],
+            derived_attributes=derived_attributes[i],
         )
 
 
+def create_simulation(
+    household_population: pd.DataFrame,
+    heat_pump_awareness: float,
+    all_agents_heat_pump_suitable: bool,
+    engine: str = "agents",
+    workers: int = 1,
+    common_random_numbers: bool = False,
+    **model_attributes: Any,
+) -> DomesticHeatingABM:
+
+    if engine == "population":
+        return create_population_simulation(
+            household_population,
+            heat_pump_awareness,
+            all_agents_heat_pump_suitable,
+            workers=workers,
+            common_random_numbers=common_random_numbers,
+            **model_attributes,
+        )
+
+    population_heat_pump_awareness = [
+        random.random() < heat_pump_awareness for _ in range(len(household_population))
+    ]
+
+    model = DomesticHeatingABM(
+        heat_pump_awareness=heat_pump_awareness,
+        population_heat_pump_awareness=population_heat_pump_awareness,
+        **model_attributes,
+    )
+
+    households = create_household_agents(
+        household_population,
+        population_heat_pump_awareness,
+        model.start_datetime,
+        all_agents_heat_pump_suitable,
+    )
+
+    model.add_agents(households)
+    return model
+
+
+def create_population_simulation(
+    household_population: pd.DataFrame,
+    heat_pump_awareness: float,
+    all_agents_heat_pump_suitable: bool,
+    workers: int = 1,
+    shard_size: int = SHARD_SIZE,
+    common_random_numbers: bool = False,
+    **model_attributes: Any,
+) -> ShardedHouseholdPopulationABM:
+    # Draw the shards' random streams from the global generator, so `--seed` also seeds this engine
+    seed_sequence = np.random.SeedSequence(random.getrandbits(128))
+    # Shared by every shard, as households' common random numbers are keyed by id
+    common_random_numbers_seed = (
+        random.getrandbits(64) if common_random_numbers else None
+    )
+    bounds = shard_bounds(len(household_population), shard_size)
+
+    shards = []
+    population_heat_pump_awareness = []
+    for shard_slice, shard_seed in zip(bounds, seed_sequence.spawn(len(bounds))):
+        rng = np.random.default_rng(shard_seed)
+        shard_population = household_population.iloc[shard_slice]
+        shard_heat_pump_awareness = (
+            rng.random(len(shard_population)) < heat_pump_awareness
+        )
+        shards.append(
+            HouseholdPopulation.from_dataframe(
+                shard_population,
+                shard_heat_pump_awareness,
+                model_attributes["start_datetime"],
+                all_agents_heat_pump_suitable,
+                rng,
+                common_random_numbers_seed,
+            )
+        )
+        population_heat_pump_awareness.append(shard_heat_pump_awareness)
+
+    return ShardedHouseholdPopulationABM(
+        shards=shards,
+        workers=workers,
+        heat_pump_awareness=heat_pump_awareness,
+        population_heat_pump_awareness=np.concatenate(population_heat_pump_awareness),
+        **model_attributes,
+    )
+
+
+def run_model(
+    model: DomesticHeatingABM,
+    time_steps: int,
+    checkpoint: Optional[Checkpointer] = None,
+) -> History:
+    if isinstance(model, ShardedHouseholdPopulationABM):
+        agent_collectors = get_population_collectors(model)
+    else:
+        agent_collectors = get_agent_collectors(model)
+    model_collectors = get_model_collectors(model)
+
+    return model.run(time_steps, agent_collectors, model_collectors, checkpoint)
+
+
 def create_and_run_simulation(
     start_datetime: datetime.datetime,
     step_interval: datetime.timedelta,
@@ -307,13 +847,18 @@ def create_and_run_simulation(
     heat_pump_awareness_campaign_schedule: Optional[
         List[Tuple[datetime.datetime, float]]
     ],
+    engine: str = "agents",
+    workers: int = 1,
+    checkpoint: Optional[Checkpointer] = None,
+    breakdown_calendar: bool = False,
 ):
 
-    population_heat_pump_awareness = [
-        random.random() < heat_pump_awareness for _ in range(len(household_population))
-    ]
-
-    model = DomesticHeatingABM(
+    model = create_simulation(
+        household_population,
+        heat_pump_awareness,
+        all_agents_heat_pump_suitable,
+        engine=engine,
+        workers=workers,
         start_datetime=start_datetime,
         step_interval=step_interval,
         annual_renovation_rate=annual_renovation_rate,
@@ -330,21 +875,30 @@ def create_and_run_simulation(
         heat_pump_installer_count=heat_pump_installer_count,
         heat_pump_installer_annual_growth_rate=heat_pump_installer_annual_growth_rate,
         annual_new_builds=annual_new_builds,
-        heat_pump_awareness=heat_pump_awareness,
         heat_pump_awareness_campaign_schedule=heat_pump_awareness_campaign_schedule,
-        population_heat_pump_awareness=population_heat_pump_awareness,
+        breakdown_calendar=breakdown_calendar,
     )
+    return run_model(model, time_steps, checkpoint)
 
-    households = create_household_agents(
-        household_population,
-        population_heat_pump_awareness,
-        model.start_datetime,
-        all_agents_heat_pump_suitable,
-    )
-
-    model.add_agents(households)
 
-    agent_collectors = get_agent_collectors(model)
-    model_collectors = get_model_collectors(model)
-
-    return model.run(time_steps, agent_collectors, model_collectors)
+def resume_simulation(
+    checkpoint_file: str,
+    time_steps: int,
+    workers: int = 1,
+    checkpoint: Optional[Checkpointer] = None,
+) -> Tuple[int, History]:
+    """
+    Continue a run from a checkpoint, up to `time_steps` steps in total. Returns
+    the number of steps already completed, and the history of the rest.
+    """
+
+    steps_completed, model = read_checkpoint(checkpoint_file)
+    if checkpoint is not None:
+        checkpoint.steps_completed = steps_completed
+
+    if isinstance(model, ShardedHouseholdPopulationABM):
+        # The output does not depend on the number of workers, so it can change on resume
+        model.workers = workers
+
+    history = run_model(model, time_steps - steps_completed, checkpoint)
+    return steps_completed, history
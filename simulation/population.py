@@ -0,0 +1,1132 @@
+import datetime
+from typing import TYPE_CHECKING, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from simulation.agents import (
+    DerivedAttributes,
+    proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target,
+    weibull_hazard_rate,
+)
+from simulation.breakdowns import BreakdownCalendar, sample_failure_day
+from simulation.constants import (
+    BOILERS,
+    DISCOUNT_RATE_WEIBULL_ALPHA,
+    DISCOUNT_RATE_WEIBULL_BETA,
+    FLOOR_AREA_SQM_33RD_PERCENTILE,
+    FLOOR_AREA_SQM_66TH_PERCENTILE,
+    GB_PROPERTY_VALUE_WEIBULL_ALPHA,
+    GB_PROPERTY_VALUE_WEIBULL_BETA,
+    GB_RENOVATION_BUDGET_WEIBULL_ALPHA,
+    GB_RENOVATION_BUDGET_WEIBULL_BETA,
+    HAZARD_RATE_HEATING_SYSTEM_ALPHA,
+    HAZARD_RATE_HEATING_SYSTEM_BETA,
+    HEAT_PUMP_CAPACITY_SCALE_FACTOR,
+    HEAT_PUMPS,
+    HEATING_KWH_PER_SQM_ANNUAL,
+    HEATING_PROPORTION_OF_RENO_BUDGET,
+    HEATING_SYSTEM_LIFETIME_YEARS,
+    MAX_HEAT_PUMP_CAPACITY_KW,
+    MIN_HEAT_PUMP_CAPACITY_KW,
+    RENO_NUM_INSULATION_ELEMENTS_UPGRADED,
+    RENO_PROBA_HEATING_SYSTEM_UPDATE,
+    RENO_PROBA_INSULATION_UPDATE,
+    RETROFIT_COSTS_SMALL_PROPERTY_SQM_LIMIT,
+    BuiltForm,
+    ConstructionYearBand,
+    Element,
+    EPCRating,
+    HeatingSystem,
+    InsulationSegment,
+    InterventionType,
+    OccupantType,
+    PropertySize,
+    PropertyType,
+)
+from simulation.costs import (
+    CAVITY_WALL_INSULATION_BOUNDS,
+    DECOMMISSIONING_COST_MAX,
+    DECOMMISSIONING_COST_MIN,
+    DOUBLE_GLAZING_UPVC_BOUNDS,
+    FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM,
+    HEATING_SYSTEMS,
+    INSULATION_SEGMENTS,
+    INTERNAL_WALL_INSULATION_BOUNDS,
+    IS_HEAT_PUMP,
+    LOFT_INSULATION_JOISTS_BOUNDS,
+    PROPERTY_SIZES,
+    HeatingSystemCosts,
+    estimate_rhi_annual_payment_matrix,
+    get_heating_fuel_cost_matrix,
+    get_insulation_cost_matrix,
+    get_subsidy_matrix,
+    get_unit_and_install_cost_matrix,
+)
+from simulation.randomness import CommonRandomNumbers, Stream
+
+if TYPE_CHECKING:
+    from simulation.model import DomesticHeatingABM
+
+# Enum values are contiguous from zero, so they double as column indices.
+ELEMENTS = sorted(Element, key=lambda element: element.value)
+
+IS_BOILER = np.array([system in BOILERS for system in HEATING_SYSTEMS])
+GAS_OIL_BOILERS = np.array(
+    [
+        system in {HeatingSystem.BOILER_GAS, HeatingSystem.BOILER_OIL}
+        for system in HEATING_SYSTEMS
+    ]
+)
+
+MAX_ENERGY_EFFICIENCY_SCORE = 5
+NO_CODE = -1
+
+RENO_NUM_INSULATION_ELEMENTS = np.array(list(RENO_NUM_INSULATION_ELEMENTS_UPGRADED))
+RENO_NUM_INSULATION_ELEMENTS_CUM_WEIGHTS = np.cumsum(
+    list(RENO_NUM_INSULATION_ELEMENTS_UPGRADED.values())
+)
+
+
+def _codes(values: pd.Series, enum_type) -> np.ndarray:
+    return np.array(
+        [enum_type[value.upper()].value if value else NO_CODE for value in values],
+        dtype=np.int8,
+    )
+
+
+def _step_interval_years(model: "DomesticHeatingABM") -> float:
+    return (model.step_interval.months + (12 * model.step_interval.years)) / 12
+
+
+def _sample_interval_uniformly(rng: np.random.Generator, bounds: np.ndarray):
+    return rng.integers(bounds[..., 0], bounds[..., 1], endpoint=True)
+
+
+def _integers_from_uniforms(uniforms: np.ndarray, low, high) -> np.ndarray:
+    # Integers in [low, high], as `_sample_interval_uniformly` draws
+    high = np.asarray(high)
+    integers = low + np.floor(uniforms * (high - low + 1)).astype(np.int64)
+    # Rounding can take uniforms just below 1 to the top of the range
+    return np.minimum(integers, high)
+
+
+def choose_heating_systems(
+    rng: np.random.Generator,
+    costs: np.ndarray,
+    heating_system_options: np.ndarray,
+    renovation_budget: np.ndarray,
+    is_hassle: np.ndarray,
+    hassle_factor: np.ndarray,
+    heating_system: np.ndarray,
+    uniforms: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Choose one of each row's heating system options, weighted by
+    exp(-cost / renovation budget), less the row's hassle factor where
+    `is_hassle`. Households for which all options are highly unaffordable (x10
+    out of budget) "repair" their existing heating system.
+
+    Sampled by taking the largest log weight plus Gumbel noise, so weights are
+    never exponentiated and cannot overflow however far out of budget a cost is.
+    The noise is drawn from `rng`, or transformed from `uniforms` if given.
+    """
+
+    log_weights = -costs / renovation_budget[:, None]
+    with np.errstate(divide="ignore"):
+        log_hassle = np.log1p(-hassle_factor)
+    log_weights = np.where(is_hassle, log_weights + log_hassle[:, None], log_weights)
+    log_weights = np.where(heating_system_options, log_weights, -np.inf)
+
+    is_repair = ~(log_weights >= -10).any(axis=1)
+
+    if uniforms is None:
+        gumbel = rng.gumbel(size=log_weights.shape)
+    else:
+        gumbel = -np.log(-np.log(uniforms))
+    chosen = np.argmax(log_weights + gumbel, axis=1)
+    return np.where(is_repair, heating_system, chosen).astype(np.int8)
+
+
+def wealth_percentile(property_value_gbp: np.ndarray) -> np.ndarray:
+
+    PERCENTILE_FLOOR = 0.001
+    PERCENTILE_CAP = 0.999
+
+    percentile = 1 - np.exp(
+        -(
+            (property_value_gbp / GB_PROPERTY_VALUE_WEIBULL_BETA)
+            ** GB_PROPERTY_VALUE_WEIBULL_ALPHA
+        )
+    )
+    return np.clip(percentile, PERCENTILE_FLOOR, PERCENTILE_CAP)
+
+
+def discount_rate(wealth_percentile: np.ndarray) -> np.ndarray:
+
+    DISCOUNT_RATE_CAP = 1
+    percentile = DISCOUNT_RATE_WEIBULL_BETA * (
+        -np.log(1 - (1 - wealth_percentile))
+    ) ** (1 / DISCOUNT_RATE_WEIBULL_ALPHA)
+
+    return np.minimum(percentile, DISCOUNT_RATE_CAP)
+
+
+def renovation_budget(wealth_percentile: np.ndarray) -> np.ndarray:
+
+    return HEATING_PROPORTION_OF_RENO_BUDGET * (
+        GB_RENOVATION_BUDGET_WEIBULL_BETA
+        * (-np.log(1 - wealth_percentile)) ** (1 / GB_RENOVATION_BUDGET_WEIBULL_ALPHA)
+    )
+
+
+def insulation_segment(
+    property_type: np.ndarray, built_form: np.ndarray, total_floor_area_m2: np.ndarray
+) -> np.ndarray:
+
+    is_house = property_type == PropertyType.HOUSE.value
+
+    def small_or_large(limit: str, small, large) -> np.ndarray:
+        return np.where(
+            total_floor_area_m2 < RETROFIT_COSTS_SMALL_PROPERTY_SQM_LIMIT[limit],
+            small.value,
+            large.value,
+        )
+
+    return np.select(
+        [
+            property_type == PropertyType.FLAT.value,
+            is_house & (built_form == BuiltForm.MID_TERRACE.value),
+            is_house
+            & np.isin(
+                built_form,
+                [BuiltForm.END_TERRACE.value, BuiltForm.SEMI_DETACHED.value],
+            ),
+            is_house & (built_form == BuiltForm.DETACHED.value),
+            property_type == PropertyType.BUNGALOW.value,
+        ],
+        [
+            small_or_large(
+                "FLAT",
+                InsulationSegment.SMALL_FLAT,
+                InsulationSegment.LARGE_FLAT,
+            ),
+            small_or_large(
+                "MID_TERRACE_HOUSE",
+                InsulationSegment.SMALL_MID_TERRACE_HOUSE,
+                InsulationSegment.LARGE_MID_TERRACE_HOUSE,
+            ),
+            small_or_large(
+                "SEMI_OR_END_TERRACE_HOUSE",
+                InsulationSegment.SMALL_SEMI_END_TERRACE_HOUSE,
+                InsulationSegment.LARGE_SEMI_END_TERRACE_HOUSE,
+            ),
+            small_or_large(
+                "SMALL_DETACHED_HOUSE",
+                InsulationSegment.SMALL_DETACHED_HOUSE,
+                InsulationSegment.LARGE_DETACHED_HOUSE,
+            ),
+            InsulationSegment.BUNGALOW.value,
+        ],
+        default=NO_CODE,
+    ).astype(np.int8)
+
+
+def property_size(total_floor_area_m2: np.ndarray) -> np.ndarray:
+
+    return np.select(
+        [
+            total_floor_area_m2 < FLOOR_AREA_SQM_33RD_PERCENTILE,
+            total_floor_area_m2 > FLOOR_AREA_SQM_66TH_PERCENTILE,
+        ],
+        [PropertySize.SMALL.value, PropertySize.LARGE.value],
+        default=PropertySize.MEDIUM.value,
+    ).astype(np.int8)
+
+
+def is_heat_pump_suitable(
+    is_heat_pump_suitable_archetype: np.ndarray, potential_epc_rating: np.ndarray
+) -> np.ndarray:
+    return is_heat_pump_suitable_archetype & (potential_epc_rating >= EPCRating.D.value)
+
+
+def heat_pump_capacity_kw(
+    heat_pump_type: HeatingSystem, total_floor_area_m2: np.ndarray
+) -> np.ndarray:
+
+    capacity_kw = HEAT_PUMP_CAPACITY_SCALE_FACTOR[heat_pump_type] * total_floor_area_m2
+    return np.ceil(
+        np.clip(
+            capacity_kw,
+            MIN_HEAT_PUMP_CAPACITY_KW[heat_pump_type],
+            MAX_HEAT_PUMP_CAPACITY_KW[heat_pump_type],
+        )
+    ).astype(int)
+
+
+def derive_household_attributes(
+    household_population: pd.DataFrame, all_agents_heat_pump_suitable: bool
+) -> List[DerivedAttributes]:
+    """`Household.update_derived_attributes` for every household at once."""
+
+    total_floor_area_m2 = household_population["total_floor_area_m2"].to_numpy()
+    households_wealth_percentile = wealth_percentile(
+        household_population["property_value_gbp"].to_numpy()
+    )
+    is_heat_pump_suitable_archetype = (
+        np.ones(len(household_population), dtype=bool)
+        if all_agents_heat_pump_suitable
+        else household_population["is_heat_pump_suitable_archetype"].to_numpy(
+            dtype=bool
+        )
+    )
+    segments = insulation_segment(
+        _codes(household_population["property_type"], PropertyType),
+        _codes(household_population["built_form"], BuiltForm),
+        total_floor_area_m2,
+    )
+
+    return [
+        DerivedAttributes(*attributes)
+        for attributes in zip(
+            households_wealth_percentile.tolist(),
+            discount_rate(households_wealth_percentile).tolist(),
+            renovation_budget(households_wealth_percentile).tolist(),
+            [
+                INSULATION_SEGMENTS[code] if code != NO_CODE else None
+                for code in segments
+            ],
+            [PROPERTY_SIZES[code] for code in property_size(total_floor_area_m2)],
+            is_heat_pump_suitable(
+                is_heat_pump_suitable_archetype,
+                _codes(household_population["potential_epc_rating"], EPCRating),
+            ).tolist(),
+            heat_pump_capacity_kw(
+                HeatingSystem.HEAT_PUMP_AIR_SOURCE, total_floor_area_m2
+            ).tolist(),
+            heat_pump_capacity_kw(
+                HeatingSystem.HEAT_PUMP_GROUND_SOURCE, total_floor_area_m2
+            ).tolist(),
+        )
+    ]
+
+
+class HouseholdPopulation:
+    """
+    Household state stored as NumPy columns, one row per household.
+
+    Columns mirror the attributes of `simulation.agents.Household`. Enum attributes
+    are stored as their integer values, with -1 standing in for None. Each step runs
+    the `Household.make_decisions` pipeline over the whole population at once.
+
+    Draws come from `rng` in turn, or from `common_random_numbers` if given, so that
+    each household's draws do not depend on those made before them.
+    """
+
+    # Columns that never change once constructed, which copies of a population can share
+    STATIC_COLUMNS = (
+        "id",
+        "location",
+        "property_type",
+        "occupant_type",
+        "built_form",
+        "total_floor_area_m2",
+        "property_value_gbp",
+        "is_solid_wall",
+        "construction_year_band",
+        "is_heat_pump_suitable_archetype",
+        "is_off_gas_grid",
+        "potential_epc_rating",
+        "wealth_percentile",
+        "discount_rate",
+        "renovation_budget",
+        "insulation_segment",
+        "property_size",
+        "is_heat_pump_suitable",
+        "heat_pump_capacity_kw",
+    )
+
+    def __init__(
+        self,
+        id: np.ndarray,
+        location: pd.Categorical,
+        property_value_gbp: np.ndarray,
+        total_floor_area_m2: np.ndarray,
+        is_off_gas_grid: np.ndarray,
+        construction_year_band: np.ndarray,
+        property_type: np.ndarray,
+        built_form: np.ndarray,
+        heating_system: np.ndarray,
+        heating_system_install_date: np.ndarray,
+        epc_rating: np.ndarray,
+        potential_epc_rating: np.ndarray,
+        occupant_type: np.ndarray,
+        is_solid_wall: np.ndarray,
+        walls_energy_efficiency: np.ndarray,
+        windows_energy_efficiency: np.ndarray,
+        roof_energy_efficiency: np.ndarray,
+        is_heat_pump_suitable_archetype: np.ndarray,
+        is_heat_pump_aware: np.ndarray,
+        rng: np.random.Generator,
+        common_random_numbers: Optional[CommonRandomNumbers] = None,
+    ):
+        self.rng = rng
+        self.common_random_numbers = common_random_numbers
+        self.id = id
+        # Property / tenure attributes
+        self.location = location
+        self.property_type = property_type
+        self.occupant_type = occupant_type
+        self.built_form = built_form
+        self.total_floor_area_m2 = total_floor_area_m2
+        self.property_value_gbp = property_value_gbp
+        self.is_solid_wall = is_solid_wall
+        self.construction_year_band = construction_year_band
+        self.is_heat_pump_suitable_archetype = is_heat_pump_suitable_archetype
+
+        # Heating / energy performance attributes
+        self.is_off_gas_grid = is_off_gas_grid
+        self.heating_functioning = np.ones(len(id), dtype=bool)
+        self.heating_system = heating_system
+        self.heating_system_previous = np.full(len(id), NO_CODE, dtype=np.int8)
+        self.heating_system_install_date = heating_system_install_date
+        self.epc_rating = epc_rating
+        self.potential_epc_rating = potential_epc_rating
+        self.walls_energy_efficiency = walls_energy_efficiency
+        self.roof_energy_efficiency = roof_energy_efficiency
+        self.windows_energy_efficiency = windows_energy_efficiency
+        self.is_heat_pump_aware = IS_HEAT_PUMP[heating_system] | is_heat_pump_aware
+
+        # Household investment decision attributes
+        self.is_renovating = np.zeros(len(id), dtype=bool)
+        self.renovate_insulation = np.zeros(len(id), dtype=bool)
+        self.renovate_heating_system = np.zeros(len(id), dtype=bool)
+        self.heat_pump_awareness_candidates = np.empty(0, dtype=np.int64)
+        self.reset_previous_heating_decision_log()
+
+        # Created on the first step if the model samples breakdowns in advance
+        self.breakdown_calendar: Optional[BreakdownCalendar] = None
+
+        # Attributes derived from static household attributes, computed once
+        self.wealth_percentile = wealth_percentile(property_value_gbp)
+        self.discount_rate = discount_rate(self.wealth_percentile)
+        self.renovation_budget = renovation_budget(self.wealth_percentile)
+        self.insulation_segment = insulation_segment(
+            property_type, built_form, total_floor_area_m2
+        )
+        self.property_size = property_size(total_floor_area_m2)
+        self.is_heat_pump_suitable = is_heat_pump_suitable(
+            is_heat_pump_suitable_archetype, potential_epc_rating
+        )
+        self.heat_pump_capacity_kw = {
+            heat_pump_type: heat_pump_capacity_kw(heat_pump_type, total_floor_area_m2)
+            for heat_pump_type in HEAT_PUMPS
+        }
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        household_population: pd.DataFrame,
+        population_heat_pump_awareness: np.ndarray,
+        simulation_start_datetime: datetime.datetime,
+        all_agents_heat_pump_suitable: bool,
+        rng: np.random.Generator,
+        common_random_numbers_seed: Optional[int] = None,
+    ) -> "HouseholdPopulation":
+        household_count = len(household_population)
+        heating_system_age_days = rng.integers(
+            0, 365 * HEATING_SYSTEM_LIFETIME_YEARS, size=household_count, endpoint=True
+        )
+
+        def efficiency(column: str) -> np.ndarray:
+            return pd.to_numeric(household_population[column]).to_numpy(
+                dtype=float, na_value=np.nan
+            )
+
+        return cls(
+            id=household_population["id"].to_numpy(),
+            location=pd.Categorical(household_population["location"]),
+            property_value_gbp=household_population["property_value_gbp"].to_numpy(),
+            total_floor_area_m2=household_population["total_floor_area_m2"].to_numpy(),
+            is_off_gas_grid=household_population["is_off_gas_grid"].to_numpy(
+                dtype=bool
+            ),
+            construction_year_band=_codes(
+                household_population["construction_year_band"], ConstructionYearBand
+            ),
+            property_type=_codes(household_population["property_type"], PropertyType),
+            built_form=_codes(household_population["built_form"], BuiltForm),
+            heating_system=_codes(
+                household_population["heating_system"], HeatingSystem
+            ),
+            heating_system_install_date=np.datetime64(
+                simulation_start_datetime.date(), "D"
+            )
+            - heating_system_age_days.astype("timedelta64[D]"),
+            epc_rating=_codes(household_population["epc_rating"], EPCRating),
+            potential_epc_rating=_codes(
+                household_population["potential_epc_rating"], EPCRating
+            ),
+            occupant_type=_codes(household_population["occupant_type"], OccupantType),
+            is_solid_wall=household_population["is_solid_wall"].to_numpy(dtype=bool),
+            walls_energy_efficiency=efficiency("walls_energy_efficiency"),
+            windows_energy_efficiency=efficiency("windows_energy_efficiency"),
+            roof_energy_efficiency=efficiency("roof_energy_efficiency"),
+            is_heat_pump_suitable_archetype=(
+                np.ones(household_count, dtype=bool)
+                if all_agents_heat_pump_suitable
+                else household_population["is_heat_pump_suitable_archetype"].to_numpy(
+                    dtype=bool
+                )
+            ),
+            is_heat_pump_aware=np.asarray(population_heat_pump_awareness, dtype=bool),
+            rng=rng,
+            common_random_numbers=None
+            if common_random_numbers_seed is None
+            else CommonRandomNumbers(
+                common_random_numbers_seed, household_population["id"].to_numpy()
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def static_columns(self) -> List[Any]:
+        columns = [getattr(self, name) for name in self.STATIC_COLUMNS]
+        if self.common_random_numbers is not None:
+            columns.append(self.common_random_numbers.household_key)
+        return columns
+
+    def random(
+        self, stream: Stream, index: np.ndarray, columns: Optional[int] = None
+    ) -> np.ndarray:
+        """Uniforms for the households at `index`, `columns` each if given."""
+
+        if self.common_random_numbers is not None:
+            return self.common_random_numbers.random(stream, index, columns)
+        return self.rng.random(len(index) if columns is None else (len(index), columns))
+
+    @property
+    def annual_kwh_heating_demand(self) -> np.ndarray:
+        return (
+            self.total_floor_area_m2 * HEATING_KWH_PER_SQM_ANNUAL
+        ) / FUEL_KWH_TO_HEAT_KWH_BY_SYSTEM[self.heating_system]
+
+    def compute_heat_pump_capacity_kw(
+        self, heat_pump_type: HeatingSystem, index: np.ndarray
+    ) -> np.ndarray:
+        return self.heat_pump_capacity_kw[heat_pump_type][index]
+
+    def reset_previous_heating_decision_log(self) -> None:
+
+        # Decision logs are only held for the households deciding in the current step
+        self.decision_index = np.empty(0, dtype=np.int64)
+        self.heating_system_costs_unit_and_install = np.empty((0, len(HeatingSystem)))
+        self.heating_system_costs_fuel = np.empty((0, len(HeatingSystem)))
+        self.heating_system_costs_subsidies = np.empty((0, len(HeatingSystem)))
+        self.heating_system_costs_insulation = np.empty((0, len(HeatingSystem)))
+        self.insulation_element_upgrade_costs = np.empty((0, len(Element)))
+        self.boiler_upgrade_grant_used = np.zeros(len(self), dtype=np.int64)
+
+        # Heating decisions proposed but not yet installed
+        self.heating_system_options = np.empty((0, len(HeatingSystem)), dtype=bool)
+        self.heating_system_replacement_costs = np.empty((0, len(HeatingSystem)))
+        self.boiler_upgrade_grant_available = np.empty(0, dtype=bool)
+        self.chosen_insulation_elements = np.empty((0, len(Element)), dtype=bool)
+        self.chosen_heating_system = np.empty(0, dtype=np.int8)
+
+    def propose_heat_pump_awareness(self, model: "DomesticHeatingABM") -> int:
+        """Draw the households the campaign would make aware, before the target is applied."""
+
+        # The first phase of every step, in both the sharded and unsharded model
+        if self.common_random_numbers is not None:
+            self.common_random_numbers.start_step(model.current_datetime)
+
+        with model.phase_timings.time("update_heat_pump_awareness", len(self)):
+            self.heat_pump_awareness_candidates = np.empty(0, dtype=np.int64)
+            if (
+                InterventionType.HEAT_PUMP_CAMPAIGN not in model.interventions
+                or model.heat_pump_awareness_at_timestep
+                >= model.campaign_target_heat_pump_awareness
+            ):
+                return 0
+
+            unaware = np.flatnonzero(~self.is_heat_pump_aware)
+            proba_to_become_heat_pump_aware = (
+                proba_of_becoming_heat_pump_aware_required_to_reach_campaign_target(
+                    model
+                )
+            )
+            self.heat_pump_awareness_candidates = unaware[
+                self.random(Stream.HEAT_PUMP_AWARENESS, unaware)
+                < proba_to_become_heat_pump_aware
+            ]
+        return len(self.heat_pump_awareness_candidates)
+
+    def settle_heat_pump_awareness(self, max_switching: int) -> int:
+        switching = self.heat_pump_awareness_candidates[:max_switching]
+        self.is_heat_pump_aware[switching] = True
+        return len(switching)
+
+    def update_heat_pump_awareness(self, model: "DomesticHeatingABM") -> None:
+        candidates = self.propose_heat_pump_awareness(model)
+        switching = self.settle_heat_pump_awareness(
+            max_households_switching_to_heat_pump_aware(model, candidates)
+        )
+        model.num_households_switching_to_heat_pump_aware += switching
+        model.num_households_switching_to_heat_pump_aware_at_current_timestep += (
+            switching
+        )
+
+    def update_heating_status(self, model: "DomesticHeatingABM") -> None:
+
+        self.reset_previous_heating_decision_log()
+
+        with model.phase_timings.time("update_heating_status", len(self)):
+            if model.breakdown_calendar is not None:
+                self.update_heating_status_from_calendar(model)
+                return
+
+            heating_system_age_years = (
+                np.datetime64(model.current_datetime.date(), "D")
+                - self.heating_system_install_date
+            ).astype(int) / 365
+            probability_density = weibull_hazard_rate(
+                HAZARD_RATE_HEATING_SYSTEM_ALPHA,
+                HAZARD_RATE_HEATING_SYSTEM_BETA,
+                heating_system_age_years,
+            )
+            proba_failure = probability_density * _step_interval_years(model)
+            self.heating_functioning = ~(
+                self.random(Stream.HEATING_STATUS, np.arange(len(self))) < proba_failure
+            )
+
+    def schedule_breakdowns(
+        self,
+        model: "DomesticHeatingABM",
+        index: np.ndarray,
+        stream: Stream = Stream.BREAKDOWN_DAY,
+    ) -> None:
+        assert self.breakdown_calendar is not None
+        install_date = self.heating_system_install_date[index]
+        age_days = (
+            np.datetime64(model.current_datetime.date(), "D") - install_date
+        ).astype(int)
+        failure_day = sample_failure_day(
+            age_days,
+            install_date.astype(int),
+            self.random(stream, index),
+        )
+        self.breakdown_calendar.schedule(index.tolist(), failure_day.tolist())
+
+    def update_heating_status_from_calendar(self, model: "DomesticHeatingABM") -> None:
+        if self.breakdown_calendar is None:
+            self.breakdown_calendar = BreakdownCalendar()
+            self.schedule_breakdowns(
+                model, np.arange(len(self)), Stream.FIRST_BREAKDOWN_DAY
+            )
+
+        failures = self.breakdown_calendar.pop_failures(
+            np.datetime64(model.current_datetime.date(), "D").astype(int)
+        )
+        self.heating_functioning = np.ones(len(self), dtype=bool)
+        self.heating_functioning[failures] = False
+
+    def evaluate_renovation(self, model: "DomesticHeatingABM") -> None:
+        with model.phase_timings.time("evaluate_renovation", len(self)):
+            proba_renovate = model.annual_renovation_rate * _step_interval_years(model)
+            index = np.arange(len(self))
+            self.is_renovating = self.random(Stream.RENOVATION, index) < proba_renovate
+            self.renovate_heating_system = self.is_renovating & (
+                self.random(Stream.RENOVATE_HEATING_SYSTEM, index)
+                < RENO_PROBA_HEATING_SYSTEM_UPDATE
+            )
+            self.renovate_insulation = self.is_renovating & (
+                self.random(Stream.RENOVATE_INSULATION, index)
+                < RENO_PROBA_INSULATION_UPDATE
+            )
+
+    def energy_efficiency(self, index: np.ndarray) -> np.ndarray:
+        efficiency = {
+            Element.ROOF: self.roof_energy_efficiency,
+            Element.GLAZING: self.windows_energy_efficiency,
+            Element.WALLS: self.walls_energy_efficiency,
+        }
+        return np.stack([efficiency[element][index] for element in ELEMENTS], axis=1)
+
+    def get_quote_insulation_elements(self, index: np.ndarray) -> np.ndarray:
+        """
+        Quotes for each element, in `Element` value order. Elements that cannot be
+        upgraded are quoted at NaN.
+        """
+
+        segment = self.insulation_segment[index]
+        wall_bounds = np.where(
+            self.is_solid_wall[index, None],
+            INTERNAL_WALL_INSULATION_BOUNDS[segment],
+            CAVITY_WALL_INSULATION_BOUNDS[segment],
+        )
+        bounds = {
+            Element.ROOF: LOFT_INSULATION_JOISTS_BOUNDS[segment],
+            Element.GLAZING: DOUBLE_GLAZING_UPVC_BOUNDS[segment],
+            Element.WALLS: wall_bounds,
+        }
+        if self.common_random_numbers is None:
+            quotes = np.stack(
+                [
+                    _sample_interval_uniformly(self.rng, bounds[element])
+                    for element in ELEMENTS
+                ],
+                axis=1,
+            ).astype(float)
+        else:
+            uniforms = self.common_random_numbers.random(
+                Stream.INSULATION_QUOTE, index, len(ELEMENTS)
+            )
+            quotes = np.stack(
+                [
+                    _integers_from_uniforms(
+                        uniforms[:, element.value],
+                        bounds[element][..., 0],
+                        bounds[element][..., 1],
+                    )
+                    for element in ELEMENTS
+                ],
+                axis=1,
+            ).astype(float)
+
+        efficiency = self.energy_efficiency(index)
+        is_upgradable = ~np.isnan(efficiency) & (
+            efficiency < MAX_ENERGY_EFFICIENCY_SCORE
+        )
+        return np.where(is_upgradable, quotes, np.nan)
+
+    def choose_insulation_elements(
+        self, insulation_quotes: np.ndarray, num_elements: np.ndarray
+    ) -> np.ndarray:
+        """Mask of the cheapest `num_elements` upgradable elements per household."""
+
+        ranks = np.argsort(
+            np.argsort(np.nan_to_num(insulation_quotes, nan=np.inf), kind="stable"),
+            kind="stable",
+        )
+        return (ranks < num_elements[:, None]) & ~np.isnan(insulation_quotes)
+
+    def install_insulation_elements(
+        self, index: np.ndarray, insulation_elements: np.ndarray
+    ) -> None:
+
+        efficiency = {
+            Element.ROOF: self.roof_energy_efficiency,
+            Element.GLAZING: self.windows_energy_efficiency,
+            Element.WALLS: self.walls_energy_efficiency,
+        }
+        for element in ELEMENTS:
+            upgraded = index[insulation_elements[:, element.value]]
+            efficiency[element][upgraded] = MAX_ENERGY_EFFICIENCY_SCORE
+
+        n_measures = insulation_elements.sum(axis=1)
+        self.epc_rating[index] = np.minimum(
+            self.epc_rating[index] + n_measures, self.potential_epc_rating[index]
+        )
+
+    def renovate_insulation_elements(self) -> None:
+        index = np.flatnonzero(self.renovate_insulation)
+        insulation_quotes = self.get_quote_insulation_elements(index)
+        num_elements = RENO_NUM_INSULATION_ELEMENTS[
+            np.searchsorted(
+                RENO_NUM_INSULATION_ELEMENTS_CUM_WEIGHTS,
+                self.random(Stream.INSULATION_ELEMENTS, index)
+                * RENO_NUM_INSULATION_ELEMENTS_CUM_WEIGHTS[-1],
+                side="right",
+            )
+        ]
+        chosen_elements = self.choose_insulation_elements(
+            insulation_quotes, num_elements
+        )
+        self.install_insulation_elements(index, chosen_elements)
+
+    def get_heating_system_options(
+        self,
+        model: "DomesticHeatingABM",
+        index: np.ndarray,
+        is_breakdown: np.ndarray,
+    ) -> np.ndarray:
+        """Mask of heating system options, excluding heat pump installation capacity."""
+
+        heating_system_options = np.tile(
+            [system in model.heating_systems for system in HEATING_SYSTEMS],
+            (len(index), 1),
+        )
+
+        is_gas_oil_boiler_ban_announced = model.policy.is_gas_oil_boiler_ban_announced
+
+        heating_system_options[
+            np.ix_(~self.is_heat_pump_suitable[index], IS_HEAT_PUMP)
+        ] = False
+
+        if is_gas_oil_boiler_ban_announced:
+            exclude_gas_oil_boilers = (
+                self.random(Stream.RULE_OUT_BANNED_HEATING_SYSTEMS, index)
+                < model.policy.proba_rule_out_banned_heating_systems
+            )
+            heating_system_options[
+                np.ix_(exclude_gas_oil_boilers, GAS_OIL_BOILERS)
+            ] = False
+
+        if not model.policy.is_gas_oil_boiler_ban_in_place:
+            # if a gas/boiler ban is in place, we assume all households are aware of heat pumps
+            heating_system_options[
+                np.ix_(~self.is_heat_pump_aware[index], IS_HEAT_PUMP)
+            ] = False
+
+        is_off_gas_grid = self.is_off_gas_grid[index]
+        heating_system_options[is_off_gas_grid, HeatingSystem.BOILER_GAS.value] = False
+        heating_system_options[~is_off_gas_grid, HeatingSystem.BOILER_OIL.value] = False
+
+        heating_system_options[
+            self.property_size[index] != PropertySize.SMALL.value,
+            HeatingSystem.BOILER_ELECTRIC.value,
+        ] = False
+
+        # heat pumps are unfeasible in a breakdown due to installation lead times
+        # exceptions: household already has a heat pump, or a gas/oil boiler ban is announced
+        if not is_gas_oil_boiler_ban_announced:
+            is_current_heating_system = (
+                np.arange(len(HeatingSystem)) == self.heating_system[index, None]
+            )
+            heating_system_options &= ~(
+                is_breakdown[:, None] & IS_HEAT_PUMP & ~is_current_heating_system
+            )
+
+        return heating_system_options
+
+    def get_unit_and_install_costs(
+        self, model: "DomesticHeatingABM", index: np.ndarray
+    ) -> np.ndarray:
+
+        if self.common_random_numbers is None:
+            decommissioning_costs = self.rng.integers(
+                DECOMMISSIONING_COST_MIN,
+                DECOMMISSIONING_COST_MAX,
+                size=(len(index), len(HeatingSystem)),
+                endpoint=True,
+            )
+        else:
+            decommissioning_costs = _integers_from_uniforms(
+                self.common_random_numbers.random(
+                    Stream.DECOMMISSIONING_COST, index, len(HeatingSystem)
+                ),
+                DECOMMISSIONING_COST_MIN,
+                DECOMMISSIONING_COST_MAX,
+            )
+        return get_unit_and_install_cost_matrix(
+            self.heating_system[index],
+            self.property_size[index],
+            self.compute_heat_pump_capacity_kw(
+                HeatingSystem.HEAT_PUMP_AIR_SOURCE, index
+            ),
+            self.compute_heat_pump_capacity_kw(
+                HeatingSystem.HEAT_PUMP_GROUND_SOURCE, index
+            ),
+            decommissioning_costs,
+            model,
+        )
+
+    def get_heating_fuel_costs(
+        self, model: "DomesticHeatingABM", index: np.ndarray
+    ) -> np.ndarray:
+
+        net_present_value = get_heating_fuel_cost_matrix(
+            self.heating_system[index],
+            self.annual_kwh_heating_demand[index],
+            self.discount_rate[index],
+            model,
+        )
+
+        # Fuel bills are generally paid by tenants; landlords/rented households will not consider fuel bill differences
+        is_owner_occupied = (
+            self.occupant_type[index] == OccupantType.OWNER_OCCUPIED.value
+        )
+        return np.where(is_owner_occupied[:, None], net_present_value, 0)
+
+    def estimate_rhi_annual_payment(self, index: np.ndarray) -> np.ndarray:
+        return estimate_rhi_annual_payment_matrix(
+            self.heating_system[index], self.annual_kwh_heating_demand[index]
+        )
+
+    def get_subsidies(
+        self, model: "DomesticHeatingABM", index: np.ndarray
+    ) -> np.ndarray:
+        return get_subsidy_matrix(
+            self.heating_system[index],
+            self.annual_kwh_heating_demand[index],
+            self.discount_rate[index],
+            model,
+        )
+
+    def get_heating_system_costs(
+        self,
+        model: "DomesticHeatingABM",
+        index: np.ndarray,
+        chosen_insulation_costs: np.ndarray,
+    ) -> HeatingSystemCosts:
+        return HeatingSystemCosts(
+            unit_and_install=self.get_unit_and_install_costs(model, index),
+            fuel=self.get_heating_fuel_costs(model, index),
+            subsidies=-self.get_subsidies(model, index),
+            insulation=get_insulation_cost_matrix(chosen_insulation_costs),
+        )
+
+    def choose_heating_system(
+        self,
+        index: np.ndarray,
+        costs: np.ndarray,
+        heating_system_options: np.ndarray,
+        heating_system_hassle_factor: float,
+        rented_heating_system_hassle_factor: float,
+    ) -> np.ndarray:
+
+        heating_system = self.heating_system[index]
+        is_rented = np.isin(
+            self.occupant_type[index],
+            [OccupantType.RENTED_PRIVATE.value, OccupantType.RENTED_SOCIAL.value],
+        )
+        hassle_factor = np.where(
+            is_rented, rented_heating_system_hassle_factor, heating_system_hassle_factor
+        )
+        is_hassle = ~IS_BOILER & (
+            np.arange(len(HeatingSystem)) != heating_system[:, None]
+        )
+
+        return choose_heating_systems(
+            self.rng,
+            costs,
+            heating_system_options,
+            self.renovation_budget[index],
+            is_hassle,
+            hassle_factor,
+            heating_system,
+            uniforms=None
+            if self.common_random_numbers is None
+            else self.common_random_numbers.random(
+                Stream.HEATING_SYSTEM_CHOICE, index, len(HeatingSystem)
+            ),
+        )
+
+    def install_heating_system(
+        self,
+        model: "DomesticHeatingABM",
+        index: np.ndarray,
+        heating_system: np.ndarray,
+        boiler_upgrade_grant_available: np.ndarray,
+        boiler_upgrade_scheme_budget_gbp: float,
+    ) -> None:
+
+        self.heating_system_previous[index] = self.heating_system[index]
+        self.heating_system[index] = heating_system
+        self.heating_system_install_date[index] = np.datetime64(
+            model.current_datetime.date(), "D"
+        )
+        if self.breakdown_calendar is not None:
+            self.schedule_breakdowns(model, index)
+        granted = index[boiler_upgrade_grant_available & IS_HEAT_PUMP[heating_system]]
+        # Households are granted in decision order until the scheme's budget runs out
+        granted = granted[
+            7_500 * np.arange(len(granted)) < boiler_upgrade_scheme_budget_gbp
+        ]
+        self.boiler_upgrade_grant_used[granted] = 7_500
+
+    def proposed_boiler_upgrade_scheme_spend_gbp(self) -> int:
+        """Grants for the heat pumps chosen by `propose_heating_systems`."""
+
+        return 7_500 * int(
+            (
+                self.boiler_upgrade_grant_available
+                & IS_HEAT_PUMP[self.chosen_heating_system]
+            ).sum()
+        )
+
+    def propose_heating_systems(
+        self, model: "DomesticHeatingABM", index: np.ndarray
+    ) -> int:
+        """
+        Choose heating systems for the households at `index`, ignoring how much
+        heat pump installation capacity is left. Returns the number of heat pumps
+        chosen; nothing is installed until `settle_heating_systems`.
+        """
+
+        timings = model.phase_timings
+        with timings.time("filter_heating_system_options", len(index)):
+            heating_system_options = self.get_heating_system_options(
+                model, index, is_breakdown=~self.heating_functioning[index]
+            )
+
+        with timings.time("evaluate_heating_system_costs", len(index)):
+            # The number of insulation elements a household would require to reach epc_rating C
+            # We assume each insulation measure will contribute +1 EPC grade
+            insulation_quotes = self.get_quote_insulation_elements(index)
+            chosen_insulation_elements = self.choose_insulation_elements(
+                insulation_quotes,
+                np.maximum(0, EPCRating.D.value - self.epc_rating[index]),
+            )
+            chosen_insulation_costs = np.where(
+                chosen_insulation_elements, insulation_quotes, np.nan
+            )
+
+            costs = self.get_heating_system_costs(model, index, chosen_insulation_costs)
+
+        boiler_upgrade_grant_available = np.zeros(len(index), dtype=bool)
+        if (
+            InterventionType.BOILER_UPGRADE_SCHEME in model.interventions
+            or InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME in model.interventions
+        ):
+            boiler_upgrade_grant_available = (
+                heating_system_options & (costs.subsidies < 0)
+            ).any(axis=1)
+
+        if not model.has_heat_pump_installation_capacity:
+            heating_system_options &= ~IS_HEAT_PUMP
+
+        self.decision_index = index
+        self.heating_system_options = heating_system_options
+        self.heating_system_replacement_costs = costs.total
+        self.boiler_upgrade_grant_available = boiler_upgrade_grant_available
+        self.chosen_insulation_elements = chosen_insulation_elements
+        self.heating_system_costs_unit_and_install = costs.unit_and_install
+        self.heating_system_costs_fuel = costs.fuel
+        self.heating_system_costs_subsidies = costs.subsidies
+        self.heating_system_costs_insulation = costs.insulation
+        self.insulation_element_upgrade_costs = chosen_insulation_costs
+
+        with timings.time("choose_heating_system", len(index)):
+            self.chosen_heating_system = self.choose_heating_system(
+                index,
+                self.heating_system_replacement_costs,
+                heating_system_options,
+                model.heating_system_hassle_factor,
+                model.rented_heating_system_hassle_factor,
+            )
+        return int(IS_HEAT_PUMP[self.chosen_heating_system].sum())
+
+    def settle_heating_systems(
+        self,
+        model: "DomesticHeatingABM",
+        heat_pump_installation_capacity: int,
+        boiler_upgrade_scheme_budget_gbp: float,
+    ) -> int:
+        """
+        Install the heating systems chosen by `propose_heating_systems`, given the
+        heat pump installation capacity and boiler upgrade scheme budget left for
+        this population. Returns the number of heat pumps installed.
+        """
+
+        index = self.decision_index
+        heating_system_options = self.heating_system_options
+        chosen_heating_system = self.chosen_heating_system
+
+        # Households decide in order, so once installations reach capacity part way
+        # through the step, later households no longer consider heat pumps
+        heat_pump_installations = np.flatnonzero(IS_HEAT_PUMP[chosen_heating_system])
+        heat_pump_installation_capacity = max(heat_pump_installation_capacity, 0)
+        if len(heat_pump_installations) > heat_pump_installation_capacity:
+            capacity_reached = (
+                heat_pump_installations[heat_pump_installation_capacity - 1] + 1
+                if heat_pump_installation_capacity
+                else 0
+            )
+            heating_system_options[capacity_reached:] &= ~IS_HEAT_PUMP
+            # These households entered the phase when they first chose
+            with model.phase_timings.time("choose_heating_system", 0):
+                chosen_heating_system = np.where(
+                    np.arange(len(index)) < capacity_reached,
+                    chosen_heating_system,
+                    self.choose_heating_system(
+                        index,
+                        self.heating_system_replacement_costs,
+                        heating_system_options,
+                        model.heating_system_hassle_factor,
+                        model.rented_heating_system_hassle_factor,
+                    ),
+                )
+
+        self.install_heating_system(
+            model,
+            index,
+            chosen_heating_system,
+            self.boiler_upgrade_grant_available,
+            boiler_upgrade_scheme_budget_gbp,
+        )
+
+        is_heat_pump = IS_HEAT_PUMP[chosen_heating_system]
+        self.install_insulation_elements(
+            index[is_heat_pump], self.chosen_insulation_elements[is_heat_pump]
+        )
+        self.is_heat_pump_aware[index[is_heat_pump]] = True
+
+        # store all costs associated with heating system decisions for simulation logging
+        def only_options(costs: np.ndarray) -> np.ndarray:
+            return np.where(heating_system_options, costs, np.nan)
+
+        self.heating_system_costs_unit_and_install = only_options(
+            self.heating_system_costs_unit_and_install
+        )
+        self.heating_system_costs_fuel = only_options(self.heating_system_costs_fuel)
+        self.heating_system_costs_subsidies = only_options(
+            self.heating_system_costs_subsidies
+        )
+        self.heating_system_costs_insulation = only_options(
+            self.heating_system_costs_insulation
+        )
+
+        return int(is_heat_pump.sum())
+
+    def prepare_heating_decisions(self, model: "DomesticHeatingABM") -> int:
+        """Every decision up to heat pump installation capacity, see `make_decisions`."""
+
+        self.update_heating_status(model)
+        self.evaluate_renovation(model)
+        self.renovate_insulation_elements()
+
+        deciding = np.flatnonzero(
+            ~self.heating_functioning
+            | (self.is_renovating & self.renovate_heating_system)
+        )
+        return self.propose_heating_systems(model, deciding)
+
+    def make_decisions(self, model: "DomesticHeatingABM") -> None:
+
+        self.update_heat_pump_awareness(model)
+        self.prepare_heating_decisions(model)
+        model.heat_pump_installations_at_current_step += self.settle_heating_systems(
+            model,
+            model.heat_pump_installation_capacity_per_step_existing_builds
+            - model.heat_pump_installations_at_current_step,
+            model.boiler_upgrade_scheme_remaining_budget_gbp,
+        )
+        model.award_boiler_upgrade_grant(int(self.boiler_upgrade_grant_used.sum()))
+
+    def decision_log_column(
+        self, decision_log: np.ndarray, column: int, to_python=float
+    ) -> List[Optional[float]]:
+        values: List[Optional[float]] = [None] * len(self)
+        for i, value in zip(self.decision_index.tolist(), decision_log[:, column]):
+            if not np.isnan(value):
+                values[i] = to_python(value)
+        return values
+
+
+def max_households_switching_to_heat_pump_aware(
+    model: "DomesticHeatingABM", candidates: int
+) -> int:
+    # Households stop switching once the campaign target is reached part way through the step
+    num_households_aware = (
+        model.num_households_heat_pump_aware
+        + model.num_households_switching_to_heat_pump_aware
+    )
+    return int(
+        np.count_nonzero(
+            (num_households_aware + np.arange(candidates)) / model.household_count
+            < model.campaign_target_heat_pump_awareness
+        )
+    )
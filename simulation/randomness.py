@@ -0,0 +1,160 @@
+import bisect
+import datetime
+import enum
+import itertools
+from typing import Iterable, List, Optional, Sequence, TypeVar
+
+import numpy as np
+import pandas as pd
+
+T = TypeVar("T")
+
+# Uniforms drawn at a time for draws outside `StepDraw`
+BATCH_SIZE = 4_096
+
+
+class _FreshDraws:
+    """Stands in for a step's draws outside a step, drawing a new uniform each time."""
+
+    def __init__(self, randomness: "Randomness"):
+        self.randomness = randomness
+
+    def __getitem__(self, index: Optional[int]) -> float:
+        return self.randomness.random()
+
+
+class Randomness:
+    """
+    Uniform draws for `Household` agents, made with NumPy in batches rather than
+    with a `random` call each.
+
+    The draws every household makes each step are drawn for the whole population
+    by `draw_step` and looked up by household index. Households not in a model
+    look up a fresh uniform whatever their index. The rest, made by the few
+    households choosing a heating system, come from a buffer refilled
+    `BATCH_SIZE` uniforms at a time. For a given seed, the draws are the same.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.buffer: List[float] = []
+        self.position = 0
+
+        # Indexed by household, so households read them without a method call
+        fresh_draws = _FreshDraws(self)
+        self.heat_pump_awareness: Sequence[float] = fresh_draws
+        self.heating_status: Sequence[float] = fresh_draws
+        self.renovation: Sequence[float] = fresh_draws
+        self.renovate_heating_system: Sequence[float] = fresh_draws
+        self.renovate_insulation: Sequence[float] = fresh_draws
+
+    def draw_step(self, household_count: int) -> None:
+        (
+            self.heat_pump_awareness,
+            self.heating_status,
+            self.renovation,
+            self.renovate_heating_system,
+            self.renovate_insulation,
+        ) = self.rng.random((5, household_count)).tolist()
+
+    def random(self) -> float:
+        if self.position == len(self.buffer):
+            self.buffer = self.rng.random(BATCH_SIZE).tolist()
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, population: Sequence[T], weights: Iterable[float]) -> T:
+        # Inverse CDF sampling, as `random.choices` does
+        cumulative_weights = list(itertools.accumulate(weights))
+        return population[
+            bisect.bisect(
+                cumulative_weights,
+                self.random() * cumulative_weights[-1],
+                0,
+                len(cumulative_weights) - 1,
+            )
+        ]
+
+
+_default_randomness: Optional[Randomness] = None
+
+
+def default_randomness() -> Randomness:
+    """
+    Draws for households outside a model, seeded from OS entropy when first used.
+    Nothing is drawn from the global random state, so constructing households does
+    not change the seeds of models constructed after them.
+    """
+
+    global _default_randomness
+    if _default_randomness is None:
+        _default_randomness = Randomness()
+    return _default_randomness
+
+
+class Stream(enum.Enum):
+    """The random streams of each household in `CommonRandomNumbers`."""
+
+    HEAT_PUMP_AWARENESS = 1
+    HEATING_STATUS = 2
+    BREAKDOWN_DAY = 3
+    RENOVATION = 4
+    RENOVATE_HEATING_SYSTEM = 5
+    RENOVATE_INSULATION = 6
+    INSULATION_QUOTE = 7
+    INSULATION_ELEMENTS = 8
+    RULE_OUT_BANNED_HEATING_SYSTEMS = 9
+    DECOMMISSIONING_COST = 10
+    HEATING_SYSTEM_CHOICE = 11
+    FIRST_BREAKDOWN_DAY = 12
+
+
+def _mix(keys: np.ndarray) -> np.ndarray:
+    # The splitmix64 finaliser, which maps nearby keys to unrelated ones
+    keys = np.asarray(keys, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        keys = keys + np.uint64(0x9E3779B97F4A7C15)
+        keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+class CommonRandomNumbers:
+    """
+    Uniform draws for `HouseholdPopulation` households, computed from a hash of the
+    seed, household id, step and `Stream` rather than drawn in turn from a
+    generator.
+
+    A household's draw for, say, renovating in a given step is the same however
+    many draws were made before it, so scenarios run with the same seed see the
+    same randomness household by household, whatever their policies change.
+    """
+
+    def __init__(self, seed: int, household_id: np.ndarray):
+        self.household_key = _mix(
+            pd.util.hash_array(np.asarray(household_id)) ^ np.uint64(seed)
+        )
+        self.step_key = _mix(np.uint64(0))
+
+    def start_step(self, step_datetime: datetime.datetime) -> None:
+        self.step_key = _mix(np.uint64(step_datetime.toordinal()))
+
+    def random(
+        self, stream: Stream, index: np.ndarray, columns: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Uniforms in (0, 1) for the households at `index` in the current step, with
+        `columns` per household if given.
+        """
+
+        keys = _mix(self.household_key[index] ^ self.step_key)
+        keys = _mix(keys ^ np.uint64(stream.value))
+        if columns is not None:
+            keys = _mix(keys[:, None] ^ np.arange(columns, dtype=np.uint64))
+        # The top 53 bits, offset half a step from 0 so that no draw is 0 or 1
+        return ((keys >> np.uint64(11)).astype(float) + 0.5) / 2**53
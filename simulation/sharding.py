@@ -0,0 +1,241 @@
+import multiprocessing
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from abm import CollectorPlan, PhaseTimings
+from simulation.population import HouseholdPopulation
+
+if TYPE_CHECKING:
+    from simulation.model import DomesticHeatingABM
+
+# Households per shard. Shards, not workers, fix the random streams, so a run's
+# output depends on the shard size but never on the number of workers.
+SHARD_SIZE = 20_000
+
+ShardFunction = Callable[..., Any]
+
+
+def shard_bounds(household_count: int, shard_size: int = SHARD_SIZE) -> List[slice]:
+    return [
+        slice(start, min(start + shard_size, household_count))
+        for start in range(0, household_count, shard_size)
+    ] or [slice(0, 0)]
+
+
+def remaining_in_order(requests: Sequence[int], total: int) -> List[int]:
+    """
+    What is left of `total` when each shard's turn comes, if shards take their
+    `requests` in shard order.
+    """
+
+    remaining = []
+    taken = 0
+    for request in requests:
+        remaining.append(max(total - taken, 0))
+        taken += request
+    return remaining
+
+
+def propose_heat_pump_awareness(
+    shard: HouseholdPopulation, model: "DomesticHeatingABM"
+) -> int:
+    return shard.propose_heat_pump_awareness(model)
+
+
+def settle_heat_pump_awareness(
+    shard: HouseholdPopulation, model: "DomesticHeatingABM", max_switching: int
+) -> int:
+    return shard.settle_heat_pump_awareness(max_switching)
+
+
+def prepare_heating_decisions(
+    shard: HouseholdPopulation, model: "DomesticHeatingABM"
+) -> Tuple[int, int]:
+    heat_pump_proposals = shard.prepare_heating_decisions(model)
+    return heat_pump_proposals, shard.proposed_boiler_upgrade_scheme_spend_gbp()
+
+
+def settle_heating_systems(
+    shard: HouseholdPopulation,
+    model: "DomesticHeatingABM",
+    heat_pump_installation_capacity: int,
+    boiler_upgrade_scheme_budget_gbp: float,
+) -> Tuple[int, int]:
+    heat_pump_installations = shard.settle_heating_systems(
+        model, heat_pump_installation_capacity, boiler_upgrade_scheme_budget_gbp
+    )
+    return heat_pump_installations, int(shard.boiler_upgrade_grant_used.sum())
+
+
+def get_shard(
+    shard: HouseholdPopulation, model: "DomesticHeatingABM"
+) -> HouseholdPopulation:
+    return shard
+
+
+class ShardWorker:
+    """Steps the shards owned by one worker, against its own copy of the model."""
+
+    def __init__(
+        self,
+        model: "DomesticHeatingABM",
+        shards: Dict[int, HouseholdPopulation],
+        agent_callables: List[Callable[[HouseholdPopulation], Any]],
+    ):
+        self.model = model
+        self.shards = shards
+        self.plan = CollectorPlan(agent_callables)
+
+    def handle(
+        self,
+        model_state: Dict[str, Any],
+        function: Optional[ShardFunction],
+        args: Dict[int, tuple],
+    ) -> Tuple[Dict[int, Any], PhaseTimings]:
+        """
+        Returns the results by shard, and the phases timed while producing them.
+        """
+
+        for attribute, value in model_state.items():
+            setattr(self.model, attribute, value)
+
+        if function is None:
+            return {
+                i: self.plan.collect_columns(shard) for i, shard in self.shards.items()
+            }, PhaseTimings()
+
+        # In a single process the model is shared with the pool, so its timings are put back
+        model_timings = self.model.phase_timings
+        self.model.phase_timings = PhaseTimings()
+        try:
+            results = {
+                i: function(shard, self.model, *args.get(i, ()))
+                for i, shard in self.shards.items()
+            }
+            return results, self.model.phase_timings
+        finally:
+            self.model.phase_timings = model_timings
+
+
+def _serve(worker: ShardWorker, connection) -> None:
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        try:
+            connection.send((True, worker.handle(*message)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class ShardPool:
+    """
+    Runs a function on every shard of a population, in one process or spread over
+    `workers` forked processes.
+
+    Worker processes are forked once, inherit the model, the shards and the agent
+    callables, and keep their shards for the rest of the run; only function
+    arguments, the model state named in `model.shared_state` and results cross
+    process boundaries.
+
+    Phases timed by the workers are added to the model's `phase_timings`, so with
+    several workers their seconds are summed across processes.
+    """
+
+    def __init__(
+        self,
+        model: "DomesticHeatingABM",
+        shards: List[HouseholdPopulation],
+        agent_callables: List[Callable[[HouseholdPopulation], Any]],
+        workers: int = 1,
+    ):
+        self.model = model
+        self.shard_count = len(shards)
+        self.connections: List[Any] = []
+        self.processes: List[Any] = []
+        self.local_worker: Optional[ShardWorker] = None
+
+        if workers <= 1 or len(shards) == 1:
+            self.local_worker = ShardWorker(
+                model, dict(enumerate(shards)), agent_callables
+            )
+            return
+
+        context = multiprocessing.get_context("fork")
+        for shard_indices in np.array_split(np.arange(len(shards)), workers):
+            if not len(shard_indices):
+                continue
+            worker = ShardWorker(
+                model, {int(i): shards[i] for i in shard_indices}, agent_callables
+            )
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_serve, args=(worker, child_connection), daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def map(
+        self, function: ShardFunction, args: Optional[Sequence[tuple]] = None
+    ) -> List[Any]:
+        """
+        Call `function(shard, model, *args[i])` on every shard `i`, returning the
+        results in shard order. Functions sent to worker processes must be
+        importable, module level functions.
+        """
+
+        return self._send(function, dict(enumerate(args)) if args is not None else {})
+
+    def collect(self) -> List[Dict[str, Sequence[Any]]]:
+        """The columns collected from every shard, in shard order."""
+
+        return self._send(None, {})
+
+    def _send(
+        self, function: Optional[ShardFunction], args_by_shard: Dict[int, tuple]
+    ) -> List[Any]:
+        model_state = {
+            attribute: getattr(self.model, attribute)
+            for attribute in self.model.shared_state
+        }
+
+        if self.local_worker is not None:
+            results, timings = self.local_worker.handle(
+                model_state, function, args_by_shard
+            )
+            self.model.phase_timings.update(timings)
+        else:
+            for connection in self.connections:
+                connection.send((model_state, function, args_by_shard))
+            results = {}
+            errors = []
+            for connection in self.connections:
+                ok, result = connection.recv()
+                if ok:
+                    worker_results, timings = result
+                    results.update(worker_results)
+                    self.model.phase_timings.update(timings)
+                else:
+                    errors.append(result)
+            if errors:
+                raise errors[0]
+
+        return [results[i] for i in range(self.shard_count)]
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,493 @@
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+import smart_open
+
+from abm import BackgroundWriter
+from simulation.__main__ import (
+    create_model,
+    logger,
+    model_parameters,
+    parse_args,
+    replicate_seed,
+    run_replicate,
+    validate_args,
+    write_history_file,
+)
+from simulation.ensemble import Outputs, relative_half_width
+from simulation.forking import Branch, run_branches, run_lockstep
+
+# Arguments that set how a model is constructed, rather than the policy it steps with
+ROOT_ARGUMENTS = (
+    "seed",
+    "start_datetime",
+    "step_interval",
+    "time_steps",
+    "heat_pump_awareness",
+    "all_agents_heat_pump_suitable",
+    "engine",
+    "breakdown_calendar",
+    "common_random_numbers",
+)
+
+
+class Scenario(NamedTuple):
+    name: str
+    args: List[str]
+    replicates: int = 1
+
+
+def scenario_from_job(job) -> Scenario:
+    """
+    A scenario from a Kubernetes job in the rendered `k8s/job.jsonnet`, without the
+    BigQuery population and history file its container is given.
+    """
+
+    [container] = job["spec"]["template"]["spec"]["containers"]
+    args = list(container["args"][:-1])
+    if "--bigquery" in args:
+        index = args.index("--bigquery")
+        del args[index : index + 2]
+    return Scenario(job["metadata"]["name"], args, job["spec"].get("completions", 1))
+
+
+def parse_scenario(value: Any, name: Optional[str] = None) -> Scenario:
+    if isinstance(value, list):
+        return Scenario(name, value)
+    if value.get("kind") == "Job":
+        return scenario_from_job(value)
+    return Scenario(value.get("name", name), value["args"], value.get("replicates", 1))
+
+
+def read_scenarios(text: str) -> List[Scenario]:
+    """
+    Scenarios from JSON, either a mapping of names to arguments (as in
+    `simulation.benchmark.SCENARIOS`), a list of scenarios with `name`, `args` and
+    optionally `replicates`, or Kubernetes jobs. The documents `jsonnet -y` renders
+    `k8s/job.jsonnet` to are read as jobs.
+    """
+
+    documents = []
+    for document in text.replace("\n...", "\n---").split("\n---"):
+        document = document.strip().removeprefix("---")
+        if document.strip():
+            documents.append(json.loads(document))
+
+    scenarios = []
+    for document in documents:
+        if isinstance(document, dict) and not {"kind", "args"} & document.keys():
+            scenarios.extend(
+                parse_scenario(args, name) for name, args in document.items()
+            )
+        elif isinstance(document, list):
+            scenarios.extend(map(parse_scenario, document))
+        else:
+            scenarios.append(parse_scenario(document))
+
+    names = [scenario.name for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Scenario names must be unique, got {names}")
+    return scenarios
+
+
+def history_file_template(output: str, scenario: str, history_format: str) -> str:
+    return f"{output.rstrip('/')}/{scenario}/history-{{replicate}}.{history_format}"
+
+
+# Set before sweep processes are forked, so that they share the households loaded by
+# the parent copy-on-write rather than each receiving a pickled copy
+_scenario_args: List[argparse.Namespace] = []
+
+
+def run_scenario_replicate(task: Tuple[int, int]) -> str:
+    scenario, replicate = task
+    return run_replicate(_scenario_args[scenario], replicate)
+
+
+def run_scenario_replicate_outputs(task: Tuple[int, int]) -> Outputs:
+    scenario, replicate = task
+    outputs: Outputs = {}
+    run_replicate(_scenario_args[scenario], replicate, outputs)
+    return outputs
+
+
+def run_scenario_tree(task: Tuple[List[int], int]) -> None:
+    """
+    Run a replicate of scenarios constructed alike from one model, simulating the
+    steps before their decision inputs differ once.
+    """
+
+    scenarios, replicate = task
+    root_args = _scenario_args[scenarios[0]]
+    random.seed(replicate_seed(root_args.seed, replicate))
+    model = create_model(root_args, workers=1)
+
+    def write_history(name, history):
+        args = _scenario_args[int(name)]
+        history_file = args.history_file.format(replicate=replicate)
+        write_history_file(args, history, history_file, checkpoint=None)
+        logger.info(
+            "replicate complete", replicate=replicate, history_file=history_file
+        )
+
+    run_branches(
+        model,
+        [
+            Branch(str(index), model_parameters(_scenario_args[index]))
+            for index in scenarios
+        ],
+        root_args.time_steps,
+        write_history,
+        processes=True,
+    )
+
+
+def run_scenarios_in_lockstep(task: Tuple[List[int], int]) -> None:
+    """
+    Run a replicate of scenarios constructed alike in lockstep, as forks of one
+    model sharing its static household columns.
+    """
+
+    scenarios, replicate = task
+    root_args = _scenario_args[scenarios[0]]
+    random.seed(replicate_seed(root_args.seed, replicate))
+    model = create_model(root_args, workers=1)
+
+    with contextlib.ExitStack() as stack:
+        writers = []
+        for index in scenarios:
+            args = _scenario_args[index]
+            history_file = args.history_file.format(replicate=replicate)
+            writers.append(
+                stack.enter_context(
+                    BackgroundWriter(
+                        partial(
+                            write_history_file,
+                            args,
+                            history_file=history_file,
+                            checkpoint=None,
+                        )
+                    )
+                )
+            )
+
+        for steps in run_lockstep(
+            model,
+            [model_parameters(_scenario_args[index]) for index in scenarios],
+            root_args.time_steps,
+        ):
+            for writer, step in zip(writers, steps):
+                writer.write_history([step])
+
+    logger.info("replicate complete", replicate=replicate, scenarios=len(scenarios))
+
+
+def root_groups(scenario_args: List[argparse.Namespace]) -> List[List[int]]:
+    """Indices of the scenarios constructed alike, which can fork from one model."""
+
+    groups: List[List[int]] = []
+    for index, args in enumerate(scenario_args):
+        for group in groups:
+            if all(
+                getattr(args, name) == getattr(scenario_args[group[0]], name)
+                for name in ROOT_ARGUMENTS
+            ):
+                group.append(index)
+                break
+        else:
+            groups.append([index])
+    return groups
+
+
+def parse_scenarios(
+    scenarios: List[Scenario],
+    households: pd.DataFrame,
+    output: str,
+    seed: str,
+    time_steps: Optional[int],
+    history_format: str,
+) -> None:
+    """Set `_scenario_args` to the arguments of each scenario, before forking."""
+
+    global _scenario_args
+    _scenario_args = []
+    for scenario in scenarios:
+        args = parse_args(
+            [
+                "--seed",
+                seed,
+                *scenario.args,
+                *(["--steps", str(time_steps)] if time_steps is not None else []),
+                "households",
+                history_file_template(output, scenario.name, history_format),
+            ],
+            read_households=lambda _: households,
+        )
+        validate_args(args)
+        if "://" not in output:
+            os.makedirs(os.path.dirname(args.history_file), exist_ok=True)
+        _scenario_args.append(args)
+
+
+@contextlib.contextmanager
+def task_map(workers: int) -> Iterator[Callable[..., Any]]:
+    """
+    A map over `workers` processes forked from this one. Each idle process takes
+    the next task, so that long scenarios do not hold up the rest of the sweep.
+    """
+
+    if workers == 1:
+        yield lambda function, tasks: list(map(function, tasks))
+        return
+
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        yield lambda function, tasks: list(executor.map(function, tasks))
+
+
+def run_sweep(
+    scenarios: List[Scenario],
+    households: pd.DataFrame,
+    output: str,
+    workers: int,
+    seed: str,
+    replicates: Optional[int] = None,
+    time_steps: Optional[int] = None,
+    history_format: str = "jsonl.gz",
+    fork: bool = False,
+    lockstep: bool = False,
+) -> List[str]:
+    """
+    Run every replicate of every scenario on `workers` processes, writing each
+    history file under a directory per scenario in `output`. Replicate `i` of every
+    scenario has the same seed, derived from `seed` unless the scenario sets one.
+
+    With `fork`, the replicates of scenarios constructed alike are run together,
+    forking where their policies first differ. With `lockstep`, they are stepped
+    together, sharing the household columns that never change. Either way the
+    scenarios must have the same number of replicates.
+    """
+
+    if fork and lockstep:
+        raise ValueError("Scenarios are either forked or run in lockstep, not both")
+
+    parse_scenarios(scenarios, households, output, seed, time_steps, history_format)
+    tasks = [
+        (index, replicate)
+        for index, scenario in enumerate(scenarios)
+        for replicate in range(replicates or scenario.replicates)
+    ]
+
+    history_files = [
+        _scenario_args[scenario].history_file.format(replicate=replicate)
+        for scenario, replicate in tasks
+    ]
+    if fork or lockstep:
+        replicate_counts = {replicates or scenario.replicates for scenario in scenarios}
+        if len(replicate_counts) > 1:
+            raise ValueError("Scenarios run together must have the same replicates")
+        [replicate_count] = replicate_counts
+        tasks = [
+            (group, replicate)
+            for group in root_groups(_scenario_args)
+            for replicate in range(replicate_count)
+        ]
+        run_task = run_scenario_tree if fork else run_scenarios_in_lockstep
+    else:
+        run_task = run_scenario_replicate
+
+    with task_map(min(workers, len(tasks))) as map_tasks:
+        map_tasks(run_task, tasks)
+    return history_files
+
+
+def run_adaptive_sweep(
+    scenarios: List[Scenario],
+    households: pd.DataFrame,
+    output: str,
+    workers: int,
+    seed: str,
+    tolerance: float,
+    batch_replicates: int = 5,
+    max_replicates: int = 50,
+    time_steps: Optional[int] = None,
+    history_format: str = "jsonl.gz",
+) -> List[str]:
+    """
+    Run replicates of every scenario in batches of `batch_replicates`, until the
+    95% confidence intervals of the scenario's `simulation.ensemble.OUTPUTS` are
+    within `tolerance` (see `relative_half_width`) or it has run `max_replicates`.
+    Each batch runs only the scenarios yet to converge. Replicates are seeded as
+    in `run_sweep`, so the history files are those it writes for as many replicates.
+    """
+
+    if tolerance <= 0:
+        raise ValueError(f"Tolerance must be greater than 0, got {tolerance}")
+    if not 1 <= batch_replicates <= max_replicates:
+        raise ValueError(
+            f"Batch replicates must be from 1 to max replicates, got batch_replicates:{batch_replicates}, max_replicates:{max_replicates}"
+        )
+
+    parse_scenarios(scenarios, households, output, seed, time_steps, history_format)
+    replicate_outputs: Dict[int, List[Outputs]] = {
+        index: [] for index in range(len(scenarios))
+    }
+    running = list(replicate_outputs)
+    with task_map(workers) as map_tasks:
+        while running:
+            tasks = []
+            for index in running:
+                start = len(replicate_outputs[index])
+                stop = min(start + batch_replicates, max_replicates)
+                tasks.extend((index, replicate) for replicate in range(start, stop))
+            for (index, _), outputs in zip(
+                tasks, map_tasks(run_scenario_replicate_outputs, tasks)
+            ):
+                replicate_outputs[index].append(outputs)
+
+            for index in list(running):
+                half_width = relative_half_width(replicate_outputs[index])
+                replicates = len(replicate_outputs[index])
+                if half_width <= tolerance or replicates == max_replicates:
+                    running.remove(index)
+                    logger.info(
+                        "scenario complete",
+                        scenario=scenarios[index].name,
+                        replicates=replicates,
+                        relative_half_width=half_width,
+                        converged=half_width <= tolerance,
+                    )
+
+    return [
+        _scenario_args[index].history_file.format(replicate=replicate)
+        for index, outputs in replicate_outputs.items()
+        for replicate in range(len(outputs))
+    ]
+
+
+def parse_sweep_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Run every replicate of a list of scenarios on one machine."
+    )
+
+    parser.add_argument(
+        "scenario_file",
+        help="Local file or Google Cloud Storage URI of the scenarios as JSON, or k8s/job.jsonnet rendered with scripts/jsonnet.sh.",
+    )
+
+    parser.add_argument(
+        "households", type=pd.read_parquet, help="Household population Parquet file."
+    )
+
+    parser.add_argument(
+        "output",
+        help="Local directory or Google Cloud Storage URI to write the history files to, under a directory per scenario.",
+    )
+
+    parser.add_argument(
+        "--replicates",
+        type=int,
+        default=None,
+        help="Number of runs of every scenario. Default is the number of replicates or job completions in the scenario file.",
+    )
+
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--steps", dest="time_steps", type=int, default=None)
+
+    parser.add_argument(
+        "--history-format",
+        choices=["jsonl", "jsonl.gz", "parquet"],
+        default="jsonl.gz",
+    )
+
+    parser.add_argument(
+        "--fork",
+        action="store_true",
+        help="Simulate the steps before scenarios' policies differ once for each replicate, and fork the model where they do.",
+    )
+
+    parser.add_argument(
+        "--lockstep",
+        action="store_true",
+        help="Step each replicate of the scenarios constructed alike together, sharing one copy of the household data that does not change.",
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="Run replicates in batches until the 95%% confidence interval half-width of heat pump installations and boiler upgrade scheme spend at every step is at most this fraction of their largest mean, instead of a fixed number of replicates.",
+    )
+
+    parser.add_argument(
+        "--batch-replicates",
+        type=int,
+        default=5,
+        help="Replicates run for every scenario yet to converge in each batch, with --tolerance.",
+    )
+
+    parser.add_argument(
+        "--max-replicates",
+        type=int,
+        default=50,
+        help="Most replicates run for a scenario, with --tolerance.",
+    )
+
+    parser.add_argument(
+        "--seed",
+        default=datetime.datetime.now().isoformat(),
+        help="Seed for random number generator, shared by the scenarios. Default is now.",
+    )
+
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+
+    args = parse_sweep_args()
+
+    with smart_open.open(args.scenario_file, "r") as file:
+        scenarios = read_scenarios(file.read())
+
+    if args.tolerance is not None:
+        if args.replicates is not None or args.fork or args.lockstep:
+            raise ValueError(
+                "--replicates, --fork and --lockstep do not apply with --tolerance"
+            )
+        history_files = run_adaptive_sweep(
+            scenarios,
+            args.households,
+            args.output,
+            args.workers,
+            args.seed,
+            args.tolerance,
+            args.batch_replicates,
+            args.max_replicates,
+            args.time_steps,
+            args.history_format,
+        )
+    else:
+        history_files = run_sweep(
+            scenarios,
+            args.households,
+            args.output,
+            args.workers,
+            args.seed,
+            args.replicates,
+            args.time_steps,
+            args.history_format,
+            args.fork,
+            args.lockstep,
+        )
+
+    logger.info("sweep complete", history_files=history_files)
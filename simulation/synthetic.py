@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from simulation.constants import (
+    BuiltForm,
+    ConstructionYearBand,
+    EPCRating,
+    HeatingSystem,
+    OccupantType,
+    PropertyType,
+)
+
+
+def household_population_factory(size: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A random household population of `size` rows, in the columns read from
+    BigQuery, for tests and benchmarks.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    def names(enum_type):
+        return rng.choice([member.name for member in enum_type], size)
+
+    return pd.DataFrame(
+        {
+            "id": np.arange(size),
+            "location": rng.choice(["Birmingham", "London", "Manchester"], size),
+            "property_value_gbp": rng.integers(50_000, 2_000_000, size),
+            "total_floor_area_m2": rng.integers(20, 300, size),
+            "is_off_gas_grid": rng.random(size) < 0.2,
+            "construction_year_band": names(ConstructionYearBand),
+            "property_type": names(PropertyType),
+            "built_form": names(BuiltForm),
+            "heating_system": names(HeatingSystem),
+            "epc_rating": names(EPCRating),
+            "potential_epc_rating": names(EPCRating),
+            "occupant_type": names(OccupantType),
+            "is_solid_wall": rng.random(size) < 0.3,
+            "walls_energy_efficiency": rng.integers(1, 6, size),
+            "windows_energy_efficiency": rng.integers(1, 6, size),
+            "roof_energy_efficiency": rng.integers(1, 6, size),
+            "is_heat_pump_suitable_archetype": rng.random(size) < 0.8,
+        }
+    )
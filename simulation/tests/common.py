@@ -1,5 +1,6 @@
 import datetime
 
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
 from simulation.agents import Household
@@ -12,6 +13,25 @@ from simulation.constants import (
     PropertyType,
 )
 from simulation.model import DomesticHeatingABM
+from simulation.population import HouseholdPopulation
+
+
+class HouseholdPopulationABM(DomesticHeatingABM):
+    """
+    A single `HouseholdPopulation` stepped in this process, so tests can step it
+    outside `run`, unlike a `ShardedHouseholdPopulationABM`.
+    """
+
+    def __init__(self, population: HouseholdPopulation, **kwargs):
+        super().__init__(**kwargs)
+        self.population = population
+
+    @property
+    def household_count(self) -> int:
+        return len(self.population)
+
+    def step(self) -> None:
+        self.population.make_decisions(self)
 
 
 def household_factory(**agent_attributes):
@@ -39,7 +59,7 @@ def household_factory(**agent_attributes):
     return Household(**{**default_values, **agent_attributes})
 
 
-def model_factory(**model_attributes):
+def model_attributes_factory(**model_attributes):
     default_values = {
         "start_datetime": datetime.datetime.now(),
         "step_interval": relativedelta(months=1),
@@ -62,4 +82,30 @@ def model_factory(**model_attributes):
         "population_heat_pump_awareness": [],
     }
 
-    return DomesticHeatingABM(**{**default_values, **model_attributes})
+    return {**default_values, **model_attributes}
+
+
+def model_factory(**model_attributes):
+    return DomesticHeatingABM(**model_attributes_factory(**model_attributes))
+
+
+def population_model_factory(household_population, seed: int = 0, **model_attributes):
+    attributes = model_attributes_factory(**model_attributes)
+    rng = np.random.default_rng(seed)
+    population_heat_pump_awareness = (
+        rng.random(len(household_population)) < attributes["heat_pump_awareness"]
+    )
+    population = HouseholdPopulation.from_dataframe(
+        household_population,
+        population_heat_pump_awareness,
+        attributes["start_datetime"],
+        all_agents_heat_pump_suitable=False,
+        rng=rng,
+    )
+    return HouseholdPopulationABM(
+        population=population,
+        **{
+            **attributes,
+            "population_heat_pump_awareness": population_heat_pump_awareness,
+        },
+    )
@@ -243,6 +243,14 @@ class TestHousehold:
 
         assert not low_potential_epc_household.is_heat_pump_suitable
 
+    def test_heat_pump_suitability_is_updated_with_potential_epc(self) -> None:
+        household = household_factory(potential_epc_rating=EPCRating.C)
+        assert household.is_heat_pump_suitable
+
+        household.potential_epc_rating = EPCRating.E
+        household.update_derived_attributes()
+        assert not household.is_heat_pump_suitable
+
     def test_households_not_suitable_archetype_are_not_heat_pump_suitable(
         self,
     ) -> None:
@@ -776,6 +784,18 @@ class TestHousehold:
         assert not agent_awarness_after_campaign
         assert pytest.approx(model_awarness_after_campaign) == 0.0
 
+    def test_households_are_slotted_and_share_empty_decision_logs(self) -> None:
+        households = [
+            household_factory(location="".join(["Lon", "don"])) for _ in range(2)
+        ]
+
+        assert not hasattr(households[0], "__dict__")
+        assert households[0].location is households[1].location
+        assert (
+            households[0].heating_system_costs_fuel
+            is households[1].heating_system_costs_fuel
+        )
+
 
 class TestAgentsWithBoilerBan:
     def test_households_increasingly_likely_to_rule_out_heating_systems_that_will_be_banned_as_time_to_ban_decreases(
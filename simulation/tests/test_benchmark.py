@@ -0,0 +1,72 @@
+import pytest
+
+from simulation.__main__ import parse_args, validate_args
+from simulation.benchmark import (
+    SCENARIOS,
+    household_bytes,
+    run_benchmark,
+    run_benchmarks,
+)
+from simulation.synthetic import household_population_factory
+
+
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+def test_scenarios_are_valid_arguments(tmp_path, scenario):
+    households_file = str(tmp_path / "households.parquet")
+    household_population_factory(10).to_parquet(households_file)
+
+    args = parse_args(SCENARIOS[scenario] + [households_file, "history.jsonl"])
+    validate_args(args)
+
+
+@pytest.mark.parametrize("engine", ["agents", "population"])
+@pytest.mark.parametrize("history_format", ["jsonl.gz", "parquet"])
+def test_run_benchmark_measures_throughput_and_history_size(
+    tmp_path, engine, history_format
+):
+    households_file = str(tmp_path / "households.parquet")
+    household_population_factory(200).to_parquet(households_file)
+
+    result = run_benchmark(
+        "max-policy-extended-bus-campaign-2028",
+        households_file,
+        str(tmp_path / f"history.{history_format}"),
+        time_steps=3,
+        engine=engine,
+        workers=1,
+        seed="2024-01-01",
+    )
+
+    assert result["households"] == 200
+    assert result["history_format"] == history_format
+    assert result["steps_per_second"] > 0
+    assert result["agents_per_second"] == pytest.approx(
+        200 * result["steps_per_second"]
+    )
+    assert result["peak_rss_bytes"] > 0
+    assert (
+        result["history_bytes"]
+        == (tmp_path / f"history.{history_format}").stat().st_size
+    )
+    assert result["history_bytes_per_step"] == result["history_bytes"] / 3
+
+
+def test_run_benchmarks_runs_every_combination():
+    benchmark = run_benchmarks(
+        household_counts=[100, 200],
+        scenarios=["max-policy-extended-bus-campaign-2028"],
+        engines=["population"],
+        time_steps=1,
+        workers=1,
+        history_format="jsonl",
+        seed="2024-01-01",
+    )
+
+    assert [result["households"] for result in benchmark["results"]] == [100, 200]
+
+
+def test_household_bytes_is_allocated_memory_per_household(tmp_path):
+    households_file = str(tmp_path / "households.parquet")
+    household_population_factory(500).to_parquet(households_file)
+
+    assert 0 < household_bytes(households_file, sample_size=100) < 10_000
@@ -0,0 +1,75 @@
+import datetime
+
+import numpy as np
+
+from simulation.breakdowns import BreakdownCalendar, sample_failure_day, to_day
+from simulation.tests.common import household_factory, model_factory
+
+
+def test_to_day_counts_from_numpy_epoch():
+    date = datetime.date(2024, 3, 1)
+    assert to_day(date) == np.datetime64(date, "D").astype(int)
+
+
+def test_failure_day_is_after_current_age():
+    rng = np.random.default_rng(0)
+    age_days = np.full(1_000, 5_000)
+    failure_day = sample_failure_day(age_days, 0, rng.random(1_000))
+    assert (failure_day >= age_days).all()
+
+
+def test_older_heating_systems_fail_sooner():
+    rng = np.random.default_rng(0)
+    uniform = rng.random(10_000)
+    new = sample_failure_day(np.zeros(10_000), 0, uniform)
+    old = sample_failure_day(np.full(10_000, 15 * 365), -15 * 365, uniform)
+    assert old.mean() < new.mean()
+
+
+def test_pop_failures_returns_households_due_in_order_of_failure():
+    calendar = BreakdownCalendar()
+    calendar.schedule([0, 1, 2], [30, 10, 20])
+
+    assert calendar.pop_failures(20) == [1, 2]
+    assert calendar.pop_failures(25) == []
+    assert calendar.pop_failures(30) == [0]
+    assert len(calendar) == 0
+
+
+def test_rescheduling_supersedes_earlier_failure():
+    calendar = BreakdownCalendar()
+    calendar.schedule([0, 1], [10, 20])
+    calendar.schedule([0], [40])
+
+    assert calendar.pop_failures(30) == [1]
+    assert calendar.pop_failures(40) == [0]
+
+
+def test_households_added_to_model_are_scheduled():
+    model = model_factory(breakdown_calendar=True)
+    model.add_agents(household_factory() for _ in range(5))
+    assert len(model.breakdown_calendar) == 5
+
+
+def test_only_households_in_heating_failures_break_down():
+    model = model_factory(breakdown_calendar=True)
+    households = [household_factory() for _ in range(2)]
+    model.add_agents(households)
+    model.heating_failures = {1}
+
+    for household in households:
+        household.update_heating_status(model)
+
+    assert households[0].heating_functioning
+    assert not households[1].heating_functioning
+
+
+def test_installing_heating_system_reschedules_breakdown():
+    model = model_factory(breakdown_calendar=True)
+    household = household_factory()
+    model.add_agent(household)
+    model.breakdown_calendar.pop_failures(to_day(datetime.date.max))
+
+    household.install_heating_system(household.heating_system, model)
+
+    assert len(model.breakdown_calendar) == 1
@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+
+from simulation.__main__ import parse_args
+from simulation.cache import ResultStore, history_suffix
+from simulation.synthetic import household_population_factory
+
+HOUSEHOLDS = household_population_factory(20)
+
+
+def args(*extra_args, households=HOUSEHOLDS, history_file="history.jsonl"):
+    return parse_args(
+        ["households", history_file, "--seed", "2024-01-01", *extra_args],
+        read_households=lambda _: households,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / "cache"))
+
+
+def test_run_key_ignores_where_and_how_fast_history_is_written(store):
+    assert store.run_key(args(), "seed") == store.run_key(
+        args("--workers", "4", "--write-queue-steps", "2", history_file="other.jsonl"),
+        "seed",
+    )
+
+
+@pytest.mark.parametrize(
+    "other_args, other_seed",
+    [
+        (args(), "other seed"),
+        (args("--steps", "12"), "seed"),
+        (args("--keyframe-interval", "12"), "seed"),
+        (args(history_file="history.jsonl.gz"), "seed"),
+        (args(households=household_population_factory(20, seed=1)), "seed"),
+    ],
+)
+def test_run_key_depends_on_output_arguments_seed_and_population(
+    store, other_args, other_seed
+):
+    assert store.run_key(args(), "seed") != store.run_key(other_args, other_seed)
+
+
+@pytest.mark.parametrize(
+    "history_file, suffix",
+    [
+        ("history.jsonl", ".jsonl"),
+        ("gs://bucket/{uuid}/output.jsonl.gz", ".jsonl.gz"),
+        ("history-{replicate}.parquet", ".parquet"),
+    ],
+)
+def test_history_suffix(history_file, suffix):
+    assert history_suffix(history_file) == suffix
+
+
+def test_stored_history_is_fetched_byte_for_byte(store, tmp_path):
+    history_file = str(tmp_path / "history.jsonl.gz")
+    with gzip.open(history_file, "wt") as file:
+        file.write("[[], {}]\n")
+
+    assert not store.fetch("key", str(tmp_path / "fetched.jsonl.gz"))
+    store.store("key", history_file)
+    assert store.fetch("key", str(tmp_path / "fetched.jsonl.gz"))
+
+    assert (tmp_path / "fetched.jsonl.gz").read_bytes() == (
+        tmp_path / "history.jsonl.gz"
+    ).read_bytes()
@@ -0,0 +1,134 @@
+import datetime
+import gzip
+import random
+
+import pytest
+import smart_open
+from dateutil.relativedelta import relativedelta
+
+from simulation.checkpoint import Checkpointer, read_checkpoint, truncate_history
+from simulation.constants import InterventionType
+from simulation.model import (
+    create_and_run_simulation,
+    create_population_simulation,
+    resume_simulation,
+    run_model,
+)
+from simulation.synthetic import household_population_factory
+
+MODEL_ATTRIBUTES = {
+    "start_datetime": datetime.datetime(2024, 1, 1),
+    "step_interval": relativedelta(months=3),
+    "heat_pump_awareness": 0.3,
+    "annual_renovation_rate": 0.3,
+    "household_num_lookahead_years": 3,
+    "heating_system_hassle_factor": 0.1,
+    "rented_heating_system_hassle_factor": 0.4,
+    "interventions": [
+        InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME,
+        InterventionType.GAS_OIL_BOILER_BAN,
+    ],
+    "all_agents_heat_pump_suitable": False,
+    "gas_oil_boiler_ban_datetime": datetime.datetime(2026, 1, 1),
+    "gas_oil_boiler_ban_announce_datetime": datetime.datetime(2024, 1, 1),
+    "price_gbp_per_kwh_gas": 0.062,
+    "price_gbp_per_kwh_electricity": 0.245,
+    "price_gbp_per_kwh_oil": 0.068,
+    "air_source_heat_pump_price_discount_schedule": None,
+    "heat_pump_installer_count": 5_000_000,
+    "heat_pump_installer_annual_growth_rate": 0.48,
+    "annual_new_builds": None,
+    "heat_pump_awareness_campaign_schedule": None,
+}
+
+
+def run_agents_simulation(time_steps, checkpoint):
+    return create_and_run_simulation(
+        time_steps=time_steps,
+        household_population=household_population_factory(300),
+        checkpoint=checkpoint,
+        **MODEL_ATTRIBUTES,
+    )
+
+
+def run_population_simulation(time_steps, checkpoint):
+    model = create_population_simulation(
+        household_population=household_population_factory(900),
+        workers=2,
+        shard_size=300,
+        **MODEL_ATTRIBUTES,
+    )
+    return run_model(model, time_steps, checkpoint)
+
+
+@pytest.mark.parametrize(
+    "run_simulation", [run_agents_simulation, run_population_simulation]
+)
+def test_resumed_simulation_continues_history_from_last_checkpoint(
+    tmp_path, run_simulation
+):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl.gz")
+    random.seed(0)
+    history = list(run_simulation(7, Checkpointer(checkpoint_file, interval=3)))
+
+    # Whatever the global random state, the checkpoint restores it
+    random.seed(1)
+    steps_completed, resumed_history = resume_simulation(
+        checkpoint_file, time_steps=7, workers=3
+    )
+
+    assert steps_completed == 6
+    assert list(resumed_history) == history[6:]
+
+
+def test_resumed_simulation_keeps_checkpointing(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl.gz")
+    random.seed(0)
+    list(run_agents_simulation(4, Checkpointer(checkpoint_file, interval=2)))
+
+    before_write_calls = []
+    checkpoint = Checkpointer(
+        checkpoint_file, interval=3, before_write=lambda: before_write_calls.append(1)
+    )
+    _, resumed_history = resume_simulation(checkpoint_file, 8, checkpoint=checkpoint)
+    list(resumed_history)
+
+    assert read_checkpoint(checkpoint_file)[0] == 6
+    assert before_write_calls == [1]
+
+
+@pytest.mark.parametrize("filename", ["history.jsonl", "history.jsonl.gz"])
+def test_truncate_history_drops_steps_after_checkpoint(tmp_path, filename):
+    history_file = str(tmp_path / filename)
+    with smart_open.open(history_file, "w") as file:
+        file.writelines(f'[[], {{"step": {step}}}]\n' for step in range(5))
+
+    truncate_history(history_file, 3)
+
+    with smart_open.open(history_file, "r") as file:
+        assert file.readlines() == [f'[[], {{"step": {step}}}]\n' for step in range(3)]
+
+
+def test_truncate_history_repairs_compressed_history_stopped_mid_write(tmp_path):
+    history_file = tmp_path / "history.jsonl.gz"
+    with open(history_file, "wb") as raw_file:
+        # A member from the run before a resume, then one stopped before its trailer
+        raw_file.write(gzip.compress(b"[[], {}]\n"))
+        file = gzip.GzipFile(fileobj=raw_file, mode="wb")
+        file.write(b"[[], {}]\n[[], {}]\n")
+        file.flush()
+
+    truncate_history(str(history_file), 2)
+
+    with gzip.open(history_file, "rt") as file:
+        assert file.readlines() == ["[[], {}]\n", "[[], {}]\n"]
+
+
+def test_truncate_history_with_fewer_steps_than_checkpoint_raises_value_error(
+    tmp_path,
+):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_text("[[], {}]\n")
+
+    with pytest.raises(ValueError):
+        truncate_history(str(history_file), 2)
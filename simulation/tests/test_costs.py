@@ -1,6 +1,8 @@
 import datetime
+import math
 import random
 
+import numpy as np
 import pytest
 
 from simulation.constants import (
@@ -8,15 +10,22 @@ from simulation.constants import (
     ENGLAND_WALES_HOUSEHOLD_COUNT_2020,
     HEAT_PUMPS,
     HeatingSystem,
+    InterventionType,
 )
 from simulation.costs import (
     BOILER_UPGRADE_SCHEME_GRANT_CAP,
     DECOMMISSIONING_COST_MAX,
     MEAN_COST_GBP_BOILER_GAS,
+    discount_annual_cash_flow,
     estimate_boiler_upgrade_scheme_grant,
     estimate_extended_boiler_upgrade_scheme_grant,
     estimate_rhi_annual_payment,
+    extended_boiler_upgrade_scheme_funding_cap_gbp,
+    get_heating_fuel_cost_matrix,
     get_heating_fuel_costs_net_present_value,
+    get_insulation_cost_matrix,
+    get_subsidy_matrix,
+    get_unit_and_install_cost_matrix,
     get_unit_and_install_costs,
 )
 from simulation.tests.common import household_factory, model_factory
@@ -394,3 +403,124 @@ class TestCosts:
             )
             == 5_000
         )
+
+    def test_extended_boiler_upgrade_scheme_funding_cap_follows_scheme_year(self):
+        cap = extended_boiler_upgrade_scheme_funding_cap_gbp
+
+        assert cap(datetime.date(2023, 1, 1)) == BOILER_UPGRADE_SCHEME_GRANT_CAP[2024]
+        assert cap(datetime.date(2026, 3, 31)) == BOILER_UPGRADE_SCHEME_GRANT_CAP[2025]
+        assert cap(datetime.date(2026, 4, 1)) == BOILER_UPGRADE_SCHEME_GRANT_CAP[2026]
+        assert cap(datetime.date(2036, 1, 1)) == math.inf
+
+    def test_grants_awarded_within_a_step_count_towards_grant_cap(self):
+
+        model = model_factory(start_datetime=datetime.datetime(2023, 1, 1))
+        model.add_agents([household_factory()])
+        heat_pump = HeatingSystem.HEAT_PUMP_AIR_SOURCE
+        funding_cap_gbp = math.ceil(model.policy.boiler_upgrade_scheme_funding_cap_gbp)
+
+        model.award_boiler_upgrade_grant(funding_cap_gbp - 1)
+        assert estimate_boiler_upgrade_scheme_grant(heat_pump, model) > 0
+
+        model.award_boiler_upgrade_grant(1)
+        assert estimate_boiler_upgrade_scheme_grant(heat_pump, model) == 0
+
+        model.increment_timestep()
+        assert model.boiler_upgrade_scheme_cumulative_spend_gbp == funding_cap_gbp
+        assert estimate_boiler_upgrade_scheme_grant(heat_pump, model) == 0
+
+
+@pytest.fixture
+def deciding_households():
+    return [
+        household_factory(
+            heating_system=heating_system,
+            total_floor_area_m2=random.randint(20, 300),
+            property_value_gbp=random.randint(50_000, 1_000_000),
+        )
+        for heating_system in HeatingSystem
+        for _ in range(5)
+    ]
+
+
+class TestCostMatrices:
+    def test_unit_and_install_cost_matrix_matches_scalar_costs(
+        self, deciding_households, monkeypatch
+    ):
+        model = model_factory(
+            start_datetime=datetime.datetime(2024, 1, 1),
+            air_source_heat_pump_price_discount_schedule=[
+                (datetime.datetime(2023, 1, 1), 0.3)
+            ],
+        )
+        decommissioning_costs = 1_000
+
+        costs = get_unit_and_install_cost_matrix(
+            np.array([h.heating_system.value for h in deciding_households]),
+            np.array([h.property_size.value for h in deciding_households]),
+            np.array(
+                [
+                    h.compute_heat_pump_capacity_kw(HeatingSystem.HEAT_PUMP_AIR_SOURCE)
+                    for h in deciding_households
+                ]
+            ),
+            np.array(
+                [
+                    h.compute_heat_pump_capacity_kw(
+                        HeatingSystem.HEAT_PUMP_GROUND_SOURCE
+                    )
+                    for h in deciding_households
+                ]
+            ),
+            np.full(
+                (len(deciding_households), len(HeatingSystem)), decommissioning_costs
+            ),
+            model,
+        )
+
+        for i, household in enumerate(deciding_households):
+            monkeypatch.setattr(
+                household.randomness, "randint", lambda a, b: decommissioning_costs
+            )
+            for heating_system in HeatingSystem:
+                assert costs[i, heating_system.value] == get_unit_and_install_costs(
+                    household, heating_system, model
+                )
+
+    def test_fuel_and_subsidy_matrices_match_scalar_costs(self, deciding_households):
+        model = model_factory(interventions=[InterventionType.RHI])
+        heating_system = np.array([h.heating_system.value for h in deciding_households])
+        annual_kwh_heating_demand = np.array(
+            [h.annual_kwh_heating_demand for h in deciding_households]
+        )
+        discount_rate = np.array([h.discount_rate for h in deciding_households])
+
+        fuel = get_heating_fuel_cost_matrix(
+            heating_system, annual_kwh_heating_demand, discount_rate, model
+        )
+        subsidies = get_subsidy_matrix(
+            heating_system, annual_kwh_heating_demand, discount_rate, model
+        )
+
+        for i, household in enumerate(deciding_households):
+            for system in HeatingSystem:
+                assert fuel[i, system.value] == pytest.approx(
+                    get_heating_fuel_costs_net_present_value(household, system, model)
+                )
+                assert subsidies[i, system.value] == pytest.approx(
+                    discount_annual_cash_flow(
+                        household.discount_rate,
+                        estimate_rhi_annual_payment(household, system),
+                        duration_years=7,
+                    )
+                )
+
+    def test_insulation_costs_only_apply_to_heat_pumps(self):
+        chosen_insulation_costs = np.array([[100.0, np.nan, 250.0], [np.nan] * 3])
+
+        costs = get_insulation_cost_matrix(chosen_insulation_costs)
+
+        for heating_system in HeatingSystem:
+            expected = 350 if heating_system in HEAT_PUMPS else 0
+            assert costs[0, heating_system.value] == expected
+            assert costs[1, heating_system.value] == 0
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from simulation.ensemble import (
+    OUTPUTS,
+    confidence_intervals,
+    record_outputs,
+    relative_half_width,
+    t_quantile_95,
+)
+
+
+def replicate(installations, spend):
+    return dict(zip(OUTPUTS, [installations, spend]))
+
+
+def test_record_outputs_passes_history_through():
+    history = [([{"id": 1}], {name: step for name in OUTPUTS}) for step in range(3)]
+    outputs = {}
+
+    assert list(record_outputs(iter(history), outputs)) == history
+    assert outputs == {name: [0, 1, 2] for name in OUTPUTS}
+
+
+def test_t_quantile_approaches_normal_quantile():
+    assert t_quantile_95(1) == 12.706
+    assert t_quantile_95(30) == 2.042
+    assert t_quantile_95(60) == pytest.approx(2.000, abs=0.005)
+    assert t_quantile_95(10_000) == pytest.approx(1.960, abs=0.001)
+
+
+def test_confidence_intervals_by_step():
+    intervals = confidence_intervals(
+        [replicate([1, 10], [0, 0]), replicate([3, 10], [0, 0])]
+    )
+
+    mean, half_width = intervals[OUTPUTS[0]]
+    assert mean.tolist() == [2, 10]
+    assert half_width.tolist() == pytest.approx([12.706, 0])
+
+
+def test_relative_half_width_is_widest_relative_to_peak_mean():
+    replicates = [replicate([1, 10], [100, 100]), replicate([3, 10], [100, 100])]
+    assert relative_half_width(replicates) == pytest.approx(12.706 / 10)
+
+
+def test_relative_half_width_needs_two_replicates():
+    assert relative_half_width([replicate([1], [1])]) == math.inf
+    assert relative_half_width([replicate([0], [0])] * 2) == 0
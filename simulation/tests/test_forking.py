@@ -0,0 +1,155 @@
+import datetime
+import random
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from simulation.constants import InterventionType
+from simulation.forking import (
+    Branch,
+    branch_decision_inputs,
+    run_branches,
+    run_lockstep,
+)
+from simulation.model import create_simulation, run_model
+from simulation.synthetic import household_population_factory
+
+MODEL_ATTRIBUTES = {
+    "start_datetime": datetime.datetime(2024, 1, 1),
+    "step_interval": relativedelta(months=3),
+    "annual_renovation_rate": 0.3,
+    "household_num_lookahead_years": 3,
+    "heating_system_hassle_factor": 0.1,
+    "rented_heating_system_hassle_factor": 0.4,
+    "interventions": [InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME],
+    "gas_oil_boiler_ban_datetime": datetime.datetime(2026, 1, 1),
+    "gas_oil_boiler_ban_announce_datetime": datetime.datetime(2024, 1, 1),
+    "price_gbp_per_kwh_gas": 0.062,
+    "price_gbp_per_kwh_electricity": 0.245,
+    "price_gbp_per_kwh_oil": 0.068,
+    "air_source_heat_pump_price_discount_schedule": None,
+    "heat_pump_installer_count": 5_000_000,
+    "heat_pump_installer_annual_growth_rate": 0.48,
+    "annual_new_builds": None,
+    "heat_pump_awareness_campaign_schedule": None,
+}
+
+BRANCHES = [
+    Branch("no-ban", {}),
+    Branch(
+        "ban-announced-2025",
+        {
+            "interventions": [
+                InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME,
+                InterventionType.GAS_OIL_BOILER_BAN,
+            ],
+            "gas_oil_boiler_ban_announce_datetime": datetime.datetime(2025, 1, 1),
+        },
+    ),
+    Branch(
+        "ban-announced-2025-in-2030",
+        {
+            "interventions": [
+                InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME,
+                InterventionType.GAS_OIL_BOILER_BAN,
+            ],
+            "gas_oil_boiler_ban_announce_datetime": datetime.datetime(2025, 1, 1),
+            "gas_oil_boiler_ban_datetime": datetime.datetime(2030, 1, 1),
+        },
+    ),
+    Branch("higher-gas-price", {"price_gbp_per_kwh_gas": 0.1}),
+]
+
+
+def create_model(engine, **parameters):
+    random.seed(0)
+    return create_simulation(
+        household_population_factory(300),
+        heat_pump_awareness=0.3,
+        all_agents_heat_pump_suitable=False,
+        engine=engine,
+        **{**MODEL_ATTRIBUTES, **parameters},
+    )
+
+
+def test_branches_have_same_decision_inputs_until_policies_differ():
+    model = create_model("agents")
+    no_ban, announced, announced_later_ban, _ = [
+        branch_decision_inputs(model, branch, 12) for branch in BRANCHES
+    ]
+
+    # The ban is announced at the fourth step, 2025-01-01
+    assert no_ban[:3] == announced[:3] == announced_later_ban[:3]
+    assert no_ban[3] != announced[3] != announced_later_ban[3]
+
+
+def test_branch_decision_inputs_do_not_change_model():
+    model = create_model("agents")
+    branch_decision_inputs(model, BRANCHES[3], 4)
+    assert model.fuel_price_gbp_per_kwh == create_model("agents").fuel_price_gbp_per_kwh
+
+
+@pytest.mark.parametrize("engine", ["agents", "population"])
+def test_forked_model_continues_as_model_constructed_with_its_parameters(engine):
+    parameters = BRANCHES[1].parameters
+    model = create_model(engine)
+    # Forked at the last step before the branches' policies differ
+    prefix_history = list(run_model(model, 3))
+
+    forked_history = list(run_model(model.fork(**parameters), 5))
+
+    assert prefix_history + forked_history == list(
+        run_model(create_model(engine, **parameters), 8)
+    )
+
+
+@pytest.mark.parametrize("engine", ["agents", "population"])
+@pytest.mark.parametrize("processes", [False, True])
+def test_branches_match_independent_runs(tmp_path, engine, processes):
+    def write_history(name, history):
+        with open(tmp_path / name, "w") as file:
+            file.writelines(
+                f"{list(agent_data)} {model_data}\n"
+                for agent_data, model_data in history
+            )
+
+    run_branches(create_model(engine), BRANCHES, 10, write_history, processes)
+
+    for branch in BRANCHES:
+        write_history(
+            f"{branch.name}-independent",
+            run_model(create_model(engine, **branch.parameters), 10),
+        )
+        assert (tmp_path / branch.name).read_text() == (
+            tmp_path / f"{branch.name}-independent"
+        ).read_text()
+
+
+def test_forked_population_shares_static_columns_only():
+    model = create_model("population")
+    fork = model.fork()
+
+    for shard, forked_shard in zip(model.shards, fork.shards):
+        for name in shard.STATIC_COLUMNS:
+            assert getattr(forked_shard, name) is getattr(shard, name)
+        assert forked_shard.heating_system is not shard.heating_system
+        assert forked_shard.rng is not shard.rng
+
+
+@pytest.mark.parametrize("engine", ["agents", "population"])
+def test_lockstep_scenarios_match_independent_runs(engine):
+    steps = list(
+        run_lockstep(
+            create_model(engine), [branch.parameters for branch in BRANCHES], 6
+        )
+    )
+
+    for index, branch in enumerate(BRANCHES):
+        assert [scenario_steps[index] for scenario_steps in steps] == list(
+            run_model(create_model(engine, **branch.parameters), 6)
+        )
+
+
+def test_setting_parameter_fixed_at_construction_raises_value_error():
+    with pytest.raises(ValueError):
+        create_model("agents").fork(heat_pump_awareness=0.5)
@@ -1,20 +1,28 @@
 import datetime
+import numbers
 import os
+import random
 import subprocess
 from pathlib import Path
 from unittest.mock import Mock
 
 import pandas as pd
 import pytest
+import smart_open
 from dateutil.relativedelta import relativedelta
 
 import simulation.__main__
-from abm import read_jsonlines
+import simulation.checkpoint
+from abm import history_to_dataframes, parquet_to_dataframes, read_jsonlines
 from simulation.__main__ import (
     check_parsed_target_heat_pump_awareness,
     parse_args,
+    run_replicate,
+    run_simulation,
     validate_args,
+    write_history_file,
 )
+from simulation.checkpoint import Checkpointer, write_checkpoint
 from simulation.constants import InterventionType
 
 
@@ -253,6 +261,39 @@ def test_running_simulation_twice_gives_non_identical_results(
         assert first_history == second_history
 
 
+def test_cached_run_is_copied_rather_than_run_again(households_file, tmp_path):
+    args = [
+        "python",
+        "-m",
+        "simulation",
+        "--seed",
+        "2021-01-01",
+        "--steps",
+        "12",
+        "--cache-dir",
+        str(tmp_path / "cache"),
+    ]
+
+    first_run = subprocess.run(
+        [*args, households_file, str(tmp_path / "first.jsonl")],
+        check=True,
+        capture_output=True,
+    )
+    second_run = subprocess.run(
+        [*args, households_file, str(tmp_path / "second.jsonl")],
+        check=True,
+        capture_output=True,
+    )
+
+    assert b"step completed" in first_run.stdout
+    assert b"history cached" in first_run.stdout
+    assert b"history copied from cache" in second_run.stdout
+    assert b"step completed" not in second_run.stdout
+    assert (tmp_path / "first.jsonl").read_text() == (
+        tmp_path / "second.jsonl"
+    ).read_text()
+
+
 def test_running_simulation_twice_with_same_seed_gives_identical_results(
     mandatory_local_args,
 ):
@@ -277,10 +318,220 @@ def test_running_simulation_twice_with_same_seed_gives_identical_results(
     assert first_history == second_history
 
 
+def test_parquet_history_file_matches_jsonlines_history_file(
+    households_file, output_file, tmp_path
+):
+    parquet_file = str(tmp_path / "output.parquet")
+    for history_file in [output_file, parquet_file]:
+        subprocess.run(
+            [
+                "python",
+                "-m",
+                "simulation",
+                households_file,
+                history_file,
+                "--seed",
+                "2021-01-01",
+            ],
+            check=True,
+        )
+
+    with open(output_file, "r") as file:
+        agent_history, model_history = history_to_dataframes(read_jsonlines(file))
+    with open(parquet_file, "rb") as file:
+        parquet_agent_history, parquet_model_history = parquet_to_dataframes(file)
+
+    assert len(parquet_agent_history) == len(agent_history)
+    assert len(parquet_model_history) == len(model_history)
+
+    # Parquet stores integers as floats
+    def values(column):
+        return [
+            None
+            if pd.isna(value)
+            else value
+            if isinstance(value, numbers.Number)
+            else str(value)
+            for value in column
+        ]
+
+    for column in agent_history.columns.drop("step"):
+        assert values(parquet_agent_history[column]) == values(agent_history[column])
+
+
+def test_resumed_simulation_appends_to_history_file(mandatory_local_args, tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl.gz")
+    args = [
+        "python",
+        "-m",
+        "simulation",
+        "--seed",
+        "2021-01-01",
+        "--steps",
+        "10",
+        *mandatory_local_args,
+    ]
+    history_file = mandatory_local_args[1]
+
+    subprocess.run(
+        [*args, "--checkpoint-file", checkpoint_file, "--checkpoint-interval", "4"],
+        check=True,
+    )
+    with open(history_file, "r") as file:
+        history = list(read_jsonlines(file))
+
+    subprocess.run([*args, "--resume-from", checkpoint_file], check=True)
+    with open(history_file, "r") as file:
+        resumed_history = list(read_jsonlines(file))
+
+    assert resumed_history == history
+
+
+@pytest.mark.parametrize("write_queue_steps", ["0", "2"])
+def test_run_with_encoding_processes_resumes_from_checkpoint_after_interruption(
+    households_file, tmp_path, monkeypatch, write_queue_steps
+):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl.gz")
+
+    def run(history_file, *extra_args, checkpoint=None):
+        args = parse_args(
+            [
+                households_file,
+                history_file,
+                "--seed",
+                "2021-01-01",
+                "--steps",
+                "10",
+                "--encoding-processes",
+                "2",
+                "--write-queue-steps",
+                write_queue_steps,
+                *extra_args,
+            ]
+        )
+        validate_args(args)
+        random.seed(args.seed)
+        history = run_simulation(args, 1, checkpoint)
+        write_history_file(args, history, history_file, checkpoint)
+
+    history_file = str(tmp_path / "history.jsonl")
+    run(history_file)
+    with open(history_file, "r") as file:
+        history = list(read_jsonlines(file))
+
+    class Interrupted(Exception):
+        pass
+
+    history_lines_at_checkpoint = []
+
+    def write_checkpoint_and_interrupt(path, model, steps_completed):
+        with open(interrupted_file, "r") as file:
+            history_lines_at_checkpoint.append(len(file.readlines()))
+        write_checkpoint(path, model, steps_completed)
+        raise Interrupted
+
+    interrupted_file = str(tmp_path / "interrupted.jsonl")
+    monkeypatch.setattr(
+        simulation.checkpoint, "write_checkpoint", write_checkpoint_and_interrupt
+    )
+    with pytest.raises(Interrupted):
+        run(interrupted_file, checkpoint=Checkpointer(checkpoint_file, 4))
+    monkeypatch.undo()
+
+    assert history_lines_at_checkpoint == [4]
+    run(interrupted_file, "--resume-from", checkpoint_file)
+    with open(interrupted_file, "r") as file:
+        assert list(read_jsonlines(file)) == history
+
+
+def test_history_written_in_background_matches_history_written_between_steps(
+    households_file, output_file, tmp_path
+):
+    background_output_file = str(tmp_path / "output.jsonl.gz")
+    args = ["python", "-m", "simulation", "--seed", "2021-01-01", "--steps", "10"]
+
+    subprocess.run([*args, households_file, output_file], check=True)
+    subprocess.run(
+        [
+            *args,
+            "--write-queue-steps",
+            "2",
+            "--encoding-processes",
+            "2",
+            households_file,
+            background_output_file,
+        ],
+        check=True,
+    )
+
+    with open(output_file, "r") as file:
+        history = list(read_jsonlines(file))
+    with smart_open.open(background_output_file, "r") as file:
+        background_history = list(read_jsonlines(file))
+
+    assert background_history == history
+
+
 def test_python_hash_randomization_is_disabled():
     assert os.environ["PYTHONHASHSEED"] == "0"
 
 
+def test_replicates_write_own_history_files_independent_of_workers(
+    households_file, tmp_path
+):
+    args = [
+        "python",
+        "-m",
+        "simulation",
+        "--seed",
+        "2021-01-01",
+        "--steps",
+        "6",
+        "--replicates",
+        "3",
+    ]
+
+    histories = {}
+    for workers in ["1", "2"]:
+        history_file = str(tmp_path / f"{workers}-workers-{{replicate}}.jsonl")
+        subprocess.run(
+            [*args, "--workers", workers, households_file, history_file],
+            check=True,
+        )
+        histories[workers] = []
+        for replicate in range(3):
+            with open(history_file.format(replicate=replicate), "r") as file:
+                histories[workers].append(list(read_jsonlines(file)))
+
+    assert histories["1"] == histories["2"]
+    with pytest.raises(AssertionError):
+        assert histories["1"][0] == histories["1"][1]
+
+
+def test_replicate_history_does_not_depend_on_replicates_run_before_it(
+    households_file, tmp_path
+):
+    args = parse_args(
+        [
+            households_file,
+            str(tmp_path / "history-{replicate}.jsonl"),
+            "--seed",
+            "2021-01-01",
+            "--steps",
+            "3",
+        ]
+    )
+
+    histories = []
+    for replicates in [[1], [0, 1]]:
+        for replicate in replicates:
+            history_file = run_replicate(args, replicate)
+        with open(history_file, "r") as file:
+            histories.append(list(read_jsonlines(file)))
+
+    assert histories[0] == histories[1]
+
+
 class TestValidateArgs:
     def test_ban_date_before_announcement_date_raises_value_error(
         self, mandatory_local_args
@@ -317,3 +568,95 @@ class TestValidateArgs:
 
         with pytest.raises(ValueError):
             validate_args(args)
+
+    def test_fewer_than_one_worker_raises_value_error(self, mandatory_local_args):
+        args = parse_args([*mandatory_local_args, "--workers", "0"])
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_keyframe_interval_less_than_one_raises_value_error(
+        self, mandatory_local_args
+    ):
+        args = parse_args([*mandatory_local_args, "--keyframe-interval", "0"])
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_keyframe_interval_with_parquet_history_file_raises_value_error(
+        self, households_file
+    ):
+        args = parse_args(
+            [households_file, "history.parquet", "--keyframe-interval", "12"]
+        )
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_checkpoint_interval_less_than_one_raises_value_error(
+        self, mandatory_local_args
+    ):
+        args = parse_args([*mandatory_local_args, "--checkpoint-interval", "0"])
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    @pytest.mark.parametrize(
+        "history_file", ["history.parquet", "gs://bucket/history.jsonl.gz"]
+    )
+    def test_resume_from_with_history_file_that_cannot_be_appended_to_raises_value_error(
+        self, households_file, history_file
+    ):
+        args = parse_args(
+            [households_file, history_file, "--resume-from", "checkpoint.pkl.gz"]
+        )
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_negative_write_queue_steps_raises_value_error(self, mandatory_local_args):
+        args = parse_args([*mandatory_local_args, "--write-queue-steps", "-1"])
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_encoding_processes_with_parquet_history_file_raises_value_error(
+        self, households_file
+    ):
+        args = parse_args(
+            [households_file, "history.parquet", "--encoding-processes", "2"]
+        )
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_replicates_without_replicate_in_history_file_raises_value_error(
+        self, mandatory_local_args
+    ):
+        args = parse_args([*mandatory_local_args, "--replicates", "2"])
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_replicates_with_checkpoint_file_raises_value_error(
+        self, households_file, tmp_path
+    ):
+        args = parse_args(
+            [
+                households_file,
+                str(tmp_path / "history-{replicate}.jsonl"),
+                "--replicates",
+                "2",
+                "--checkpoint-file",
+                "checkpoint.pkl.gz",
+            ]
+        )
+        with pytest.raises(ValueError):
+            validate_args(args)
+
+    def test_cache_dir_with_resume_from_raises_value_error(
+        self, mandatory_local_args, tmp_path
+    ):
+        args = parse_args(
+            [
+                *mandatory_local_args,
+                "--cache-dir",
+                str(tmp_path / "cache"),
+                "--resume-from",
+                "checkpoint.pkl.gz",
+            ]
+        )
+        with pytest.raises(ValueError):
+            validate_args(args)
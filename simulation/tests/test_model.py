@@ -39,22 +39,19 @@ class TestDomesticHeatingABM:
         model = model_factory()
         assert model.boiler_upgrade_scheme_cumulative_spend_gbp == 0
 
-        household_using_boiler_upgrade_grant_ASHP = household_factory()
-        household_using_boiler_upgrade_grant_ASHP.boiler_upgrade_grant_used = 7_500
+        # Grants reach the ledger as households are awarded them, e.g. an ASHP and a GSHP
+        model.award_boiler_upgrade_grant(7_500)
+        model.award_boiler_upgrade_grant(7_500)
 
-        household_using_boiler_upgrade_grant_GSHP = household_factory()
-        household_using_boiler_upgrade_grant_GSHP.boiler_upgrade_grant_used = 7_500
-
-        model.add_agents(
-            [
-                household_using_boiler_upgrade_grant_ASHP,
-                household_using_boiler_upgrade_grant_GSHP,
-            ]
-        )
+        model.increment_timestep()
+        assert model.boiler_upgrade_scheme_cumulative_spend_gbp == 15_000
 
+        # Spend at the current step is reset, so only new awards add to the total
         model.increment_timestep()
         assert model.boiler_upgrade_scheme_cumulative_spend_gbp == 15_000
 
+        model.award_boiler_upgrade_grant(7_500)
+        model.award_boiler_upgrade_grant(7_500)
         model.increment_timestep()
         assert model.boiler_upgrade_scheme_cumulative_spend_gbp == 30_000
 
@@ -275,6 +272,55 @@ class TestDomesticHeatingABM:
         model.increment_timestep()
         assert model.campaign_target_heat_pump_awareness == 0.7
 
+    def test_compiled_policy_timeline_matches_policy_computed_at_each_step(self):
+        def policy_inputs(model):
+            return (
+                model.heat_pump_installation_capacity_per_step_existing_builds,
+                model.heating_systems,
+                model.air_source_heat_pump_discount_factor,
+                model.policy.proba_rule_out_banned_heating_systems,
+            )
+
+        model_attributes = dict(
+            start_datetime=datetime.datetime(2024, 1, 1),
+            interventions=[InterventionType.GAS_OIL_BOILER_BAN],
+            gas_oil_boiler_ban_announce_datetime=datetime.datetime(2024, 6, 1),
+            gas_oil_boiler_ban_datetime=datetime.datetime(2025, 1, 1),
+            air_source_heat_pump_price_discount_schedule=[
+                (datetime.datetime(2024, 3, 1), 0.3)
+            ],
+        )
+        model = model_factory(**model_attributes)
+        model.add_agents(household_factory() for _ in range(10))
+        model.compile_policy_timeline(18)
+        assert len(model.policy_timeline) == 18
+
+        uncompiled_model = model_factory(**model_attributes)
+        uncompiled_model.add_agents(household_factory() for _ in range(10))
+        for _ in range(18):
+            model.increment_timestep()
+            uncompiled_model.increment_timestep()
+            uncompiled_model.policy_timeline.clear()
+            assert policy_inputs(model) == policy_inputs(uncompiled_model)
+
+    def test_adding_households_recomputes_policy_timeline(self):
+        # As many installers as households, so the floor sets the installer count
+        model = model_factory(
+            heat_pump_installer_count=ENGLAND_WALES_HOUSEHOLD_COUNT_2020
+        )
+        model.add_agent(household_factory())
+        heat_pump_installers = model.heat_pump_installers
+        assert model.current_datetime in model.policy_timeline
+
+        model.add_agents(
+            household_factory()
+            for _ in range(HOUSEHOLDS_PER_HEAT_PUMP_INSTALLER_FLOOR * 2)
+        )
+
+        assert model.policy_timeline == {}
+        assert heat_pump_installers == 1
+        assert model.heat_pump_installers == 2
+
 
 class test_household_agents:
 
@@ -0,0 +1,352 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from simulation.agents import DerivedAttributes
+from simulation.collectors import get_agent_collectors, get_population_collectors
+from simulation.constants import (
+    HEATING_SYSTEM_LIFETIME_YEARS,
+    EPCRating,
+    HeatingSystem,
+    InterventionType,
+    PropertyType,
+)
+from simulation.costs import (
+    DECOMMISSIONING_COST_MAX,
+    DECOMMISSIONING_COST_MIN,
+    get_unit_and_install_costs,
+)
+from simulation.model import (
+    create_and_run_simulation,
+    create_household_agents,
+    create_population_simulation,
+    run_model,
+)
+from simulation.population import IS_HEAT_PUMP, choose_heating_systems
+from simulation.synthetic import household_population_factory
+from simulation.tests.common import model_factory, population_model_factory
+
+
+@pytest.fixture
+def household_population():
+    return household_population_factory(500)
+
+
+@pytest.fixture
+def households(household_population):
+    return list(
+        create_household_agents(
+            household_population,
+            [True] * len(household_population),
+            datetime.datetime(2024, 1, 1),
+            all_agents_heat_pump_suitable=False,
+        )
+    )
+
+
+class TestHouseholdPopulation:
+    def test_from_dataframe_stores_household_attributes_as_codes(
+        self, household_population
+    ) -> None:
+        start_datetime = datetime.datetime(2024, 1, 1)
+        model = population_model_factory(
+            household_population, start_datetime=start_datetime
+        )
+        population = model.population
+
+        assert len(population) == len(household_population)
+        assert model.household_count == len(household_population)
+        assert population.id.tolist() == household_population["id"].tolist()
+        assert population.location.tolist() == household_population["location"].tolist()
+        assert population.property_type.tolist() == [
+            PropertyType[name].value for name in household_population["property_type"]
+        ]
+        assert population.heating_system_previous.tolist() == [-1] * len(population)
+
+        install_dates = population.heating_system_install_date
+        assert (install_dates <= np.datetime64(start_datetime.date())).all()
+        assert (
+            install_dates
+            >= np.datetime64(start_datetime.date())
+            - np.timedelta64(365 * HEATING_SYSTEM_LIFETIME_YEARS, "D")
+        ).all()
+
+    def test_heat_pump_owners_are_heat_pump_aware(self, household_population) -> None:
+        model = population_model_factory(household_population, heat_pump_awareness=0)
+        population = model.population
+
+        assert (
+            population.is_heat_pump_aware == IS_HEAT_PUMP[population.heating_system]
+        ).all()
+
+    def test_derived_attributes_match_household_agents(
+        self, household_population, households
+    ) -> None:
+        population = population_model_factory(household_population).population
+
+        for i, household in enumerate(households):
+            assert population.wealth_percentile[i] == pytest.approx(
+                household.wealth_percentile
+            )
+            assert population.discount_rate[i] == pytest.approx(household.discount_rate)
+            assert population.renovation_budget[i] == pytest.approx(
+                household.renovation_budget
+            )
+            assert (
+                population.insulation_segment[i] == household.insulation_segment.value
+            )
+            assert population.property_size[i] == household.property_size.value
+            assert (
+                population.is_heat_pump_suitable[i] == household.is_heat_pump_suitable
+            )
+
+    def test_household_agents_are_created_with_derived_attributes(
+        self, households
+    ) -> None:
+        for household in households:
+            derived_attributes = DerivedAttributes(
+                *(getattr(household, name) for name in DerivedAttributes._fields)
+            )
+            household.update_derived_attributes()
+
+            for name, value in derived_attributes._asdict().items():
+                assert value == pytest.approx(getattr(household, name))
+
+    def test_heating_fuel_costs_match_household_agents(
+        self, household_population, households
+    ) -> None:
+        model = population_model_factory(household_population)
+        index = np.arange(len(households))
+        costs = model.population.get_heating_fuel_costs(model, index)
+
+        for i, household in enumerate(households):
+            for heating_system in HeatingSystem:
+                assert costs[i, heating_system.value] == pytest.approx(
+                    household.get_heating_fuel_costs(heating_system, model)
+                )
+
+    def test_unit_and_install_costs_match_household_agents_plus_decommissioning(
+        self, household_population, households, monkeypatch
+    ) -> None:
+        model = population_model_factory(
+            household_population,
+            air_source_heat_pump_price_discount_schedule=[
+                (datetime.datetime(2020, 1, 1), 0.3)
+            ],
+        )
+        index = np.arange(len(households))
+        costs = model.population.get_unit_and_install_costs(model, index)
+
+        for i, household in enumerate(households):
+            monkeypatch.setattr(household.randomness, "randint", lambda a, b: 0)
+            for heating_system in HeatingSystem:
+                expected = get_unit_and_install_costs(household, heating_system, model)
+                if heating_system == household.heating_system:
+                    assert costs[i, heating_system.value] == expected
+                else:
+                    assert (
+                        expected + DECOMMISSIONING_COST_MIN
+                        <= costs[i, heating_system.value]
+                        <= expected + DECOMMISSIONING_COST_MAX
+                    )
+
+    def test_heat_pump_installations_stop_at_installation_capacity(
+        self, household_population
+    ) -> None:
+        model = population_model_factory(
+            household_population,
+            start_datetime=datetime.datetime(2030, 1, 1),
+            heat_pump_installer_count=50_000_000,
+            # An announced ban makes heat pumps feasible following a breakdown
+            interventions=[
+                InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME,
+                InterventionType.GAS_OIL_BOILER_BAN,
+            ],
+            heat_pump_awareness=1,
+        )
+        population = model.population
+        population.heating_system[:] = HeatingSystem.BOILER_GAS.value
+        # Every heating system breaks down
+        population.heating_system_install_date[:] = np.datetime64("1950-01-01")
+
+        model.increment_timestep()
+        capacity = model.heat_pump_installation_capacity_per_step_existing_builds
+        model.step()
+
+        assert 0 < capacity < len(population)
+        assert model.heat_pump_installations_at_current_step == capacity
+        assert IS_HEAT_PUMP[population.heating_system].sum() == capacity
+
+    def test_heat_pump_awareness_campaign_stops_at_target(
+        self, household_population
+    ) -> None:
+        household_population["heating_system"] = HeatingSystem.BOILER_GAS.name
+        model = population_model_factory(
+            household_population,
+            start_datetime=datetime.datetime(2025, 1, 1),
+            step_interval=relativedelta(months=1),
+            interventions=[InterventionType.HEAT_PUMP_CAMPAIGN],
+            heat_pump_awareness=0.1,
+            heat_pump_awareness_campaign_schedule=[
+                (datetime.datetime(2025, 2, 1), 0.6)
+            ],
+        )
+
+        model.increment_timestep()
+        model.population.update_heat_pump_awareness(model)
+
+        assert model.heat_pump_awareness_at_timestep == pytest.approx(0.6, abs=0.01)
+
+    def test_households_do_not_switch_to_banned_heating_systems(
+        self, household_population
+    ) -> None:
+        model = population_model_factory(
+            household_population,
+            start_datetime=datetime.datetime(2036, 1, 1),
+            interventions=[InterventionType.GAS_OIL_BOILER_BAN],
+        )
+        population = model.population
+        population.heating_system_install_date[:] = np.datetime64("1950-01-01")
+
+        model.increment_timestep()
+        model.step()
+
+        switched = population.heating_system != population.heating_system_previous
+        assert switched.any()
+        assert not np.isin(
+            population.heating_system[switched],
+            [HeatingSystem.BOILER_GAS.value, HeatingSystem.BOILER_OIL.value],
+        ).any()
+
+
+def test_population_collectors_match_agent_collector_names() -> None:
+    model = model_factory()
+    assert [collector.__name__ for collector in get_population_collectors(model)] == [
+        collector.__name__ for collector in get_agent_collectors(model)
+    ]
+
+
+def test_population_engine_with_same_seed_gives_identical_results() -> None:
+    def run():
+        random.seed(1)
+        history = create_and_run_simulation(
+            start_datetime=datetime.datetime(2024, 1, 1),
+            step_interval=relativedelta(months=1),
+            time_steps=12,
+            household_population=household_population_factory(200),
+            heat_pump_awareness=0.4,
+            annual_renovation_rate=0.1,
+            household_num_lookahead_years=3,
+            heating_system_hassle_factor=0.1,
+            rented_heating_system_hassle_factor=0.4,
+            interventions=[InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME],
+            all_agents_heat_pump_suitable=False,
+            gas_oil_boiler_ban_datetime=datetime.datetime(2035, 1, 1),
+            gas_oil_boiler_ban_announce_datetime=datetime.datetime(2025, 1, 1),
+            price_gbp_per_kwh_gas=0.062,
+            price_gbp_per_kwh_electricity=0.245,
+            price_gbp_per_kwh_oil=0.068,
+            air_source_heat_pump_price_discount_schedule=None,
+            heat_pump_installer_count=10_800,
+            heat_pump_installer_annual_growth_rate=0.48,
+            annual_new_builds=None,
+            heat_pump_awareness_campaign_schedule=None,
+            engine="population",
+        )
+        return list(history)
+
+    first_history, second_history = run(), run()
+
+    assert len(first_history) == 12
+    assert first_history == second_history
+    assert "household_potential_epc" in first_history[0][0][0]
+    assert "household_potential_epc" not in first_history[1][0][0]
+    assert EPCRating[first_history[-1][0][0]["household_epc"]]
+
+
+def test_common_random_numbers_are_shared_by_scenarios() -> None:
+    def run(**model_attributes):
+        random.seed(0)
+        model = create_population_simulation(
+            household_population_factory(300),
+            heat_pump_awareness=0.4,
+            all_agents_heat_pump_suitable=False,
+            common_random_numbers=True,
+            start_datetime=datetime.datetime(2024, 1, 1),
+            step_interval=relativedelta(months=3),
+            annual_renovation_rate=0.5,
+            household_num_lookahead_years=3,
+            heating_system_hassle_factor=0.1,
+            rented_heating_system_hassle_factor=0.4,
+            gas_oil_boiler_ban_datetime=datetime.datetime(2030, 1, 1),
+            price_gbp_per_kwh_gas=0.062,
+            price_gbp_per_kwh_electricity=0.245,
+            price_gbp_per_kwh_oil=0.068,
+            air_source_heat_pump_price_discount_schedule=None,
+            heat_pump_installer_count=10_800,
+            heat_pump_installer_annual_growth_rate=0.48,
+            annual_new_builds=None,
+            heat_pump_awareness_campaign_schedule=None,
+            **model_attributes,
+        )
+        list(run_model(model, 4))
+        return model.shards
+
+    no_ban = run(
+        interventions=[],
+        gas_oil_boiler_ban_announce_datetime=datetime.datetime(2030, 1, 1),
+    )
+    # Households ruling out banned boilers make draws in this scenario only
+    ban = run(
+        interventions=[InterventionType.GAS_OIL_BOILER_BAN],
+        gas_oil_boiler_ban_announce_datetime=datetime.datetime(2024, 1, 1),
+    )
+
+    for shard, ban_shard in zip(no_ban, ban):
+        assert shard.is_renovating.any()
+        assert (shard.is_renovating == ban_shard.is_renovating).all()
+        assert (
+            shard.renovate_heating_system == ban_shard.renovate_heating_system
+        ).all()
+
+
+def test_choose_heating_systems_samples_in_proportion_to_weights() -> None:
+    rng = np.random.default_rng(0)
+    n = 20_000
+    costs = np.tile(np.log([1, 2, 4, 8, 16]) * 1_000, (n, 1))
+    options = np.ones_like(costs, dtype=bool)
+    options[:, 4] = False
+
+    chosen = choose_heating_systems(
+        rng,
+        costs,
+        options,
+        np.full(n, 1_000.0),
+        np.zeros_like(options),
+        np.zeros(n),
+        np.zeros(n, dtype=np.int8),
+    )
+
+    frequencies = np.bincount(chosen, minlength=5) / n
+    expected = np.array([8, 4, 2, 1, 0]) / 15
+    assert frequencies == pytest.approx(expected, abs=0.02)
+
+
+def test_households_far_out_of_budget_repair_heating_system() -> None:
+    rng = np.random.default_rng(0)
+    costs = np.array([[1e9] * 5, [1e9, 1e9, 1e9, 1e9, 0]])
+
+    chosen = choose_heating_systems(
+        rng,
+        costs,
+        np.ones_like(costs, dtype=bool),
+        np.full(2, 1_000.0),
+        np.ones_like(costs, dtype=bool),
+        np.full(2, 0.5),
+        np.array([HeatingSystem.BOILER_OIL.value] * 2),
+    )
+
+    assert chosen.tolist() == [HeatingSystem.BOILER_OIL.value, 4]
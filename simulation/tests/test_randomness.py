@@ -0,0 +1,103 @@
+import datetime
+import random
+
+import numpy as np
+
+import simulation.randomness
+from simulation.model import create_simulation, run_model
+from simulation.randomness import BATCH_SIZE, CommonRandomNumbers, Randomness, Stream
+from simulation.synthetic import household_population_factory
+from simulation.tests.common import model_attributes_factory
+
+
+def test_same_seed_gives_same_draws():
+    first, second = Randomness(0), Randomness(0)
+    first.draw_step(10)
+    second.draw_step(10)
+
+    assert first.renovation == second.renovation
+    assert [first.random() for _ in range(BATCH_SIZE + 1)] == [
+        second.random() for _ in range(BATCH_SIZE + 1)
+    ]
+
+
+def test_step_draws_are_looked_up_by_household_index():
+    randomness = Randomness(0)
+    randomness.draw_step(3)
+
+    assert len(randomness.heating_status) == 3
+    assert all(0 <= draw < 1 for draw in randomness.heat_pump_awareness)
+
+
+def test_draws_outside_a_step_are_fresh():
+    randomness = Randomness(0)
+    assert randomness.renovation[None] != randomness.renovation[None]
+
+
+def test_randint_is_within_bounds():
+    randomness = Randomness(0)
+    draws = {randomness.randint(2, 4) for _ in range(1_000)}
+    assert draws == {2, 3, 4}
+
+
+def test_choice_never_chooses_zero_weight():
+    randomness = Randomness(0)
+    draws = {randomness.choice(["a", "b", "c"], [1, 0, 1]) for _ in range(1_000)}
+    assert draws == {"a", "c"}
+
+
+def test_common_random_numbers_are_keyed_by_household_not_index():
+    household_id = np.arange(100, 200)
+    common_random_numbers = CommonRandomNumbers(0, household_id)
+    common_random_numbers.start_step(datetime.datetime(2024, 1, 1))
+    reordered = CommonRandomNumbers(0, household_id[::-1])
+    reordered.start_step(datetime.datetime(2024, 1, 1))
+
+    draws = common_random_numbers.random(Stream.RENOVATION, np.arange(100))
+    assert (reordered.random(Stream.RENOVATION, np.arange(100)) == draws[::-1]).all()
+    assert (
+        common_random_numbers.random(Stream.RENOVATION, np.array([3, 7]))
+        == draws[[3, 7]]
+    ).all()
+
+
+def test_common_random_numbers_differ_by_stream_step_and_seed():
+    household_id = np.arange(1_000)
+    common_random_numbers = CommonRandomNumbers(0, household_id)
+    index = np.arange(1_000)
+
+    renovation = common_random_numbers.random(Stream.RENOVATION, index)
+    assert ((0 < renovation) & (renovation < 1)).all()
+    assert abs(renovation.mean() - 0.5) < 0.05
+    heating_status = common_random_numbers.random(Stream.HEATING_STATUS, index)
+    assert (renovation != heating_status).all()
+    other_seed = CommonRandomNumbers(1, household_id)
+    assert (renovation != other_seed.random(Stream.RENOVATION, index)).all()
+
+    common_random_numbers.start_step(datetime.datetime(2024, 1, 1))
+    assert (renovation != common_random_numbers.random(Stream.RENOVATION, index)).all()
+
+    columns = common_random_numbers.random(Stream.HEATING_SYSTEM_CHOICE, index, 5)
+    assert columns.shape == (1_000, 5)
+    assert len(np.unique(columns)) == columns.size
+
+
+def test_seeded_runs_in_one_process_give_identical_history(monkeypatch):
+    # As in a fresh process, where the first households constructed set the default
+    monkeypatch.setattr(simulation.randomness, "_default_randomness", None)
+
+    def run():
+        attributes = model_attributes_factory(
+            start_datetime=datetime.datetime(2024, 1, 1)
+        )
+        del attributes["population_heat_pump_awareness"]
+        random.seed(0)
+        model = create_simulation(
+            household_population_factory(50),
+            attributes.pop("heat_pump_awareness"),
+            all_agents_heat_pump_suitable=False,
+            **attributes,
+        )
+        return list(run_model(model, 6))
+
+    assert run() == run()
@@ -0,0 +1,212 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+from structlog.testing import capture_logs
+
+from simulation.constants import (
+    ENGLAND_WALES_ANNUAL_NEW_BUILDS,
+    HEAT_PUMPS,
+    HeatingSystem,
+    InterventionType,
+)
+from simulation.model import create_population_simulation, run_model
+from simulation.sharding import remaining_in_order, shard_bounds
+from simulation.synthetic import household_population_factory
+
+
+def test_shard_bounds_cover_every_household_once():
+    bounds = shard_bounds(10, shard_size=4)
+    assert bounds == [slice(0, 4), slice(4, 8), slice(8, 10)]
+
+
+def test_remaining_in_order_takes_requests_in_shard_order():
+    assert remaining_in_order([2, 0, 3, 4], 4) == [4, 2, 2, 0]
+    assert remaining_in_order([1, 1], 5) == [5, 4]
+
+
+def run_population_simulation(household_population, runs=(8,), **kwargs):
+    random.seed(0)
+    model_attributes = {
+        "heat_pump_awareness": 0.3,
+        "all_agents_heat_pump_suitable": False,
+        "start_datetime": datetime.datetime(2024, 1, 1),
+        "step_interval": relativedelta(months=3),
+        "annual_renovation_rate": 0.3,
+        "household_num_lookahead_years": 3,
+        "heating_system_hassle_factor": 0.1,
+        "rented_heating_system_hassle_factor": 0.4,
+        "interventions": [
+            InterventionType.EXTENDED_BOILER_UPGRADE_SCHEME,
+            InterventionType.GAS_OIL_BOILER_BAN,
+            InterventionType.HEAT_PUMP_CAMPAIGN,
+        ],
+        "gas_oil_boiler_ban_datetime": datetime.datetime(2030, 1, 1),
+        "gas_oil_boiler_ban_announce_datetime": datetime.datetime(2024, 1, 1),
+        "price_gbp_per_kwh_gas": 0.062,
+        "price_gbp_per_kwh_electricity": 0.245,
+        "price_gbp_per_kwh_oil": 0.068,
+        "air_source_heat_pump_price_discount_schedule": None,
+        "heat_pump_installer_count": 5_000_000,
+        "heat_pump_installer_annual_growth_rate": 0.48,
+        "annual_new_builds": ENGLAND_WALES_ANNUAL_NEW_BUILDS,
+        "heat_pump_awareness_campaign_schedule": [(datetime.datetime(2024, 6, 1), 0.6)],
+    }
+    model = create_population_simulation(
+        household_population, **{**model_attributes, **kwargs}
+    )
+    return [step for time_steps in runs for step in run_model(model, time_steps)]
+
+
+@pytest.fixture(scope="module")
+def household_population():
+    return household_population_factory(2_000)
+
+
+@pytest.fixture(scope="module")
+def single_worker_history(household_population):
+    return run_population_simulation(household_population, workers=1, shard_size=300)
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_history_does_not_depend_on_number_of_workers(
+    household_population, single_worker_history, workers
+):
+    history = run_population_simulation(
+        household_population, workers=workers, shard_size=300
+    )
+    assert history == single_worker_history
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_model_runs_on_from_where_last_run_stopped(
+    household_population, single_worker_history, workers
+):
+    history = run_population_simulation(
+        household_population, runs=(3, 5), workers=workers, shard_size=300
+    )
+    assert history == single_worker_history
+
+
+def test_heat_pump_installations_stop_at_capacity_across_shards(
+    household_population,
+):
+    def run(workers):
+        return run_population_simulation(
+            household_population,
+            step_interval=relativedelta(months=1),
+            heat_pump_awareness=1,
+            all_agents_heat_pump_suitable=True,
+            price_gbp_per_kwh_gas=0.2,
+            price_gbp_per_kwh_oil=0.2,
+            heat_pump_installer_count=50_000,
+            annual_new_builds=None,
+            workers=workers,
+            shard_size=300,
+        )
+
+    history = run(workers=1)
+    assert run(workers=3) == history
+
+    capacity_reached = False
+
+    for agent_data, model_data in history:
+        heat_pump_installations = sum(
+            HeatingSystem[household["household_heating_system"]] in HEAT_PUMPS
+            and household["household_heating_install_date"]
+            == model_data["model_current_datetime"].date()
+            and household.get("household_heating_system_previous") is not None
+            for household in agent_data
+        )
+        assert (
+            model_data["model_heat_pump_installations_at_current_step"]
+            == heat_pump_installations
+        )
+        capacity = model_data["model_heat_pump_installation_capacity_per_step"]
+        assert heat_pump_installations <= capacity
+        capacity_reached |= heat_pump_installations == capacity
+
+    assert capacity_reached
+
+
+def test_heat_pump_awareness_campaign_is_reconciled_across_shards(
+    single_worker_history,
+):
+    awareness = [
+        model_data["model_heat_pump_awareness_at_timestep"]
+        for _, model_data in single_worker_history
+    ]
+    assert max(awareness) <= 0.6
+    assert awareness[-1] > awareness[0]
+
+
+def test_boiler_upgrade_scheme_spend_is_summed_across_shards(single_worker_history):
+    assert single_worker_history[-1][1][
+        "model_boiler_upgrade_scheme_cumulative_spend_gbp"
+    ]
+    for (agent_data, model_data), (_, next_model_data) in zip(
+        single_worker_history, single_worker_history[1:]
+    ):
+        spend = sum(
+            household["household_boiler_upgrade_grant_used"] for household in agent_data
+        )
+        assert (
+            next_model_data["model_boiler_upgrade_scheme_cumulative_spend_gbp"]
+            == model_data["model_boiler_upgrade_scheme_cumulative_spend_gbp"] + spend
+        )
+
+
+def test_shard_size_changes_random_streams(household_population, single_worker_history):
+    history = run_population_simulation(household_population, shard_size=500)
+    assert len(history) == len(single_worker_history)
+    assert history != single_worker_history
+    assert np.isclose(
+        history[0][1]["model_heat_pump_awareness_at_timestep"],
+        single_worker_history[0][1]["model_heat_pump_awareness_at_timestep"],
+        atol=0.1,
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_phase_timings_are_gathered_from_every_shard(household_population, workers):
+    with capture_logs() as logs:
+        run_population_simulation(household_population, workers=workers, shard_size=300)
+
+    step_logs = [log for log in logs if log["event"] == "step completed"]
+    assert len(step_logs) == 8
+    for log in step_logs:
+        for phase in [
+            "update_heat_pump_awareness",
+            "update_heating_status",
+            "evaluate_renovation",
+            "collect",
+        ]:
+            assert log[f"{phase}_count"] == len(household_population)
+        assert (
+            log["filter_heating_system_options_count"]
+            == log["evaluate_heating_system_costs_count"]
+            == log["choose_heating_system_count"]
+            > 0
+        )
+
+
+def test_breakdown_calendar_history_does_not_depend_on_number_of_workers(
+    household_population,
+):
+    def run(workers):
+        return run_population_simulation(
+            household_population,
+            breakdown_calendar=True,
+            workers=workers,
+            shard_size=300,
+        )
+
+    history = run(workers=1)
+    assert run(workers=2) == history
+    assert any(
+        not household["household_heating_functioning"]
+        for agent_data, _ in history
+        for household in agent_data
+    )
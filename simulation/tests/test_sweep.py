@@ -0,0 +1,222 @@
+import json
+
+import pytest
+
+from abm import read_jsonlines
+from simulation.benchmark import SCENARIOS
+from simulation.sweep import Scenario, read_scenarios, run_adaptive_sweep, run_sweep
+from simulation.synthetic import household_population_factory
+
+
+def job(name, args):
+    return {
+        "apiVersion": "batch/v1",
+        "kind": "Job",
+        "metadata": {"name": name},
+        "spec": {
+            "completions": 10,
+            "template": {
+                "spec": {
+                    "containers": [
+                        {
+                            "command": ["python", "-m", "simulation"],
+                            "args": args
+                            + [
+                                "--bigquery",
+                                "select * from household_agents",
+                                "gs://bucket/name/{uuid}/output.jsonl.gz",
+                            ],
+                        }
+                    ]
+                }
+            },
+        },
+    }
+
+
+class TestReadScenarios:
+    def test_reads_mapping_of_names_to_arguments(self):
+        scenarios = read_scenarios(json.dumps(SCENARIOS))
+        assert scenarios == [Scenario(name, args) for name, args in SCENARIOS.items()]
+
+    def test_reads_list_of_scenarios(self):
+        scenarios = read_scenarios(
+            json.dumps(
+                [
+                    {"name": "baseline", "args": []},
+                    {"name": "ban", "args": ["--intervention", "gas_oil_boiler_ban"]},
+                ]
+            )
+        )
+        assert scenarios == [
+            Scenario("baseline", []),
+            Scenario("ban", ["--intervention", "gas_oil_boiler_ban"]),
+        ]
+
+    def test_reads_rendered_jobs_without_population_or_history_file(self):
+        args = ["--intervention", "heat_pump_campaign"]
+        text = "".join(
+            f"---\n{json.dumps(job(name, args), indent=3)}\n" for name in ["a", "b"]
+        )
+
+        scenarios = read_scenarios(text + "...\n")
+
+        assert scenarios == [Scenario("a", args, 10), Scenario("b", args, 10)]
+
+    def test_duplicate_names_raise_value_error(self):
+        with pytest.raises(ValueError):
+            read_scenarios(json.dumps([job("a", []), job("a", [])]))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_sweep_writes_every_replicate_of_every_scenario(tmp_path, workers):
+    scenarios = [Scenario(name, args) for name, args in SCENARIOS.items()]
+
+    history_files = run_sweep(
+        scenarios,
+        household_population_factory(50),
+        str(tmp_path),
+        workers,
+        "2024-01-01",
+        replicates=2,
+        time_steps=3,
+        history_format="jsonl",
+    )
+
+    assert history_files == [
+        str(tmp_path / scenario.name / f"history-{replicate}.jsonl")
+        for scenario in scenarios
+        for replicate in range(2)
+    ]
+    for history_file in history_files:
+        with open(history_file, "r") as file:
+            assert len(list(read_jsonlines(file))) == 3
+
+
+def test_run_sweep_does_not_depend_on_number_of_workers(tmp_path):
+    scenarios = [Scenario(name, args) for name, args in SCENARIOS.items()]
+    households = household_population_factory(50)
+
+    histories = []
+    for workers in [1, 3]:
+        history_files = run_sweep(
+            scenarios,
+            households,
+            str(tmp_path / f"{workers}-workers"),
+            workers,
+            "2024-01-01",
+            replicates=2,
+            time_steps=3,
+            history_format="jsonl",
+        )
+        histories.append([])
+        for history_file in history_files:
+            with open(history_file, "r") as file:
+                histories[-1].append(list(read_jsonlines(file)))
+
+    assert histories[0] == histories[1]
+
+
+@pytest.mark.parametrize("mode", ["fork", "lockstep"])
+def test_scenarios_run_together_match_sweep(tmp_path, mode):
+    scenarios = [Scenario("no-ban", [])] + [
+        Scenario(
+            f"ban-announced-{year}",
+            [
+                "--intervention",
+                "gas_oil_boiler_ban",
+                "--gas-oil-boiler-ban-announce-date",
+                f"{year}-01-01",
+            ],
+        )
+        for year in [2025, 2026]
+    ]
+    households = household_population_factory(50)
+
+    histories = []
+    for together in [False, True]:
+        history_files = run_sweep(
+            scenarios,
+            households,
+            str(tmp_path / f"{mode}-{together}"),
+            2,
+            "2024-01-01",
+            replicates=2,
+            time_steps=12,
+            history_format="jsonl",
+            **{mode: together},
+        )
+        histories.append([])
+        for history_file in history_files:
+            with open(history_file, "r") as file:
+                histories[-1].append(list(read_jsonlines(file)))
+
+    assert histories[0] == histories[1]
+
+
+def read_histories(history_files):
+    histories = []
+    for history_file in history_files:
+        with open(history_file, "r") as file:
+            histories.append(list(read_jsonlines(file)))
+    return histories
+
+
+@pytest.mark.parametrize("tolerance, replicates", [(1e9, 2), (1e-9, 4)])
+def test_adaptive_sweep_runs_batches_until_tolerance_or_max_replicates(
+    tmp_path, tolerance, replicates
+):
+    # Every household is aware of heat pumps and renovates, so installations vary
+    args = [
+        "--annual-renovation-rate",
+        "1",
+        "--heat-pump-awareness",
+        "1",
+        "--intervention",
+        "extended_boiler_upgrade_scheme",
+    ]
+    scenarios = [
+        Scenario("renovating", args),
+        Scenario("renovating-gas-price", args + ["--price-gbp-per-kwh-gas", "0.1"]),
+    ]
+    households = household_population_factory(100)
+
+    history_files = run_adaptive_sweep(
+        scenarios,
+        households,
+        str(tmp_path / "adaptive"),
+        2,
+        "2024-01-01",
+        tolerance,
+        batch_replicates=2,
+        max_replicates=4,
+        time_steps=6,
+        history_format="jsonl",
+    )
+    fixed_history_files = run_sweep(
+        scenarios,
+        households,
+        str(tmp_path / "fixed"),
+        2,
+        "2024-01-01",
+        replicates=replicates,
+        time_steps=6,
+        history_format="jsonl",
+    )
+
+    assert len(history_files) == len(scenarios) * replicates
+    assert read_histories(history_files) == read_histories(fixed_history_files)
+
+
+def test_adaptive_sweep_rejects_batches_larger_than_max_replicates(tmp_path):
+    with pytest.raises(ValueError):
+        run_adaptive_sweep(
+            [Scenario("baseline", [])],
+            household_population_factory(50),
+            str(tmp_path),
+            1,
+            "2024-01-01",
+            0.1,
+            batch_replicates=5,
+            max_replicates=4,
+        )
@@ -1,19 +1,33 @@
 import datetime
+import functools
+import io
+import json
 import pathlib
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
 
 import pandas as pd
 import pytest
+from structlog.testing import capture_logs
 
+import abm
 from abm import (
     Agent,
     AgentBasedModel,
+    AgentColumns,
+    BackgroundWriter,
+    CollectorPlan,
     History,
+    PendingLines,
     UnorderedSpace,
     collect_when,
+    column_collector,
     history_to_dataframes,
+    jsonlines_to_dataframes,
+    parquet_to_dataframes,
     read_jsonlines,
     write_jsonlines,
+    write_parquet,
 )
 
 
@@ -110,6 +124,29 @@ class TestAgentBasedModel:
             for agent in agents:
                 assert agent == {"agent_callable_returning_false": False}
 
+    def test_run_logs_phase_timings_with_each_step(self) -> None:
+        class TimedAgent(Agent):
+            def make_decisions(
+                self, model: Optional["AgentBasedModel[TimedAgent]"] = None  # noqa
+            ) -> None:
+                assert model is not None
+                with model.phase_timings.time("decide"):
+                    pass
+
+        model = AgentBasedModel[TimedAgent]()
+        model.add_agents([TimedAgent(), TimedAgent(), TimedAgent()])
+
+        with capture_logs() as logs:
+            for _ in model.run(time_steps=2):
+                pass
+
+        assert [log["step"] for log in logs] == [0, 1]
+        for log in logs:
+            assert log["decide_count"] == 3
+            assert log["collect_count"] == 3
+            assert log["write_count"] == 3
+            assert log["decide_seconds"] >= 0
+
 
 def test_collect_when() -> None:
     class DateABM(AgentBasedModel):
@@ -156,6 +193,74 @@ def test_collect_when() -> None:
     ]
 
 
+class TestCollectorPlan:
+    def test_agent_callables_are_evaluated_once_per_agent(self) -> None:
+        calls: List[Agent] = []
+
+        def agent_callable(agent: Agent) -> int:
+            calls.append(agent)
+            return len(calls)
+
+        agents = [Agent(), Agent(), Agent()]
+        columns = CollectorPlan([agent_callable]).collect_columns(agents)
+
+        assert columns == {"agent_callable": [1, 2, 3]}
+        assert calls == agents
+
+    def test_column_collectors_are_called_once_with_every_agent(self) -> None:
+        calls: List[Sequence[Agent]] = []
+
+        @column_collector
+        def agent_index(agents: Sequence[Agent]) -> List[int]:
+            calls.append(agents)
+            return list(range(len(agents)))
+
+        @column_collector
+        def skipped_column(agents: Sequence[Agent]) -> None:
+            return None
+
+        agents = [Agent(), Agent()]
+        columns = CollectorPlan([agent_index, skipped_column]).collect_columns(agents)
+
+        assert columns == {"agent_index": [0, 1]}
+        assert calls == [agents]
+
+    def test_collect_when_callables_are_skipped_when_condition_is_false(
+        self,
+    ) -> None:
+        model = AgentBasedModel[Agent]()
+        collect = False
+
+        def condition(model: AgentBasedModel) -> bool:
+            return collect
+
+        @collect_when(model, condition)
+        def agent_callable(agent: Agent) -> int:
+            raise AssertionError("agent callable should not be evaluated")
+
+        plan: CollectorPlan[Agent] = CollectorPlan([agent_callable])
+        assert plan.collect_columns([Agent()]) == {}
+
+        collect = True
+        with pytest.raises(AssertionError):
+            plan.collect_columns([Agent()])
+
+
+class TestAgentColumns:
+    def test_reads_as_agent_dicts_leaving_out_none_values(self) -> None:
+        agent_columns = AgentColumns({"a": [1, None], "b": [None, None]}, 2)
+
+        assert len(agent_columns) == 2
+        assert list(agent_columns) == [{"a": 1}, {}]
+        assert agent_columns[0] == {"a": 1}
+        assert agent_columns[-1] == {}
+        assert agent_columns[1:] == [{}]
+        assert agent_columns == [{"a": 1}, {}]
+
+    def test_no_columns_reads_as_empty_dicts(self) -> None:
+        assert list(AgentColumns({}, 2)) == [{}, {}]
+
+
 class TestAgent:
     def test_make_decisions_is_not_implemented(self) -> None:
         with pytest.raises(NotImplementedError):
@@ -195,6 +300,55 @@ def test_write_and_read_jsonlines_output(tmp_path: pathlib.Path) -> None:
     assert history == deserialized_history
 
 
+@pytest.mark.parametrize("keyframe_interval", [1, 2, 10])
+def test_delta_encoded_jsonlines_output_decodes_to_full_history(
+    tmp_path: pathlib.Path, keyframe_interval: int
+) -> None:
+    history: History = [
+        ([{"agent": 1, "state": "a"}, {"agent": 2, "state": "a"}], {"attribute": "a"}),
+        (
+            AgentColumns({"agent": [1, 2], "state": ["b", "a"], "cost": [None, 1]}, 2),
+            {"attribute": "b"},
+        ),
+        ([{"agent": 1, "state": "b"}, {"agent": 2, "state": "a", "cost": 1.0}], {}),
+        ([{"agent": 1, "state": "b"}], {"attribute": "c"}),
+    ]
+    filename = str(tmp_path / "filename.jsonl")
+
+    with open(filename, "w") as file:
+        write_jsonlines(history, file, keyframe_interval=keyframe_interval)
+
+    with open(filename, "r") as file:
+        deserialized_history = list(read_jsonlines(file))
+
+    assert [
+        ([dict(agent) for agent in agent_data], model_data)
+        for agent_data, model_data in history
+    ] == deserialized_history
+    assert [type(agent.get("cost")) for agent in deserialized_history[2][0]] == [
+        type(None),
+        float,
+    ]
+
+
+def test_delta_encoded_jsonlines_output_only_holds_changed_fields(
+    tmp_path: pathlib.Path,
+) -> None:
+    history: History = [
+        ([{"agent": 1, "state": "a"}, {"agent": 2, "state": "a"}], {}),
+        ([{"agent": 1, "state": "a"}, {"agent": 2, "state": "b"}], {}),
+    ]
+    filename = str(tmp_path / "filename.jsonl")
+
+    with open(filename, "w") as file:
+        write_jsonlines(history, file, keyframe_interval=10)
+
+    with open(filename, "r") as file:
+        lines = file.readlines()
+
+    assert json.loads(lines[1]) == [{"changed": {"state": [[1], ["b"]]}}, {}]
+
+
 def test_history_to_dataframe() -> None:
     today = datetime.date.today().isoformat()
     history: History = [
@@ -214,3 +368,245 @@ def test_history_to_dataframe() -> None:
             {"step": [0, 1], "date": [str(today), str(today)], "attribute": ["a", "b"]},
         ),
     )
+
+
+def test_write_and_read_parquet_output(tmp_path: pathlib.Path) -> None:
+    history: History = [
+        (
+            AgentColumns({"agent": [1, 2], "cost": [0, None], "kind": ["a", "b"]}, 2),
+            {"attribute": "a", "count": 1},
+        ),
+        (
+            [{"agent": 3, "cost": 1.5, "kind": "a"}, {"agent": 4}],
+            {"attribute": "b", "count": 2},
+        ),
+    ]
+    filename = str(tmp_path / "filename.parquet")
+
+    with open(filename, "wb") as file:
+        write_parquet(history, file)
+
+    with open(filename, "rb") as file:
+        agent_history_df, model_history_df = parquet_to_dataframes(file)
+
+    pd.testing.assert_frame_equal(
+        agent_history_df.astype({"step": "int64"}),
+        pd.DataFrame(
+            {
+                "step": [0, 0, 1, 1],
+                "agent": [1.0, 2.0, 3.0, 4.0],
+                "cost": [0.0, None, 1.5, None],
+                "kind": pd.Categorical(["a", "b", "a", None]),
+            }
+        ),
+    )
+    pd.testing.assert_frame_equal(
+        model_history_df.astype({"step": "int64", "attribute": str}),
+        pd.DataFrame({"step": [0, 1], "attribute": ["a", "b"], "count": [1.0, 2.0]}),
+    )
+
+
+def test_parquet_columns_take_numbers_not_seen_in_first_row_group(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A row group per step
+    monkeypatch.setattr(abm, "PARQUET_BUFFERED_ROWS", 1)
+    history: History = [
+        ([{"agent": 1, "cost": None}, {"agent": 2}], {"count": 1}),
+        ([{"agent": 1, "cost": 1.5}, {"agent": 2, "cost": 2}], {"count": 2.5}),
+    ]
+    filename = str(tmp_path / "filename.parquet")
+
+    with open(filename, "wb") as file:
+        write_parquet(history, file)
+
+    with open(filename, "rb") as file:
+        agent_history_df, model_history_df = parquet_to_dataframes(file)
+
+    assert agent_history_df["cost"].tolist()[2:] == [1.5, 2.0]
+    assert model_history_df["count"].tolist() == [1.0, 2.5]
+
+
+def test_write_parquet_rejects_strings_not_seen_in_first_row_group(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(abm, "PARQUET_BUFFERED_ROWS", 1)
+    history: History = [
+        ([{"agent": 1}], {"kind": None}),
+        ([{"agent": 1}], {"kind": "a"}),
+    ]
+
+    with open(tmp_path / "filename.parquet", "wb") as file:
+        with pytest.raises(ValueError):
+            write_parquet(history, file)
+
+
+def test_write_parquet_rejects_columns_shared_by_agent_and_model_data(
+    tmp_path: pathlib.Path,
+) -> None:
+    history: History = [([{"attribute": 1}], {"attribute": "a"})]
+
+    with open(tmp_path / "filename.parquet", "wb") as file:
+        with pytest.raises(ValueError):
+            write_parquet(history, file)
+
+
+@pytest.fixture
+def history_with_changing_agents() -> History:
+    return [
+        (
+            [{"agent": 1, "state": "a", "cost": step}, {"agent": 2, "state": "b"}],
+            {"attribute": "a", "count": step},
+        )
+        for step in range(6)
+    ]
+
+
+@pytest.mark.parametrize("keyframe_interval", [None, 4])
+def test_jsonlines_to_dataframes_reads_selected_columns_and_steps(
+    tmp_path: pathlib.Path,
+    history_with_changing_agents: History,
+    keyframe_interval: Optional[int],
+) -> None:
+    filename = str(tmp_path / "filename.jsonl")
+    with open(filename, "w") as file:
+        write_jsonlines(history_with_changing_agents, file, keyframe_interval)
+
+    with open(filename, "r") as file:
+        agent_history_df, model_history_df = jsonlines_to_dataframes(
+            file, agent_columns=["cost"], model_columns=["count"], steps=range(1, 6, 2)
+        )
+
+    pd.testing.assert_frame_equal(
+        agent_history_df,
+        pd.DataFrame({"step": [1, 1, 3, 3, 5, 5], "cost": [1, None, 3, None, 5, None]}),
+    )
+    pd.testing.assert_frame_equal(
+        model_history_df, pd.DataFrame({"step": [1, 3, 5], "count": [1, 3, 5]})
+    )
+
+
+def test_jsonlines_to_dataframes_matches_history_to_dataframes(
+    tmp_path: pathlib.Path, history_with_changing_agents: History
+) -> None:
+    filename = str(tmp_path / "filename.jsonl")
+    with open(filename, "w") as file:
+        write_jsonlines(history_with_changing_agents, file, keyframe_interval=4)
+
+    with open(filename, "r") as file:
+        agent_history_df, model_history_df = jsonlines_to_dataframes(
+            file, steps=lambda step: step % 4 == 3
+        )
+
+    expected_agent_history_df, expected_model_history_df = history_to_dataframes(
+        history_with_changing_agents
+    )
+    pd.testing.assert_frame_equal(
+        agent_history_df,
+        expected_agent_history_df[
+            expected_agent_history_df["step"] % 4 == 3
+        ].reset_index(drop=True),
+    )
+    pd.testing.assert_frame_equal(
+        model_history_df,
+        expected_model_history_df[
+            expected_model_history_df["step"] % 4 == 3
+        ].reset_index(drop=True),
+    )
+
+
+def test_parquet_to_dataframes_reads_selected_columns_and_steps(
+    tmp_path: pathlib.Path, history_with_changing_agents: History
+) -> None:
+    filename = str(tmp_path / "filename.parquet")
+    with open(filename, "wb") as file:
+        write_parquet(history_with_changing_agents, file)
+
+    with open(filename, "rb") as file:
+        agent_history_df, model_history_df = parquet_to_dataframes(
+            file, agent_columns=["cost"], model_columns=["count"], steps=range(1, 6, 2)
+        )
+
+    pd.testing.assert_frame_equal(
+        agent_history_df.astype({"step": "int64"}),
+        pd.DataFrame({"step": [1, 1, 3, 3, 5, 5], "cost": [1, None, 3, None, 5, None]}),
+    )
+    pd.testing.assert_frame_equal(
+        model_history_df.astype({"step": "int64"}),
+        pd.DataFrame({"step": [1, 3, 5], "count": [1.0, 3.0, 5.0]}),
+    )
+
+
+@pytest.mark.parametrize("keyframe_interval", [None, 2])
+def test_write_jsonlines_with_executor_writes_steps_in_order(
+    history_with_changing_agents: History, keyframe_interval: Optional[int]
+) -> None:
+    file = io.StringIO()
+    write_jsonlines(history_with_changing_agents, file, keyframe_interval)
+
+    with ThreadPoolExecutor(2) as executor:
+        executor_file = io.StringIO()
+        write_jsonlines(
+            history_with_changing_agents,
+            executor_file,
+            keyframe_interval,
+            executor=executor,
+            steps_in_flight=3,
+        )
+
+    assert executor_file.getvalue() == file.getvalue()
+
+
+class TestBackgroundWriter:
+    def test_writes_history_in_order(
+        self, history_with_changing_agents: History
+    ) -> None:
+        file = io.StringIO()
+        write_jsonlines(history_with_changing_agents, file)
+
+        background_file = io.StringIO()
+        with BackgroundWriter(
+            functools.partial(write_jsonlines, file=background_file), max_queued_steps=1
+        ) as writer:
+            writer.write_history(history_with_changing_agents)
+
+        assert background_file.getvalue() == file.getvalue()
+
+    def test_flush_waits_for_queued_steps_to_be_written(
+        self, history_with_changing_agents: History
+    ) -> None:
+        file = io.StringIO()
+        with BackgroundWriter(functools.partial(write_jsonlines, file=file)) as writer:
+            writer.write_history(list(history_with_changing_agents)[:3])
+            writer.flush()
+            assert len(file.getvalue().splitlines()) == 3
+
+    def test_flush_writes_steps_held_by_executor(
+        self, history_with_changing_agents: History
+    ) -> None:
+        file = io.StringIO()
+        pending_lines = PendingLines()
+        with ThreadPoolExecutor(2) as executor, BackgroundWriter(
+            functools.partial(
+                write_jsonlines,
+                file=file,
+                executor=executor,
+                steps_in_flight=4,
+                pending_lines=pending_lines,
+            ),
+            write_held=pending_lines.write,
+        ) as writer:
+            writer.write_history(list(history_with_changing_agents)[:3])
+            writer.flush()
+            assert len(file.getvalue().splitlines()) == 3
+
+    def test_writer_errors_are_raised_in_the_simulation(
+        self, history_with_changing_agents: History
+    ) -> None:
+        def write(history: History) -> None:
+            next(iter(history))
+            raise OSError("upload failed")
+
+        with pytest.raises(OSError, match="upload failed"):
+            with BackgroundWriter(write, max_queued_steps=1) as writer:
+                writer.write_history(history_with_changing_agents)